@@ -0,0 +1,4 @@
+#!/bin/bash -x
+
+echo "Starting celery outbox worker"
+celery -A tackapp worker -Q outbox --concurrency=1 --loglevel=info --logfile=celery-outbox.log
@@ -98,6 +98,27 @@ class PaymentAction(models.TextChoices):
     WITHDRAW = "withdraw", "Withdraw"
 
 
+class BalanceEntryReason(models.TextChoices):
+    """Choices for reasons of BankAccount balance changes"""
+
+    OPENING_BALANCE = "opening", "Opening balance"
+    DEPOSIT = "deposit", "Deposit"
+    WITHDRAW = "withdraw", "Withdraw"
+    TACK_PAYMENT = "tack_payment", "Tack payment"
+    TACK_REFUND = "tack_refund", "Tack refund"
+    RUNNER_PAYOUT = "runner_payout", "Runner payout"
+    ADMIN_ADJUSTMENT = "admin", "Admin adjustment"
+    HOLD_RELEASE = "hold_release", "Hold release"
+
+
+class BalanceHoldStatus(models.TextChoices):
+    """Choices for BalanceHold status"""
+
+    HELD = "held", "Held"  # funds are taken from balance and reserved
+    CAPTURED = "captured", "Captured"  # reserved funds are spent
+    RELEASED = "released", "Released"  # reserved funds are returned to balance
+
+
 class OfferStatus(models.TextChoices):
     """Choices for Offer status"""
 
@@ -140,3 +161,26 @@ class MethodType(models.TextChoices):
     TACK_BALANCE = "tack_balance", "Tack Balance"
     STRIPE = "stripe", "Stripe"
     DWOLLA = "dwolla", "Dwolla"
+
+
+class OutboxEventType(models.TextChoices):
+    """Side effects of Tack and Offer saves processed by outbox dispatcher"""
+
+    OFFER_EXPIRATION = "offer_expiration", "Offer expiration"
+    OFFER_CREATED = "offer_created", "Offer created"
+    OFFER_ACCEPTED = "offer_accepted", "Offer accepted"
+    OFFER_IN_PROGRESS = "offer_in_progress", "Offer in progress"
+    OFFER_FINISHED = "offer_finished", "Offer finished"
+    OFFER_EXPIRED = "offer_expired", "Offer expired"
+    OFFER_DELETED = "offer_deleted", "Offer deleted"
+    OFFER_CANCELLED = "offer_cancelled", "Offer cancelled"
+
+    TACK_CREATED = "tack_created", "Tack created"
+    TACK_DELETED = "tack_deleted", "Tack deleted"
+    TACK_CANCELLED = "tack_cancelled", "Tack cancelled"
+    TACK_CREATED_FROM_ACTIVE = "tack_created_from_active", "Tack created from active"
+    TACK_ACTIVE = "tack_active", "Tack active"
+    TACK_ACCEPTED = "tack_accepted", "Tack accepted"
+    TACK_IN_PROGRESS = "tack_in_progress", "Tack in progress"
+    TACK_WAITING_REVIEW = "tack_waiting_review", "Tack waiting for review"
+    TACK_FINISHED = "tack_finished", "Tack finished"
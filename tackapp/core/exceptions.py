@@ -1,4 +1,4 @@
-class CustomResponseError(BaseException):
+class CustomResponseError(Exception):
     def __init__(self, error, message, status):
         self.error = error
         self.message = message
@@ -15,3 +15,7 @@ class MultipleAccountsError(CustomResponseError):
 
 class InvalidActionError(CustomResponseError):
     pass
+
+
+class InsufficientFundsError(CustomResponseError):
+    pass
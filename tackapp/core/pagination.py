@@ -1,24 +1,37 @@
 from collections import OrderedDict
 
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Func, Field, Value
 from django.utils.encoding import force_str
 from rest_framework.pagination import LimitOffsetPagination, _positive_int
 from django.utils.translation import gettext_lazy as _
 from rest_framework.response import Response
 from rest_framework.compat import coreapi, coreschema
-from rest_framework.utils.urls import replace_query_param
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class Row(Func):
+    """SQL row value: (expr1, expr2, ...) - compared lexicographically"""
+
+    template = "(%(expressions)s)"
+    output_field = Field()
 
 
 class LastObjectPagination(LimitOffsetPagination):
     """
         Custom Pagination class that can work in 2 ways:
         1) offset + limit = standard LimitOffsetPagination class
-        2) last_object + limit = find last_object in queryset
-            and return [last_object + 1 : last_object + 1 + limit] objects
+        2) last_object + limit = return [last_object + 1 : last_object + 1 + limit] objects
             * every object should have an 'id' field *
+            If queryset is ordered by not nullable model fields
+            (e.g. "-creation_time") page is found with keyset seek
+            WHERE (creation_time, id) < (<last_object values>) so every page costs the same.
+            Count is calculated only with with_count=true
     """
 
     last_obj_query_param = 'last_object'
     last_obj_query_description = _('The last object of current results')
+    with_count_query_param = 'with_count'
 
     def __init__(self):
         self.request = None
@@ -26,21 +39,29 @@ class LastObjectPagination(LimitOffsetPagination):
         self.offset = None
         self.count = None
         self.last_object = None
+        self.keyset_next_object = None
 
     def paginate_queryset(self, queryset, request, view=None):
         self.limit = self.get_limit(request)
         if self.limit is None:
             return None
 
-        self.count = self.get_count(queryset)
+        self.request = request
         self.offset = self.get_offset(request)
         self.last_object = self.get_last_object(request)
+        keyset = self.get_keyset(queryset)
+        if keyset:
+            # pk tiebreaker makes the order total, so last_object defines an exact position
+            field_names, descending = keyset
+            queryset = queryset.order_by(*(f"-{field}" if descending else field for field in field_names))
         if self.last_object:
-            # TODO: if last_object not found in queryset
+            if keyset:
+                return self.paginate_queryset_by_keyset(queryset, *keyset)
+            # unordered queryset - position of last_object can only be found by scanning
             ids = list(queryset.values_list('id', flat=True))
-            self.offset = ids.index(self.last_object) + 1
+            self.offset = ids.index(self.last_object) + 1 if self.last_object in ids else len(ids)
 
-        self.request = request
+        self.count = self.get_count(queryset)
         if self.count > self.limit and self.template is not None:
             self.display_page_controls = True
 
@@ -48,6 +69,67 @@ class LastObjectPagination(LimitOffsetPagination):
             return []
         return list(queryset[self.offset:self.offset + self.limit])
 
+    def get_keyset(self, queryset) -> tuple[list[str], bool] | None:
+        """
+        Field names of queryset ordering with pk as tiebreaker and descending flag.
+        None if ordering can't be used for keyset seek
+        """
+
+        if queryset.query.order_by:
+            ordering = list(queryset.query.order_by)
+        elif queryset.query.default_ordering:
+            ordering = list(queryset.model._meta.ordering)
+        else:
+            return None
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            return None
+        descending = ordering[0].startswith("-")
+        field_names = []
+        for field in ordering:
+            if field.startswith("-") != descending:
+                return None
+            field_name = field.lstrip("-")
+            if field_name == "pk":
+                field_name = queryset.model._meta.pk.name
+            try:
+                model_field = queryset.model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.null:
+                return None
+            field_names.append(model_field.attname)
+        pk_name = queryset.model._meta.pk.attname
+        if pk_name not in field_names:
+            field_names.append(pk_name)
+        return field_names, descending
+
+    def paginate_queryset_by_keyset(self, queryset, field_names: list[str], descending: bool):
+        self.offset = None
+        self.count = self.get_count(queryset) if self.get_with_count(self.request) else None
+        # last_object could have left the queryset since previous page (e.g. status changed)
+        last_values = queryset.model._base_manager.filter(
+            pk=self.last_object
+        ).values_list(
+            *field_names
+        ).first()
+        if last_values is None:
+            return []
+        lookup = "_keyset__lt" if descending else "_keyset__gt"
+        page = list(
+            queryset.alias(
+                _keyset=Row(*field_names)
+            ).filter(**{
+                lookup: Row(*(Value(value) for value in last_values))
+            })[:self.limit + 1]
+        )
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            self.keyset_next_object = page[-1].pk
+        return page
+
+    def get_with_count(self, request) -> bool:
+        return request.query_params.get(self.with_count_query_param, "").lower() in ("1", "true")
+
     def get_paginated_response(self, data):
         last_object = data[-1]['id'] if len(data) > 0 else None
         return Response(OrderedDict([
@@ -127,11 +209,28 @@ class LastObjectPagination(LimitOffsetPagination):
                 'schema': {
                     'type': 'integer',
                 }
+            },
+            {
+                'name': self.with_count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Calculate count when paginating by last_object',
+                'schema': {
+                    'type': 'boolean',
+                }
             }
         ]
         return parameters
 
     def get_next_link(self):
+        if self.offset is None:
+            if self.keyset_next_object is None:
+                return None
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, self.limit_query_param, self.limit)
+            url = remove_query_param(url, self.offset_query_param)
+            return replace_query_param(url, self.last_obj_query_param, self.keyset_next_object)
+
         if self.offset + self.limit >= self.count:
             return None
 
@@ -142,3 +241,8 @@ class LastObjectPagination(LimitOffsetPagination):
         # last_object = self.last_object + self.limit + 1
         # url = replace_query_param(url, self.last_obj_query_param, last_object)
         return replace_query_param(url, self.offset_query_param, offset)
+
+    def get_previous_link(self):
+        if self.offset is None:
+            return None
+        return super().get_previous_link()
@@ -1,48 +1,116 @@
 import logging
 
 from tack.models import Offer, Tack
-from tack.serializers import TackDetailSerializer, OfferSerializer, TacksOffersSerializer
+from tack.serializers import TackDetailSerializer, OfferSerializer
+from tack.utils import select_tack_relations, select_offer_relations
 from tackapp.websocket_messages import WSSender
 
 ws_sender = WSSender()
 logger = logging.getLogger("django")
 
 
+class WSPayloads:
+    """
+    Payloads of one WebSocket event.
+    Every Tack and Offer is serialized at most once and the same data is reused for all target groups
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def _memoize(self, key: tuple, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def tack(self, tack: Tack) -> dict:
+        """TackDetailSerializer data"""
+
+        return self._memoize(
+            ("tack", tack.id),
+            lambda: TackDetailSerializer(select_tack_relations(tack)).data
+        )
+
+    def offer(self, offer: Offer) -> dict:
+        """OfferSerializer data"""
+
+        return self._memoize(
+            ("offer", offer.id),
+            lambda: OfferSerializer(select_offer_relations(offer)).data
+        )
+
+    def offer_tack(self, offer: Offer) -> dict:
+        """TackDetailSerializer data of the Offer's Tack"""
+
+        if ("tack", offer.tack_id) not in self._cache:
+            select_offer_relations(offer)
+        return self.tack(offer.tack)
+
+    def runner_tack(self, offer: Offer) -> dict:
+        """TacksOffersSerializer data"""
+
+        return self._memoize(
+            ("runner_tack", offer.id),
+            lambda: {
+                "id": offer.id,
+                "tack": self.offer_tack(offer),
+                "offer": self.offer(offer),
+            }
+        )
+
+    def group_tack(self, tack_data: dict, is_mine_offer_sent: bool) -> dict:
+        """GroupTackSerializer data with hard-coded is_mine_offer_sent field"""
+
+        return {
+            'id': tack_data['id'],
+            'tack': tack_data,
+            'is_mine_offer_sent': is_mine_offer_sent
+        }
+
+
+def _other_offers_runners_ids(offer: Offer) -> list[int]:
+    """Runners of other active Offers of the same Tack, they receive Tack events on their user_{id} channels"""
+
+    return list(
+        Offer.active.filter(
+            tack=offer.tack_id,
+            runner__isnull=False
+        ).exclude(
+            runner=offer.runner_id
+        ).values_list(
+            "runner_id",
+            flat=True
+        ).distinct()
+    )
+
+
 def ws_offer_created(offer: Offer):
     logger.debug(f"offer_created. {offer.status = }")
     logger.debug(f"if created:")
-    tack_serializer = TackDetailSerializer(offer.tack)
-    message_for_runner = {
-        'id': offer.tack_id,
-        'tack': tack_serializer.data,
-        'is_mine_offer_sent': True
-    }
+    payloads = WSPayloads()
+    message_for_runner = payloads.group_tack(payloads.offer_tack(offer), is_mine_offer_sent=True)
     ws_sender.send_message(
         f"user_{offer.tack.tacker_id}",  # tack_{offer.tack_id}_tacker
         'offer.create',
-        OfferSerializer(offer).data
+        payloads.offer(offer)
     )
     ws_sender.send_message(
         f"user_{offer.runner_id}",
         'runnertack.create',
-        TacksOffersSerializer(offer).data
-    )
-    ws_sender.send_message(
-        f"tack_{offer.tack_id}_offer",
-        "grouptack.update",
-        message_for_runner
-    )
-    ws_sender.send_message(
-        f"user_{offer.runner_id}",
-        'grouptack.update',
-        message_for_runner
+        payloads.runner_tack(offer)
     )
+    for runner_id in (offer.runner_id, *_other_offers_runners_ids(offer)):
+        ws_sender.send_message(
+            f"user_{runner_id}",
+            'grouptack.update',
+            message_for_runner
+        )
 
 
 def ws_offer_accepted(offer: Offer):
     logger.debug(f"offer_accepted. {offer.status = }")
     ws_sender.send_message(
-        f"user_{offer.tack_id}_tacker",
+        f"user_{offer.tack.tacker_id}",
         'offer.delete',
         offer.id)
     # ws_sender.send_message(
@@ -73,19 +141,17 @@ def ws_offer_in_progress(offer: Offer):
 
 def ws_offer_finished(offer: Offer):
     logger.debug(f"offer_finished. {offer.status = }")
+    payloads = WSPayloads()
     ws_sender.send_message(
         f"user_{offer.runner_id}",
         'runnertack.update',
-        TacksOffersSerializer(offer).data)
+        payloads.runner_tack(offer))
 
 
 def ws_offer_expired(offer: Offer):
     logger.debug(f"offer_expired. {offer.status = }")
-    message_for_runner = {
-        'id': offer.tack_id,
-        'tack': TackDetailSerializer(offer.tack).data,
-        'is_mine_offer_sent': False
-    }
+    payloads = WSPayloads()
+    message_for_runner = payloads.group_tack(payloads.offer_tack(offer), is_mine_offer_sent=False)
     ws_sender.send_message(
         f"user_{offer.tack.tacker_id}",  # tack_id_tacker
         'offer.delete',
@@ -102,12 +168,8 @@ def ws_offer_expired(offer: Offer):
 
 def ws_offer_deleted(offer: Offer):
     logger.debug(f"offer_deleted. {offer.status = }")
-    tack_serializer = TackDetailSerializer(offer.tack)
-    message_for_runner = {
-        'id': offer.tack_id,
-        'tack': tack_serializer.data,
-        'is_mine_offer_sent': False
-    }
+    payloads = WSPayloads()
+    message_for_runner = payloads.group_tack(payloads.offer_tack(offer), is_mine_offer_sent=False)
     ws_sender.send_message(
         f"user_{offer.tack.tacker_id}",  # tack_id_tacker
         'offer.delete',
@@ -124,6 +186,8 @@ def ws_offer_deleted(offer: Offer):
 
 def ws_offer_cancelled(offer: Offer):
     logger.debug(f"offer_cancelled. {offer.status = }")
+    payloads = WSPayloads()
+    tack_data = payloads.offer_tack(offer)
     ws_sender.send_message(
         f"user_{offer.tack.tacker_id}",  # tack_id_tacker
         'tack.delete',
@@ -135,21 +199,17 @@ def ws_offer_cancelled(offer: Offer):
     ws_sender.send_message(
         f"user_{offer.tack.tacker_id}",  # tack_id_tacker
         "canceltackertackrunner.create",
-        TackDetailSerializer(offer.tack).data)
+        tack_data)
 
 
 def ws_tack_created(tack: Tack):
     logger.debug(f"tack_created_first_time. {tack.status = }")
-
-    tack_serializer = TackDetailSerializer(tack)
+    payloads = WSPayloads()
+    tack_data = payloads.tack(tack)
     # Workaround on a problem to fly-calculate data for every User of the Group
     # This message model is GroupTackSerializer with hard-coded is_mine_offer_sent field
     # Because on creating new Tack can not be any Offers to this Tack
-    message = {
-        'id': tack.id,
-        'tack': tack_serializer.data,
-        'is_mine_offer_sent': False
-    }
+    message = payloads.group_tack(tack_data, is_mine_offer_sent=False)
     ws_sender.send_message(
         f"group_{tack.group_id}",
         'grouptack.create',
@@ -157,7 +217,7 @@ def ws_tack_created(tack: Tack):
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         'tack.create',
-        tack_serializer.data)
+        tack_data)
 
 
 def ws_tack_deleted(tack: Tack):
@@ -198,17 +258,14 @@ def ws_tack_cancelled(tack: Tack):
 
 def ws_tack_created_from_active(tack: Tack):
     logger.debug(f"tack_created_active_update. {tack.status = }")
-    tack_serializer = TackDetailSerializer(tack)
-    message_for_runner = {
-        'id': tack.id,
-        'tack': tack_serializer.data,
-        'is_mine_offer_sent': False
-    }
+    payloads = WSPayloads()
+    tack_data = payloads.tack(tack)
+    message_for_runner = payloads.group_tack(tack_data, is_mine_offer_sent=False)
     logger.debug(f"if tack.status in (TackStatus.CREATED, TackStatus.ACTIVE):")
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         'tack.update',
-        tack_serializer.data)
+        tack_data)
     ws_sender.send_message(
         f"group_{tack.group_id}",
         'grouptack.update',
@@ -217,17 +274,14 @@ def ws_tack_created_from_active(tack: Tack):
 
 def ws_tack_active(tack: Tack):
     logger.debug(f"tack_created_active_update. {tack.status = }")
-    tack_serializer = TackDetailSerializer(tack)
-    message_for_tacker = {
-        'id': tack.id,
-        'tack': tack_serializer.data,
-        'is_mine_offer_sent': False
-    }
+    payloads = WSPayloads()
+    tack_data = payloads.tack(tack)
+    message_for_tacker = payloads.group_tack(tack_data, is_mine_offer_sent=False)
     logger.debug(f"if tack.status in (TackStatus.CREATED, TackStatus.ACTIVE):")
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         'tack.update',
-        tack_serializer.data)
+        tack_data)
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         "grouptack.update",
@@ -235,9 +289,18 @@ def ws_tack_active(tack: Tack):
     )
 
 
+def _accepted_offer_with_tack(tack: Tack) -> Offer:
+    """Accepted Offer sharing the already loaded Tack instance"""
+
+    offer = tack.accepted_offer
+    if offer.tack_id == tack.id:
+        offer.tack = tack
+    return offer
+
+
 def ws_tack_accepted(tack: Tack):
     logger.debug(f"tack_status_accepted. {tack.status = }")
-
+    payloads = WSPayloads()
     ws_sender.send_message(
         f"group_{tack.group_id}",
         'grouptack.delete',
@@ -245,35 +308,38 @@ def ws_tack_accepted(tack: Tack):
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         'tack.update',
-        TackDetailSerializer(tack).data)
+        payloads.tack(tack))
     ws_sender.send_message(
         f"user_{tack.runner_id}",
         'runnertack.update',
-        TacksOffersSerializer(tack.accepted_offer).data)
+        payloads.runner_tack(_accepted_offer_with_tack(tack)))
 
 
 def ws_tack_in_progress(tack: Tack):
     logger.debug(f"tack_status_accepted_in_progress_waiting_review. {tack.status = }")
+    payloads = WSPayloads()
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         'tack.update',
-        TackDetailSerializer(tack).data)
+        payloads.tack(tack))
     ws_sender.send_message(
         f"user_{tack.runner_id}",
         'runnertack.update',
-        TacksOffersSerializer(tack.accepted_offer).data)
+        payloads.runner_tack(_accepted_offer_with_tack(tack)))
 
 
 def ws_tack_waiting_review(tack: Tack):
     logger.debug(f"tack_status_accepted_in_progress_waiting_review. {tack.status = }")
+    payloads = WSPayloads()
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         'tack.update',
-        TackDetailSerializer(tack).data)
+        payloads.tack(tack))
 
 
 def ws_tack_finished(tack: Tack):
     logger.debug(f"tack_status_finished. {tack.status = }")
+    payloads = WSPayloads()
     ws_sender.send_message(
         f"user_{tack.tacker_id}",
         'tack.delete',
@@ -286,4 +352,4 @@ def ws_tack_finished(tack: Tack):
     ws_sender.send_message(
         f"user_{tack.runner_id}",
         'completedtackrunner.create',
-        TackDetailSerializer(tack).data)
+        payloads.tack(tack))
@@ -7,17 +7,28 @@ Invoke like so:
 
     2) To only sync Stripe Accounts:
         python manage.py djstripe_sync_models Account
+
+    3) To sync with 16 threads and resume an interrupted run:
+        python manage.py djstripe_sync_models --workers 16 --checkpoint sync.json
 """
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 from django.apps import apps
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
 from ... import enums, models
 from ...models.base import StripeBaseModel
 from ...settings import djstripe_settings
 
-# TODO Improve performance using multiprocessing
+DEFAULT_WORKERS = 8
+# max page size of Stripe list API
+PAGE_SIZE = 100
 
 
 class Command(BaseCommand):
@@ -33,6 +44,19 @@ class Command(BaseCommand):
             help="restricts sync to these model names (default is to sync all "
             "supported models)",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help="number of threads listing Stripe objects and number of threads "
+            f"syncing listed pages (default is {DEFAULT_WORKERS})",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            metavar="FILE",
+            help="save the last synced id of every model to FILE and resume from it, "
+            "the file is removed when the sync is complete",
+        )
 
     def handle(self, *args, **options):
         app_label = "djstripe"
@@ -52,8 +76,71 @@ class Command(BaseCommand):
         else:
             model_list = app_config.get_models()
 
-        for model in model_list:
-            self.sync_model(model)
+        if options["workers"] < 1:
+            raise CommandError("--workers must be positive")
+        self.workers = options["workers"]
+        self.checkpoint_path = options["checkpoint"]
+        self.checkpoint = self.load_checkpoint()
+        self.lock = threading.Lock()
+        self.accounts_lock = threading.Lock()
+        self.accounts_set = None
+
+        # list kwargs of every model are sequences of (model, list_kwargs) units,
+        # units are listed concurrently and every listed page is synced by page_executor
+        with ThreadPoolExecutor(
+            self.workers, "djstripe-sync"
+        ) as executor, ThreadPoolExecutor(
+            self.workers, "djstripe-sync-page"
+        ) as self.page_executor:
+            units = [
+                unit
+                for model_units in executor.map(self.get_units, model_list)
+                for unit in model_units
+            ]
+            counts = {}
+            for model, count in executor.map(self.sync_unit, units):
+                counts[model] = counts.get(model, 0) + count
+
+        for model, count in counts.items():
+            if count == 0:
+                self.stdout.write(f"{model.__name__}: (no results)")
+            else:
+                self.stdout.write(f"  Synced {count} {model.__name__}")
+
+        if self.checkpoint_path and all(
+            state.get("done") for state in self.checkpoint.values()
+        ):
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+
+    def write(self, message, error=False):
+        with self.lock:
+            (self.stderr if error else self.stdout).write(message)
+
+    def load_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        return {}
+
+    def save_checkpoint(self, key, **state):
+        with self.lock:
+            self.checkpoint[key] = state
+            if not self.checkpoint_path:
+                return
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.checkpoint, f)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    @staticmethod
+    def get_checkpoint_key(model, list_kwargs):
+        return f"{model.__name__}:{json.dumps(list_kwargs, sort_keys=True)}"
+
+    @staticmethod
+    def is_pageable(model):
+        """Models with the default api_list accept limit and starting_after"""
+        return model.api_list.__func__ is StripeBaseModel.api_list.__func__
 
     def _should_sync_model(self, model):
         if not issubclass(model, StripeBaseModel):
@@ -81,73 +168,109 @@ class Command(BaseCommand):
 
         return True, ""
 
-    def sync_model(self, model):  # noqa: C901
-        model_name = model.__name__
-
+    def get_units(self, model):
         should_sync, reason = self._should_sync_model(model)
         if not should_sync:
-            self.stderr.write(f"Skipping {model}: {reason}")
-            return
+            self.write(f"Skipping {model}: {reason}", error=True)
+            return []
 
-        self.stdout.write("Syncing {}:".format(model_name))
+        self.write("Syncing {}:".format(model.__name__))
+        try:
+            return [
+                (model, list_kwargs) for list_kwargs in self.get_list_kwargs(model)
+            ]
+        except Exception as e:
+            self.write(str(e), error=True)
+            return []
+        finally:
+            connection.close()
+
+    def sync_unit(self, unit):  # noqa: C901
+        """Sync objects of one api_list call, returns (model, number of synced objects)"""
+        model, list_kwargs = unit
+        stripe_account = list_kwargs.get("stripe_account", "")
+        key = self.get_checkpoint_key(model, list_kwargs)
+        state = self.checkpoint.get(key, {})
+        if state.get("done"):
+            self.write(f"  {key} is already synced")
+            return model, 0
 
         count = 0
         try:
-            # todo convert get_list_kwargs into a generator to make the code memory effecient.
-            for list_kwargs in self.get_list_kwargs(model):
-                stripe_account = list_kwargs.get("stripe_account", "")
-
-                if (
-                    model is models.Account
-                    and stripe_account == models.Account.get_default_account().id
+            if (
+                not state
+                and model is models.Account
+                and stripe_account == models.Account.get_default_account().id
+            ):
+                # special case, since own account isn't returned by Account.api_list
+                stripe_obj = models.Account.stripe_class.retrieve(
+                    api_key=djstripe_settings.STRIPE_SECRET_KEY
+                )
+                count += self.sync_page(model, [stripe_obj], stripe_account)
+
+            kwargs = dict(list_kwargs)
+            if self.is_pageable(model):
+                kwargs.setdefault("limit", PAGE_SIZE)
+                if state.get("starting_after"):
+                    kwargs["starting_after"] = state["starting_after"]
+
+            # pages are synced concurrently but checkpointed in the listing order
+            pending = deque()
+            stripe_objs = model.api_list(**kwargs)
+            for page in self.iter_pages(stripe_objs, kwargs.get("limit", PAGE_SIZE)):
+                future = self.page_executor.submit(
+                    self.sync_page, model, page, stripe_account
+                )
+                pending.append((page[-1].get("id"), future))
+                while pending and (
+                    len(pending) > self.workers or pending[0][1].done()
                 ):
-                    # special case, since own account isn't returned by Account.api_list
-                    stripe_obj = models.Account.stripe_class.retrieve(
-                        api_key=djstripe_settings.STRIPE_SECRET_KEY
-                    )
+                    last_id, future = pending.popleft()
+                    count += future.result()
+                    self.save_checkpoint(key, starting_after=last_id)
+            while pending:
+                last_id, future = pending.popleft()
+                count += future.result()
+                self.save_checkpoint(key, starting_after=last_id)
+            self.save_checkpoint(key, done=True)
+        except Exception as e:
+            self.write(f"Skipping: {e}", error=True)
+        finally:
+            connection.close()
 
+        return model, count
+
+    @staticmethod
+    def iter_pages(stripe_objs, page_size):
+        page = []
+        for stripe_obj in stripe_objs:
+            page.append(stripe_obj)
+            if len(page) == page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def sync_page(self, model, stripe_objs, stripe_account):
+        count = 0
+        try:
+            for stripe_obj in stripe_objs:
+                # Skip model instances that throw an error
+                try:
                     djstripe_obj = model.sync_from_stripe_data(stripe_obj)
-                    self.stdout.write(
+                    self.write(
                         f"  id={djstripe_obj.id}, pk={djstripe_obj.pk} ({djstripe_obj} on {stripe_account})"
                     )
-
                     # syncing BankAccount and Card objects of Stripe Connected Express and Custom Accounts
                     self.sync_bank_accounts_and_cards(
                         djstripe_obj, stripe_account=stripe_account
                     )
                     count += 1
-
-                try:
-                    for stripe_obj in model.api_list(**list_kwargs):
-                        # Skip model instances that throw an error
-                        try:
-                            djstripe_obj = model.sync_from_stripe_data(stripe_obj)
-                            self.stdout.write(
-                                f"  id={djstripe_obj.id}, pk={djstripe_obj.pk} ({djstripe_obj} on {stripe_account})"
-                            )
-                            # syncing BankAccount and Card objects of Stripe Connected Express and Custom Accounts
-                            self.sync_bank_accounts_and_cards(
-                                djstripe_obj, stripe_account=stripe_account
-                            )
-                            count += 1
-                        except Exception as e:
-                            self.stderr.write(f"Skipping {stripe_obj.get('id')}: {e}")
-
-                            continue
                 except Exception as e:
-                    self.stderr.write(f"Skipping: {e}")
-
-            if count == 0:
-                self.stdout.write("  (no results)")
-            else:
-                self.stdout.write(
-                    "  Synced {count} {model_name}".format(
-                        count=count, model_name=model_name
-                    )
-                )
-
-        except Exception as e:
-            self.stderr.write(str(e))
+                    self.write(f"Skipping {stripe_obj.get('id')}: {e}", error=True)
+        finally:
+            connection.close()
+        return count
 
     @classmethod
     def get_stripe_account(cls, *args, **kwargs):
@@ -308,7 +431,10 @@ class Command(BaseCommand):
         # get all Stripe Accounts for the given platform account.
         # note that we need to fetch from Stripe as we have no way of knowing that the ones in the local db are up to date
         # as this can also be the first time the user runs sync.
-        accs_set = self.get_stripe_account()
+        with self.accounts_lock:
+            if self.accounts_set is None:
+                self.accounts_set = self.get_stripe_account()
+        accs_set = self.accounts_set
 
         default_list_kwargs = self.get_default_list_kwargs(model, accs_set)
 
@@ -364,11 +490,11 @@ class Command(BaseCommand):
 
             item_obj = model.sync_from_stripe_data(item)
 
-            self.stdout.write(
+            self.write(
                 f"\tSyncing {model._meta.verbose_name} ({instance}): id={item_obj.id}, pk={item_obj.pk}"
             )
 
         if bank_count + card_count > 0:
-            self.stdout.write(
+            self.write(
                 f"\tSynced {bank_count} BankAccounts and {card_count} Cards"
             )
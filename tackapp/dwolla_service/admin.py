@@ -3,7 +3,7 @@ from django.contrib import admin
 # Register your models here.
 from django.contrib.admin import ModelAdmin
 
-from dwolla_service.models import DwollaEvent, DwollaRemovedAccount
+from dwolla_service.models import DwollaEvent, DwollaRemovedAccount, DwollaWebhookMessage
 
 
 @admin.register(DwollaEvent)
@@ -22,3 +22,10 @@ class DwollaRemovedAccountAdmin(ModelAdmin):
     list_display = ('dwolla_id', 'creation_time')
     list_filter = ('creation_time',)
     search_fields = ('dwolla_id',)
+
+
+@admin.register(DwollaWebhookMessage)
+class DwollaWebhookMessageAdmin(ModelAdmin):
+    list_display = ('id', 'receive_time', 'process_time', 'error')
+    list_filter = ('receive_time', 'process_time')
+    readonly_fields = ('payload', 'receive_time', 'process_time', 'error')
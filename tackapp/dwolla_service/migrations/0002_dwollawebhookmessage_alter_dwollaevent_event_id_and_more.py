@@ -0,0 +1,45 @@
+# Generated by Django 4.0.8 on 2026-10-18 13:00
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_events(apps, schema_editor):
+    DwollaEvent = apps.get_model("dwolla_service", "DwollaEvent")
+    first_ids = DwollaEvent.objects.values("event_id").annotate(first_id=Min("id")).values("first_id")
+    DwollaEvent.objects.exclude(id__in=first_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dwolla_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DwollaWebhookMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField()),
+                ('receive_time', models.DateTimeField(auto_now_add=True)),
+                ('process_time', models.DateTimeField(blank=True, default=None, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Dwolla webhook message',
+                'verbose_name_plural': 'Dwolla webhook messages',
+                'db_table': 'dwolla_webhook_messages',
+            },
+        ),
+        migrations.RunPython(delete_duplicate_events, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dwollaevent',
+            name='event_id',
+            field=models.UUIDField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='dwollawebhookmessage',
+            index=models.Index(condition=models.Q(('process_time__isnull', True)), fields=['id'], name='dwolla_webhook_pending_idx'),
+        ),
+    ]
@@ -2,7 +2,7 @@ from django.db import models
 
 
 class DwollaEvent(models.Model):
-    event_id = models.UUIDField()
+    event_id = models.UUIDField(unique=True)
     topic = models.CharField(max_length=64)
     timestamp = models.DateTimeField()
     self_res = models.JSONField(blank=True, null=True)
@@ -17,6 +17,27 @@ class DwollaEvent(models.Model):
         verbose_name_plural = "Dwolla events"
 
 
+class DwollaWebhookMessage(models.Model):
+    """Raw Dwolla webhook payload waiting for payment.tasks.process_dwolla_webhooks_task"""
+
+    payload = models.JSONField()
+    receive_time = models.DateTimeField(auto_now_add=True)
+    process_time = models.DateTimeField(null=True, blank=True, default=None)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        db_table = "dwolla_webhook_messages"
+        verbose_name = "Dwolla webhook message"
+        verbose_name_plural = "Dwolla webhook messages"
+        indexes = [
+            models.Index(
+                fields=("id",),
+                condition=models.Q(process_time__isnull=True),
+                name="dwolla_webhook_pending_idx"
+            ),
+        ]
+
+
 class DwollaRemovedAccount(models.Model):
     dwolla_id = models.UUIDField()
     creation_time = models.DateTimeField(auto_now_add=True)
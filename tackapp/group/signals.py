@@ -2,7 +2,9 @@ import logging
 
 from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
+from fcm_django.models import FCMDevice
 
+from tackapp.fcm_messages import FCMSender
 from tackapp.websocket_messages import WSSender
 from .models import Group, GroupMembers, GroupInvitations
 from .serializers import GroupInvitationsSerializer, GroupMembersSerializer
@@ -60,6 +62,20 @@ def post_delete_group_members(instance: GroupMembers, *args, **kwargs):
     # set another active group if user leaving his current active group
 
 
+@receiver(signal=post_save, sender=GroupMembers)
+@receiver(signal=post_delete, sender=GroupMembers)
+def invalidate_group_fcm_tokens(instance: GroupMembers, *args, **kwargs):
+    # join, leave, mute and unmute change the set of Group notification recipients
+    FCMSender.invalidate_group_tokens(instance.group_id)
+
+
+@receiver(signal=post_save, sender=FCMDevice)
+@receiver(signal=post_delete, sender=FCMDevice)
+def invalidate_user_groups_fcm_tokens(instance: FCMDevice, *args, **kwargs):
+    if instance.user_id:
+        FCMSender.invalidate_user_groups_tokens(instance.user_id)
+
+
 @receiver(signal=post_delete, sender=GroupMembers)
 def pre_delete_group_members(instance: GroupMembers, *args, **kwargs):
     logging.getLogger().warning(f"{instance = }")
@@ -1,10 +1,15 @@
 from advanced_filters.admin import AdminAdvancedFiltersMixin
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin import ModelAdmin
 from django.contrib.admin.models import LogEntry
 
-from .models import BankAccount, UserPaymentMethods, Fee, StripePaymentMethodsHolder, ServiceFee, Transaction
+from core.choices import BalanceEntryReason
+from .balance_service import change_balance, release_hold
+from .models import BankAccount, UserPaymentMethods, Fee, StripePaymentMethodsHolder, ServiceFee, Transaction, \
+    BalanceEntry, BalanceHold, StripeWebhookQueueItem
 from .services import convert_to_decimal
+from .stripe_webhook_service import get_stripe_webhook_lag
+from .tasks import process_stripe_webhooks_task
 
 
 class ReadOnlyMixin:
@@ -29,6 +34,21 @@ class BankAccountAdmin(ModelAdmin):
             del actions['delete_selected']
         return actions
 
+    def save_model(self, request, obj: BankAccount, form, change):
+        if not change or 'usd_balance' not in form.changed_data:
+            return super().save_model(request, obj, form, change)
+        # balance is changed through the ledger so concurrent payments are not overwritten
+        amount = obj.usd_balance - form.initial['usd_balance']
+        other_fields = [field for field in form.changed_data if field != 'usd_balance']
+        if other_fields:
+            obj.save(update_fields=other_fields)
+        obj.usd_balance = change_balance(
+            obj.user_id,
+            amount,
+            BalanceEntryReason.ADMIN_ADJUSTMENT,
+            check_funds=False
+        )
+
     @admin.display(description="USD balance", ordering='usd_balance')
     def human_readable_usd_balance(self, obj: BankAccount):
         if obj.usd_balance is None:
@@ -44,10 +64,39 @@ class BankAccountAdmin(ModelAdmin):
             return f"${str(decimal_amount)}"
 
 
+@admin.register(BalanceEntry)
+class BalanceEntryAdmin(ReadOnlyMixin, ModelAdmin):
+    list_per_page = 50
+    list_display = ('id', 'bank_account', 'amount', 'balance_after', 'reason', 'tack', 'transaction', 'creation_time')
+    list_filter = ('reason', 'creation_time')
+    search_fields = ('bank_account__user__first_name', 'bank_account__user__last_name', 'idempotency_key')
+    search_help_text = "Search by User name, idempotency key"
+    raw_id_fields = ('bank_account', 'tack', 'transaction')
+    ordering = ('-id',)
+
+
+@admin.register(BalanceHold)
+class BalanceHoldAdmin(ReadOnlyMixin, ModelAdmin):
+    list_per_page = 50
+    list_display = ('id', 'bank_account', 'amount', 'reason', 'status', 'tack', 'creation_time', 'expiration_time')
+    list_filter = ('status', 'reason', 'creation_time')
+    search_fields = ('bank_account__user__first_name', 'bank_account__user__last_name', 'tack__id')
+    search_help_text = "Search by User name, Tack id"
+    raw_id_fields = ('bank_account', 'tack', 'transaction')
+    ordering = ('-id',)
+    actions = ('release_holds',)
+
+    @admin.action(description='Release selected holds (return funds to balance)')
+    def release_holds(self, request, queryset):
+        for hold in queryset:
+            release_hold(hold)
+
+
 @admin.register(UserPaymentMethods)
 class UserPaymentMethodsAdmin(ModelAdmin):
     list_per_page = 50
-    list_display = ('bank_account', 'dwolla_payment_method')
+    list_display = ('bank_account', 'dwolla_payment_method', 'bank_name', 'status', 'is_removed', 'synced_time')
+    list_filter = ('status', 'is_removed')
     search_fields = ('bank_account', 'dwolla_payment_method')
     search_help_text = "Search by Bank account id, Dwolla method id"
     ordering = ('id',)
@@ -279,6 +328,33 @@ class TransactionAdmin(AdminAdvancedFiltersMixin, ReadOnlyMixin, ModelAdmin):
         return f"${str(decimal_amount)}"
 
 
+@admin.register(StripeWebhookQueueItem)
+class StripeWebhookQueueItemAdmin(ReadOnlyMixin, ModelAdmin):
+    list_per_page = 50
+    list_display = ('id', 'event_type', 'object_id', 'creation_time', 'processed_time', 'attempts', 'next_attempt_time')
+    list_filter = ('event_type', ('processed_time', admin.EmptyFieldListFilter))
+    search_fields = ('object_id', 'trigger__id')
+    search_help_text = "Search by Stripe object id, Webhook event trigger id"
+    ordering = ('-id',)
+    actions = ('retry_items',)
+
+    def changelist_view(self, request, extra_context=None):
+        lag = get_stripe_webhook_lag()
+        self.message_user(
+            request,
+            f"Pending: {lag['pending']}, failed: {lag['failed']}, "
+            f"oldest pending received {lag['lag'].total_seconds():.0f} s ago, "
+            f"next retry at {lag['next_attempt_time'] or '-'}",
+            level=messages.WARNING if lag['failed'] or lag['lag'].total_seconds() > 60 else messages.INFO
+        )
+        return super().changelist_view(request, extra_context)
+
+    @admin.action(description="Retry selected items")
+    def retry_items(self, request, queryset):
+        queryset.filter(processed_time__isnull=True).update(attempts=0, next_attempt_time=None)
+        process_stripe_webhooks_task.delay()
+
+
 @admin.register(LogEntry)
 class LogEntryAdmin(ModelAdmin):
     list_per_page = 50
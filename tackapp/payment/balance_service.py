@@ -0,0 +1,286 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+from core.choices import BalanceEntryReason, BalanceHoldStatus, TackStatus
+from core.exceptions import InsufficientFundsError
+from payment.models import BankAccount, BalanceEntry, BalanceHold
+from tackapp.websocket_messages import WSSender
+
+
+ws_sender = WSSender()
+logger = logging.getLogger("payments")
+
+# holds of Tacks nobody accepted are released after this time
+BALANCE_HOLD_TTL = timedelta(days=3)
+# withdraw holds still without Transaction after this time are reconciled with Dwolla
+WITHDRAW_HOLD_TTL = timedelta(hours=1)
+RELEASE_BATCH_SIZE = 500
+
+
+def change_balance(
+        user_id: int,
+        amount: int,
+        reason: BalanceEntryReason,
+        idempotency_key: str = None,
+        tack=None,
+        payment_transaction=None,
+        check_funds: bool = True
+) -> int | None:
+    """
+    Atomically add amount (negative to charge) to User BankAccount balance and append BalanceEntry.
+    Balance is changed with one UPDATE ... RETURNING so concurrent changes are never lost.
+    :param idempotency_key: change with the same key is applied only once
+    :param check_funds: raise InsufficientFundsError instead of making balance negative
+    :return: new balance or None if change with this idempotency_key was already applied
+    """
+
+    try:
+        entry = _apply_balance_change(
+            amount,
+            reason,
+            user_id=user_id,
+            idempotency_key=idempotency_key,
+            tack_id=tack.id if tack else None,
+            payment_transaction=payment_transaction,
+            check_funds=check_funds
+        )
+    except IntegrityError:
+        if idempotency_key and BalanceEntry.objects.filter(idempotency_key=idempotency_key).exists():
+            logger.info(f"Balance change {idempotency_key} is already applied")
+            return None
+        raise
+    return entry.balance_after
+
+
+def hold_balance(
+        user_id: int,
+        amount: int,
+        reason: BalanceEntryReason,
+        tack=None,
+        expiration_time=None
+) -> BalanceHold:
+    """Take amount from User balance and reserve it until capture_hold or release_hold"""
+
+    with transaction.atomic():
+        entry = _apply_balance_change(-amount, reason, user_id=user_id, tack_id=tack.id if tack else None)
+        hold = BalanceHold.objects.create(
+            bank_account_id=entry.bank_account_id,
+            amount=amount,
+            reason=reason,
+            tack=tack,
+            expiration_time=expiration_time
+        )
+    logger.info(f"BalanceHold {hold.id} of {amount} ({reason}) created for User {user_id}")
+    return hold
+
+
+def hold_tack_price(tack, price: int) -> BalanceHold:
+    """Reserve Tack price from Tacker balance. Existing hold of other amount is replaced"""
+
+    with transaction.atomic():
+        hold = get_tack_hold(tack)
+        if hold and hold.amount == price:
+            return hold
+        if hold:
+            release_hold(hold)
+        return hold_balance(
+            tack.tacker_id,
+            price,
+            BalanceEntryReason.TACK_PAYMENT,
+            tack=tack,
+            expiration_time=timezone.now() + BALANCE_HOLD_TTL
+        )
+
+
+def get_tack_hold(tack) -> BalanceHold | None:
+    return BalanceHold.objects.filter(tack=tack, status=BalanceHoldStatus.HELD).first()
+
+
+def capture_hold(hold: BalanceHold, payment_transaction=None) -> bool:
+    """Spend reserved funds. Returns False if hold was already captured or released"""
+
+    captured = BalanceHold.objects.filter(
+        id=hold.id,
+        status=BalanceHoldStatus.HELD
+    ).update(
+        status=BalanceHoldStatus.CAPTURED,
+        resolution_time=timezone.now(),
+        transaction=payment_transaction
+    )
+    if captured:
+        hold.status = BalanceHoldStatus.CAPTURED
+    return bool(captured)
+
+
+def release_hold(hold: BalanceHold) -> bool:
+    """Return reserved funds to balance. Returns False if hold was already captured or released"""
+
+    with transaction.atomic():
+        released = BalanceHold.objects.filter(
+            id=hold.id,
+            status=BalanceHoldStatus.HELD
+        ).update(
+            status=BalanceHoldStatus.RELEASED,
+            resolution_time=timezone.now()
+        )
+        if not released:
+            return False
+        _apply_balance_change(
+            hold.amount,
+            _release_reason(hold),
+            bank_account_id=hold.bank_account_id,
+            tack_id=hold.tack_id,
+            check_funds=False
+        )
+    hold.status = BalanceHoldStatus.RELEASED
+    return True
+
+
+def release_tack_hold(tack) -> bool:
+    hold = get_tack_hold(tack)
+    return release_hold(hold) if hold else False
+
+
+def capture_tack_hold(tack) -> BalanceHold | None:
+    hold = get_tack_hold(tack)
+    return hold if hold and capture_hold(hold) else None
+
+
+def release_expired_holds(batch_size: int = RELEASE_BATCH_SIZE) -> int:
+    """
+    Release holds of Tacks that were cancelled, deleted or deactivated without being accepted
+    in BALANCE_HOLD_TTL. Withdraw holds are resolved by payment.services.reconcile_withdraw_holds.
+    Balance of every BankAccount is changed with one UPDATE per batch.
+    Returns number of released holds
+    """
+
+    now = timezone.now()
+    with transaction.atomic():
+        holds = list(
+            BalanceHold.objects.select_for_update(
+                skip_locked=True,
+                of=("self",)
+            ).filter(
+                status=BalanceHoldStatus.HELD,
+                reason=BalanceEntryReason.TACK_PAYMENT
+            ).filter(
+                Q(tack__isnull=True) |
+                Q(tack__is_canceled=True) |
+                Q(
+                    expiration_time__lte=now,
+                    tack__is_active=False,
+                    tack__status__in=(TackStatus.CREATED, TackStatus.ACTIVE)
+                )
+            ).order_by("id")[:batch_size]
+        )
+        if not holds:
+            return 0
+        BalanceHold.objects.filter(
+            id__in=[hold.id for hold in holds]
+        ).update(
+            status=BalanceHoldStatus.RELEASED,
+            resolution_time=now
+        )
+
+        holds_by_bank_account = defaultdict(list)
+        for hold in holds:
+            holds_by_bank_account[hold.bank_account_id].append(hold)
+        entries = []
+        for bank_account_id, account_holds in holds_by_bank_account.items():
+            total_amount = sum(hold.amount for hold in account_holds)
+            _, user_id, balance = _update_balance(total_amount, bank_account_id=bank_account_id, check_funds=False)
+            _send_balance_update(user_id, bank_account_id, balance)
+            # balance after every release is restored from the final one
+            balance -= total_amount
+            for hold in account_holds:
+                balance += hold.amount
+                entries.append(BalanceEntry(
+                    bank_account_id=bank_account_id,
+                    amount=hold.amount,
+                    balance_after=balance,
+                    reason=_release_reason(hold),
+                    tack_id=hold.tack_id
+                ))
+        BalanceEntry.objects.bulk_create(entries)
+
+    logger.info(f"Released {len(holds)} expired balance holds")
+    return len(holds)
+
+
+def _release_reason(hold: BalanceHold) -> BalanceEntryReason:
+    if hold.reason == BalanceEntryReason.TACK_PAYMENT and hold.tack_id:
+        return BalanceEntryReason.TACK_REFUND
+    return BalanceEntryReason.HOLD_RELEASE
+
+
+def _apply_balance_change(
+        amount: int,
+        reason: BalanceEntryReason,
+        user_id: int = None,
+        bank_account_id: int = None,
+        idempotency_key: str = None,
+        tack_id: int = None,
+        payment_transaction=None,
+        check_funds: bool = True
+) -> BalanceEntry:
+    with transaction.atomic():
+        bank_account_id, user_id, balance = _update_balance(
+            amount,
+            user_id=user_id,
+            bank_account_id=bank_account_id,
+            check_funds=check_funds
+        )
+        entry = BalanceEntry.objects.create(
+            bank_account_id=bank_account_id,
+            amount=amount,
+            balance_after=balance,
+            reason=reason,
+            idempotency_key=idempotency_key,
+            tack_id=tack_id,
+            transaction=payment_transaction
+        )
+    logger.info(f"Balance of User {user_id} changed by {amount} ({reason}): {balance}")
+    _send_balance_update(user_id, bank_account_id, balance)
+    return entry
+
+
+def _update_balance(
+        amount: int,
+        user_id: int = None,
+        bank_account_id: int = None,
+        check_funds: bool = True
+) -> tuple[int, int, int]:
+    """Add amount to balance of BankAccount found by user_id or bank_account_id. Returns its id, user_id and new balance"""
+
+    lookup_field, lookup_value = ("id", bank_account_id) if bank_account_id else ("user_id", user_id)
+    sql = f"UPDATE {BankAccount._meta.db_table} SET usd_balance = usd_balance + %s WHERE {lookup_field} = %s"
+    params = [amount, lookup_value]
+    if check_funds and amount < 0:
+        sql += " AND usd_balance + %s >= 0"
+        params.append(amount)
+    sql += " RETURNING id, user_id, usd_balance"
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        if check_funds and BankAccount.objects.filter(**{lookup_field: lookup_value}).exists():
+            raise InsufficientFundsError(
+                error="Px2",
+                message="Not enough money",
+                status=400
+            )
+        raise BankAccount.DoesNotExist(f"Bank account with {lookup_field} {lookup_value} is not found")
+    return row
+
+
+def _send_balance_update(user_id: int, bank_account_id: int, balance: int):
+    ws_sender.send_message(
+        f"user_{user_id}",
+        'balance.update',
+        {"id": bank_account_id, "usd_balance": balance})
@@ -1,9 +1,31 @@
 import logging
+import threading
+import time
 
 import dwollav2
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from tackapp.settings import DWOLLA_APP_KEY, DWOLLA_APP_SECRET
 
+logger = logging.getLogger("payments")
+
+# (connect, read) seconds
+DWOLLA_TIMEOUT = (3.05, 15)
+DWOLLA_POOL_SIZE = 10
+# app token is refreshed this number of seconds before it expires
+DWOLLA_TOKEN_EXPIRATION_MARGIN = 60
+
+# POST creates transfers and funding sources so only connection errors are retried for it
+dwolla_retries = Retry(
+    total=2,
+    read=1,
+    backoff_factor=0.3,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=("GET",),
+    raise_on_status=False
+)
+
 dwtoken = None
 
 
@@ -16,6 +38,35 @@ dwolla_client = dwollav2.Client(
     key=DWOLLA_APP_KEY,
     secret=DWOLLA_APP_SECRET,
     # environment='sandbox',  # defaults to 'production'
-    # requests={'timeout': 0.001},
+    requests={'timeout': DWOLLA_TIMEOUT},
     on_grant=lambda t: save_dwolla_token(t)
 )
+
+
+def mount_dwolla_pool(session):
+    session.mount("https://", HTTPAdapter(pool_maxsize=DWOLLA_POOL_SIZE, max_retries=dwolla_retries))
+
+
+# dwollav2 does not expose its requests sessions, pooling and retries are set on them directly
+mount_dwolla_pool(dwolla_client._session)
+
+_token = None
+_token_expiration = 0.0
+_token_lock = threading.Lock()
+
+
+def get_dwolla_token():
+    """
+    Dwolla app token shared by all threads of the process until it expires.
+    Its session keeps connections to Dwolla API alive between requests
+    """
+
+    global _token, _token_expiration
+    with _token_lock:
+        if _token is None or time.monotonic() >= _token_expiration:
+            token = dwolla_client.Auth.client()
+            mount_dwolla_pool(token._session)
+            _token_expiration = time.monotonic() + (token.expires_in or 0) - DWOLLA_TOKEN_EXPIRATION_MARGIN
+            _token = token
+            logger.info(f"Dwolla app token is refreshed, expires in {token.expires_in} s")
+        return _token
@@ -0,0 +1,169 @@
+import hashlib
+import hmac
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction, DatabaseError
+from django.utils import timezone
+
+from dwolla_service.models import DwollaEvent, DwollaWebhookMessage
+from payment.models import Transaction
+from tackapp.settings import DWOLLA_WEBHOOK_SECRET
+
+
+logger = logging.getLogger("payments")
+
+DWOLLA_WEBHOOK_BATCH_SIZE = 500
+# processed messages are kept this long for debugging
+DWOLLA_WEBHOOK_RETENTION = timedelta(days=7)
+TRANSFER_COMPLETED_TOPICS = ("transfer_completed", "customer_transfer_completed", "bank_transfer_completed")
+FUNDING_SOURCE_TOPIC_PREFIX = "customer_funding_source_"
+
+
+def is_valid_dwolla_signature(body: bytes, signature: str | None) -> bool:
+    """Check X-Request-Signature-SHA-256 header, it is HMAC-SHA256 of raw body with webhook secret"""
+
+    if not DWOLLA_WEBHOOK_SECRET or not signature:
+        return False
+    expected = hmac.new(DWOLLA_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def enqueue_dwolla_webhook(payload: dict):
+    """Store raw webhook and process it after the response is sent"""
+
+    # local import: payment.tasks imports this module
+    from payment.tasks import process_dwolla_webhooks_task
+
+    DwollaWebhookMessage.objects.create(payload=payload)
+    transaction.on_commit(process_dwolla_webhooks_task.delay)
+
+
+def get_resource_id(payload: dict) -> str | None:
+    href = ((payload.get("_links") or {}).get("resource") or {}).get("href")
+    return href.split("/")[-1] if href else None
+
+
+def build_dwolla_event(payload: dict) -> DwollaEvent:
+    links = payload.get("_links") or {}
+    return DwollaEvent(
+        event_id=uuid.UUID(payload["id"]),
+        topic=payload.get("topic") or "",
+        timestamp=payload.get("timestamp"),
+        self_res=links.get("self"),
+        account=links.get("account"),
+        resource=links.get("resource"),
+        customer=links.get("customer"),
+        created=payload.get("created"),
+    )
+
+
+def save_dwolla_events(events: list[DwollaEvent], messages_by_event: dict) -> list[DwollaEvent]:
+    """
+    Insert events with one query. If the batch fails, events are inserted one by one
+    and messages of events that can't be saved are marked with the error. Returns saved events
+    """
+
+    try:
+        with transaction.atomic():
+            DwollaEvent.objects.bulk_create(events, ignore_conflicts=True)
+        return events
+    except (DatabaseError, ValidationError) as e:
+        logger.warning(f"Dwolla events batch is not saved, saving one by one: {e!r}")
+
+    saved = []
+    for event in events:
+        try:
+            with transaction.atomic():
+                DwollaEvent.objects.bulk_create([event], ignore_conflicts=True)
+        except (DatabaseError, ValidationError) as e:
+            for message in messages_by_event[event.event_id]:
+                message.error = f"Invalid event: {e!r}"
+                logger.error(f"Dwolla webhook message {message.id}: {message.error}")
+            continue
+        saved.append(event)
+    return saved
+
+
+def process_dwolla_webhooks(batch_size: int = DWOLLA_WEBHOOK_BATCH_SIZE) -> int:
+    """
+    Handle a batch of queued webhooks in one transaction.
+    Events are deduplicated by unique DwollaEvent.event_id, completed transfers are marked
+    succeeded with one UPDATE. Messages that can't be handled are marked processed with
+    their error, so they don't block the queue. Returns number of processed messages
+    """
+
+    # local import: payment.tasks imports this module
+    from payment.tasks import sync_dwolla_funding_source_task
+
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            DwollaWebhookMessage.objects.select_for_update(
+                skip_locked=True
+            ).filter(
+                process_time__isnull=True
+            ).order_by("id")[:batch_size]
+        )
+        if not messages:
+            return 0
+
+        events = {}
+        messages_by_event = defaultdict(list)
+        for message in messages:
+            try:
+                event = build_dwolla_event(message.payload)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                message.error = f"Invalid payload: {e!r}"
+                logger.error(f"Dwolla webhook message {message.id}: {message.error}")
+                continue
+            events.setdefault(event.event_id, (event, message.payload))
+            messages_by_event[event.event_id].append(message)
+
+        seen = set(DwollaEvent.objects.filter(event_id__in=events).values_list("event_id", flat=True))
+        new_events = [(event, payload) for event_id, (event, payload) in events.items() if event_id not in seen]
+        saved = {
+            event.event_id
+            for event in save_dwolla_events([event for event, _ in new_events], messages_by_event)
+        }
+        new_events = [(event, payload) for event, payload in new_events if event.event_id in saved]
+
+        transfer_ids, funding_source_ids = set(), set()
+        for event, payload in new_events:
+            resource_id = get_resource_id(payload)
+            if not resource_id:
+                continue
+            if event.topic in TRANSFER_COMPLETED_TOPICS:
+                transfer_ids.add(resource_id)
+            elif event.topic.startswith(FUNDING_SOURCE_TOPIC_PREFIX):
+                funding_source_ids.add(resource_id)
+
+        if transfer_ids:
+            Transaction.objects.filter(
+                transaction_id__in=transfer_ids,
+                is_succeeded=False
+            ).update(
+                is_succeeded=True
+            )
+        for funding_source_id in funding_source_ids:
+            transaction.on_commit(lambda fs_id=funding_source_id: sync_dwolla_funding_source_task.delay(fs_id))
+
+        for message in messages:
+            message.process_time = now
+        DwollaWebhookMessage.objects.bulk_update(messages, ("process_time", "error"))
+
+    logger.info(
+        f"Processed {len(messages)} Dwolla webhooks: {len(new_events)} new events, "
+        f"{len(transfer_ids)} completed transfers"
+    )
+    return len(messages)
+
+
+def delete_processed_dwolla_webhooks() -> int:
+    deleted, _ = DwollaWebhookMessage.objects.filter(
+        process_time__lt=timezone.now() - DWOLLA_WEBHOOK_RETENTION
+    ).delete()
+    return deleted
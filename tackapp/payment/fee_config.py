@@ -0,0 +1,126 @@
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from core.choices import PaymentService
+from payment.models import Fee, ServiceFee
+
+
+FEE_CONFIG_VERSION_KEY = "fee_config_version"
+# how often process checks shared version of its snapshot, seconds
+FEE_CONFIG_CHECK_INTERVAL = 5
+
+
+@dataclass(frozen=True)
+class FeeConfig:
+    """Snapshot of the latest Fee and ServiceFee"""
+
+    fee_percent_stripe: Decimal
+    fee_min_stripe: int
+    fee_max_stripe: int
+    fee_percent_dwolla: Decimal
+    fee_min_dwolla: int
+    fee_max_dwolla: int
+    max_loss: int
+    stripe_percent: Decimal
+    stripe_const_sum: int
+    dwolla_percent: Decimal
+    dwolla_const_sum: int
+
+
+# (snapshot, version, monotonic time of the last version check)
+_cached: tuple[FeeConfig, str, float] | None = None
+
+
+def get_fee_config() -> FeeConfig:
+    """
+    Per process FeeConfig snapshot.
+    Reloaded from DB only when shared version in cache is changed by invalidate_fee_config
+    """
+
+    global _cached
+    now = time.monotonic()
+    if _cached is not None and now - _cached[2] < FEE_CONFIG_CHECK_INTERVAL:
+        return _cached[0]
+
+    version = cache.get(FEE_CONFIG_VERSION_KEY)
+    if version is None:
+        cache.add(FEE_CONFIG_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(FEE_CONFIG_VERSION_KEY)
+    if _cached is not None and _cached[1] == version:
+        snapshot = _cached[0]
+    else:
+        snapshot = load_fee_config()
+    _cached = (snapshot, version, now)
+    return snapshot
+
+
+def load_fee_config() -> FeeConfig:
+    # model defaults are used until Fee and ServiceFee are created in admin
+    fee = Fee.objects.last() or Fee()
+    service_fee = ServiceFee.objects.last() or ServiceFee()
+    return FeeConfig(
+        fee_percent_stripe=Decimal(str(fee.fee_percent_stripe)),
+        fee_min_stripe=fee.fee_min_stripe,
+        fee_max_stripe=fee.fee_max_stripe,
+        fee_percent_dwolla=Decimal(str(fee.fee_percent_dwolla)),
+        fee_min_dwolla=fee.fee_min_dwolla,
+        fee_max_dwolla=fee.fee_max_dwolla,
+        max_loss=fee.max_loss,
+        stripe_percent=Decimal(str(service_fee.stripe_percent)),
+        stripe_const_sum=service_fee.stripe_const_sum,
+        dwolla_percent=Decimal(str(service_fee.dwolla_percent)),
+        dwolla_const_sum=service_fee.dwolla_const_sum,
+    )
+
+
+def invalidate_fee_config():
+    """Make every process reload FeeConfig on its next version check"""
+
+    global _cached
+    cache.set(FEE_CONFIG_VERSION_KEY, uuid4().hex, None)
+    _cached = None
+
+
+def amount_with_fees(fees: FeeConfig, amount: int, service: PaymentService) -> int:
+    """Amount with Fee that we charge users, amounts are in cents"""
+
+    match service:
+        # digital wallets are charged through Stripe
+        case PaymentService.STRIPE | PaymentService.DIGITAL_WALLET:
+            abs_fee = amount * fees.fee_percent_stripe / 100
+            if abs_fee < fees.fee_min_stripe:
+                abs_fee = fees.fee_min_stripe
+            elif abs_fee > fees.fee_max_stripe and fees.fee_max_stripe:
+                abs_fee = fees.fee_max_stripe
+        case PaymentService.DWOLLA:
+            abs_fee = amount * fees.fee_percent_dwolla / 100
+            if abs_fee < fees.fee_min_dwolla:
+                abs_fee = fees.fee_min_dwolla
+            elif abs_fee > fees.fee_max_dwolla and fees.fee_max_dwolla:
+                abs_fee = fees.fee_max_dwolla
+        case _:
+            raise ValueError(f"Unknown payment service: {service}")
+    return int(amount + abs_fee)
+
+
+def service_fee_amount(fees: FeeConfig, amount: int, service: PaymentService) -> int:
+    """Fee that payment service charges us"""
+
+    match service:
+        case PaymentService.DWOLLA:
+            return int(amount * fees.dwolla_percent / 100 + fees.dwolla_const_sum)
+        case PaymentService.STRIPE | PaymentService.DIGITAL_WALLET:
+            return int(amount * fees.stripe_percent / 100 + fees.stripe_const_sum)
+        case _:
+            raise ValueError(f"Unknown payment service: {service}")
+
+
+def transaction_loss(fees: FeeConfig, amount: int, service: PaymentService) -> int:
+    """Our Fee minus payment service fee, negative when we lose money"""
+
+    charged_amount = amount_with_fees(fees, amount, service)
+    return charged_amount - amount - service_fee_amount(fees, charged_amount, service)
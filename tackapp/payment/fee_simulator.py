@@ -0,0 +1,99 @@
+import itertools
+import math
+from collections import defaultdict
+from dataclasses import replace, fields
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from core.choices import PaymentService
+from payment.fee_config import FeeConfig, transaction_loss
+from payment.models import Transaction
+
+
+SIMULATION_CHUNK_SIZE = 10_000
+MAX_SIMULATION_CANDIDATES = 1000
+FEE_CONFIG_FIELDS = {field.name: field.type for field in fields(FeeConfig)}
+
+
+def get_amount_histogram(since: datetime = None, chunk_size: int = SIMULATION_CHUNK_SIZE) -> list[tuple]:
+    """
+    (service_name, action_type, amount_requested, count) of Transactions.
+    Grouped in DB and streamed in chunks, so millions of Transactions become a few thousand rows
+    """
+
+    transactions = Transaction.objects.all()
+    if since:
+        transactions = transactions.filter(creation_time__gte=since)
+    return list(
+        transactions.values_list(
+            "service_name",
+            "action_type",
+            "amount_requested"
+        ).annotate(
+            count=Count("id")
+        ).order_by().iterator(chunk_size=chunk_size)
+    )
+
+
+def get_actual_fee_difference(since: datetime = None) -> dict[tuple[str, str], int]:
+    transactions = Transaction.objects.all()
+    if since:
+        transactions = transactions.filter(creation_time__gte=since)
+    return {
+        (service_name, action_type): total or 0
+        for service_name, action_type, total in transactions.values_list(
+            "service_name",
+            "action_type"
+        ).annotate(
+            total=Sum("fee_difference")
+        ).order_by()
+    }
+
+
+def build_candidates(base: FeeConfig, grid: dict[str, list]) -> list[FeeConfig]:
+    """FeeConfig for every combination of grid values, not listed fields are taken from base"""
+
+    values_by_name = {}
+    for name, values in grid.items():
+        if name not in FEE_CONFIG_FIELDS:
+            raise ValueError(f"Unknown fee parameter: {name}")
+        try:
+            values_by_name[name] = [
+                Decimal(str(value)) if FEE_CONFIG_FIELDS[name] is Decimal else int(value)
+                for value in values
+            ]
+        except (ArithmeticError, TypeError, ValueError):
+            raise ValueError(f"Invalid value of fee parameter: {name}")
+    candidates_count = math.prod(len(values) for values in values_by_name.values())
+    if candidates_count > MAX_SIMULATION_CANDIDATES:
+        raise ValueError(f"Too many fee candidates: {candidates_count} > {MAX_SIMULATION_CANDIDATES}")
+    names = list(values_by_name)
+    candidates = [
+        replace(base, **dict(zip(names, values)))
+        for values in itertools.product(*values_by_name.values())
+    ]
+    return candidates
+
+
+def simulate_fee_difference(candidates: list[FeeConfig], histogram: list[tuple]) -> list[dict]:
+    """
+    Projected fee_difference of Transaction history for every FeeConfig candidate.
+    Loss is calculated once per distinct amount and multiplied by the number of its Transactions.
+    Transactions of services without pricing are skipped
+    """
+
+    results = []
+    for fees in candidates:
+        totals = defaultdict(int)
+        for service_name, action_type, amount, count in histogram:
+            if service_name not in PaymentService.values:
+                continue
+            totals[(service_name, action_type)] += transaction_loss(fees, amount, service_name) * count
+        results.append({
+            "fees": fees,
+            "total": sum(totals.values()),
+            "by_type": dict(totals),
+        })
+    return results
@@ -0,0 +1,177 @@
+import logging
+
+import dwollav2
+import requests
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from payment.dwolla_service import get_dwolla_token
+from payment.models import BankAccount, UserPaymentMethods
+from payment.services import payment_api_executor
+from user.models import User
+
+
+logger = logging.getLogger("payments")
+
+FUNDING_SOURCE_FIELDS = (
+    "name",
+    "bank_name",
+    "type",
+    "bank_account_type",
+    "status",
+    "channels",
+    "dwolla_created",
+    "is_removed",
+    "synced_time",
+)
+RECONCILE_BATCH_SIZE = 100
+
+
+def get_funding_source_values(funding_source: dict) -> dict:
+    """UserPaymentMethods mirror fields of Dwolla funding source"""
+
+    return {
+        "name": funding_source.get("name") or "",
+        "bank_name": funding_source.get("bankName") or "",
+        "type": funding_source.get("type") or "",
+        "bank_account_type": funding_source.get("bankAccountType") or "",
+        "status": funding_source.get("status") or "",
+        "channels": funding_source.get("channels") or [],
+        "dwolla_created": funding_source.get("created") or "",
+        "is_removed": bool(funding_source.get("removed")),
+    }
+
+
+def to_funding_source(upm: UserPaymentMethods) -> dict:
+    """Dwolla shaped funding source of UserPaymentMethods mirror"""
+
+    return {
+        "id": upm.dwolla_payment_method,
+        "name": upm.name,
+        "bankName": upm.bank_name,
+        "type": upm.type,
+        "bankAccountType": upm.bank_account_type,
+        "status": upm.status,
+        "channels": upm.channels,
+        "created": upm.dwolla_created,
+        "removed": upm.is_removed,
+        "is_primary": upm.is_primary,
+    }
+
+
+def fetch_dwolla_funding_sources(dwolla_user_id: str) -> list[dict]:
+    """All funding sources of Dwolla customer, removed ones included"""
+
+    token = get_dwolla_token()
+    response = token.get(f"customers/{dwolla_user_id}/funding-sources")
+    return response.body["_embedded"]["funding-sources"]
+
+
+def sync_dwolla_funding_sources(bank_account: BankAccount, funding_sources: list[dict] = None) -> int:
+    """
+    Mirror funding sources of BankAccount Dwolla customer into UserPaymentMethods.
+    Funding sources that Dwolla does not return anymore are marked removed.
+    Returns number of created and updated UserPaymentMethods
+    """
+
+    if funding_sources is None:
+        funding_sources = fetch_dwolla_funding_sources(bank_account.dwolla_user)
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            upm.dwolla_payment_method: upm
+            for upm in UserPaymentMethods.objects.select_for_update().filter(bank_account=bank_account)
+        }
+        to_create, to_update = [], []
+        for funding_source in funding_sources:
+            values = get_funding_source_values(funding_source) | {"synced_time": now}
+            upm = existing.pop(funding_source["id"], None)
+            if upm is None:
+                if values["is_removed"]:
+                    continue
+                to_create.append(
+                    UserPaymentMethods(bank_account=bank_account, dwolla_payment_method=funding_source["id"], **values)
+                )
+            else:
+                for field, value in values.items():
+                    setattr(upm, field, value)
+                to_update.append(upm)
+        for upm in existing.values():
+            upm.is_removed = True
+            upm.synced_time = now
+            to_update.append(upm)
+
+        UserPaymentMethods.objects.bulk_create(to_create)
+        UserPaymentMethods.objects.bulk_update(to_update, FUNDING_SOURCE_FIELDS)
+        BankAccount.objects.filter(id=bank_account.id).update(funding_sources_synced_time=now)
+    bank_account.funding_sources_synced_time = now
+    return len(to_create) + len(to_update)
+
+
+def sync_dwolla_funding_source(funding_source_id: str):
+    """Refresh one UserPaymentMethods mirror, used by Dwolla customer_funding_source_* webhooks"""
+
+    token = get_dwolla_token()
+    funding_source = token.get(f"funding-sources/{funding_source_id}").body
+    values = get_funding_source_values(funding_source) | {"synced_time": timezone.now()}
+
+    updated = UserPaymentMethods.objects.filter(dwolla_payment_method=funding_source_id).update(**values)
+    if updated or values["is_removed"]:
+        return
+
+    # funding source attached outside of our link flow
+    dwolla_user_id = funding_source["_links"]["customer"]["href"].split("/")[-1]
+    try:
+        bank_account = BankAccount.objects.get(dwolla_user=dwolla_user_id)
+    except BankAccount.DoesNotExist:
+        logger.error(f"Bank Account of {dwolla_user_id} is not found")
+        return
+    UserPaymentMethods.objects.create(bank_account=bank_account, dwolla_payment_method=funding_source_id, **values)
+
+
+def get_withdraw_methods(user: User) -> list[dict]:
+    """Dwolla shaped funding sources of User from the local mirror"""
+
+    upms = list(UserPaymentMethods.objects.filter(bank_account__user=user, is_removed=False).order_by("id"))
+    never_synced = {upm.bank_account_id for upm in upms if upm.synced_time is None}
+    # mirror of Dwolla customer is filled once from Dwolla, e.g. for banks attached before it existed
+    bank_accounts = BankAccount.objects.filter(
+        Q(id__in=never_synced) |
+        Q(user=user, funding_sources_synced_time__isnull=True, dwolla_user__isnull=False)
+    ).exclude(dwolla_user="")
+    synced = False
+    for bank_account in bank_accounts:
+        sync_dwolla_funding_sources(bank_account)
+        synced = True
+    if synced:
+        upms = list(UserPaymentMethods.objects.filter(bank_account__user=user, is_removed=False).order_by("id"))
+    return [to_funding_source(upm) for upm in upms]
+
+
+def reconcile_dwolla_funding_sources(batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+    """
+    Resync mirrors of every BankAccount with Dwolla customer.
+    Dwolla requests of a batch are made concurrently, DB writes stay in this thread.
+    Returns number of synced BankAccounts
+    """
+
+    bank_accounts = BankAccount.objects.exclude(dwolla_user__isnull=True).exclude(dwolla_user="").order_by("id")
+    synced = 0
+    last_id = 0
+    while batch := list(bank_accounts.filter(id__gt=last_id)[:batch_size]):
+        last_id = batch[-1].id
+        futures = [
+            (bank_account, payment_api_executor.submit(fetch_dwolla_funding_sources, bank_account.dwolla_user))
+            for bank_account in batch
+        ]
+        for bank_account, future in futures:
+            try:
+                sync_dwolla_funding_sources(bank_account, future.result())
+            except (dwollav2.Error, requests.RequestException, KeyError) as e:
+                logger.warning(f"Funding sources of Bank Account {bank_account.id} are not synced: {e}")
+                continue
+            synced += 1
+    logger.info(f"Synced funding sources of {synced} Bank Accounts")
+    return synced
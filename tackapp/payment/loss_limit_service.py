@@ -0,0 +1,124 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from payment.models import TransactionLossBucket
+from payment.services import get_loss_limited_transactions
+from user.models import User
+
+
+logger = logging.getLogger("payments")
+
+LOSS_WINDOW = timedelta(hours=24)
+LOSS_BUCKET = timedelta(minutes=10)
+# buckets younger than this may hold losses reserved for Transactions that are being created
+LOSS_CORRECTION_DELAY = timedelta(minutes=10)
+
+
+def get_bucket_start(time: datetime) -> datetime:
+    return datetime.fromtimestamp(
+        time.timestamp() // LOSS_BUCKET.total_seconds() * LOSS_BUCKET.total_seconds(),
+        tz=time.tzinfo
+    )
+
+
+def get_window_start(now: datetime) -> datetime:
+    """Start of the first bucket counted in the 24h window"""
+
+    return get_bucket_start(now - LOSS_WINDOW)
+
+
+def get_sum24h_loss(user_id: int) -> int:
+    """Sum of fee_difference of User in the last 24h (up to one bucket more), negative when we lose money"""
+
+    return TransactionLossBucket.objects.filter(
+        user=user_id,
+        bucket_start__gte=get_window_start(timezone.now())
+    ).aggregate(
+        sum24h=Sum("fee_difference")
+    )["sum24h"] or 0
+
+
+def reserve_transaction_loss(user_id: int, loss: int, max_loss: int) -> bool:
+    """
+    Add loss of the new Transaction to the 24h window if the limit is not reached.
+    User row is locked so concurrent deposits see the losses of each other.
+    Returns False if the limit is reached
+    """
+
+    with transaction.atomic():
+        User.objects.select_for_update().filter(id=user_id).exists()
+        if -(get_sum24h_loss(user_id) + loss) >= max_loss:
+            return False
+        add_transaction_loss(user_id, loss)
+    return True
+
+
+def release_transaction_loss(user_id: int, loss: int):
+    """Return loss reserved for Transaction that was not created"""
+
+    add_transaction_loss(user_id, -loss)
+
+
+def add_transaction_loss(user_id: int, loss: int, time: datetime = None):
+    bucket_start = get_bucket_start(time or timezone.now())
+    updated = TransactionLossBucket.objects.filter(
+        user=user_id,
+        bucket_start=bucket_start
+    ).update(
+        fee_difference=F("fee_difference") + loss
+    )
+    if not updated:
+        TransactionLossBucket.objects.create(user_id=user_id, bucket_start=bucket_start, fee_difference=loss)
+
+
+def correct_loss_buckets() -> int:
+    """
+    Rebuild buckets of the 24h window from Transactions and delete older buckets.
+    Buckets of the last LOSS_CORRECTION_DELAY are not touched.
+    Returns number of corrected buckets
+    """
+
+    now = timezone.now()
+    window_start = get_window_start(now)
+    correction_end = get_bucket_start(now - LOSS_CORRECTION_DELAY)
+
+    actual = defaultdict(int)
+    for user_id, creation_time, loss in get_loss_limited_transactions(
+        since=window_start
+    ).filter(
+        creation_time__lt=correction_end
+    ).values_list(
+        "user_id",
+        "creation_time",
+        "loss"
+    ).iterator():
+        actual[(user_id, get_bucket_start(creation_time))] += loss
+
+    with transaction.atomic():
+        TransactionLossBucket.objects.filter(bucket_start__lt=window_start).delete()
+        buckets = TransactionLossBucket.objects.select_for_update().filter(
+            bucket_start__gte=window_start,
+            bucket_start__lt=correction_end
+        )
+        changed = []
+        for bucket in buckets:
+            fee_difference = actual.pop((bucket.user_id, bucket.bucket_start), 0)
+            if bucket.fee_difference != fee_difference:
+                bucket.fee_difference = fee_difference
+                changed.append(bucket)
+        TransactionLossBucket.objects.bulk_update(changed, ("fee_difference",))
+        missing = TransactionLossBucket.objects.bulk_create(
+            TransactionLossBucket(user_id=user_id, bucket_start=bucket_start, fee_difference=fee_difference)
+            for (user_id, bucket_start), fee_difference in actual.items()
+            if fee_difference
+        )
+        corrected = len(changed) + len(missing)
+
+    if corrected:
+        logger.warning(f"Corrected {corrected} transaction loss buckets")
+    return corrected
@@ -0,0 +1,43 @@
+"""Module for the reconcile_balances management command.
+
+Compares usd_balance of every BankAccount with the sum of its BalanceEntry amounts
+and fails if any of them differ.
+
+Invoke like so:
+    python manage.py reconcile_balances
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum, F
+from django.db.models.functions import Coalesce
+
+from payment.models import BankAccount
+
+
+class Command(BaseCommand):
+    """Check that BankAccount balances match the BalanceEntry ledger."""
+
+    help = "Check that BankAccount balances match the BalanceEntry ledger."
+
+    def handle(self, *args, **options):
+        drifted = BankAccount.objects.annotate(
+            ledger_balance=Coalesce(Sum("balanceentry__amount"), 0)
+        ).exclude(
+            usd_balance=F("ledger_balance")
+        ).values_list(
+            "id",
+            "user_id",
+            "usd_balance",
+            "ledger_balance"
+        )
+
+        count = 0
+        for bank_account_id, user_id, usd_balance, ledger_balance in drifted.iterator():
+            count += 1
+            self.stdout.write(self.style.ERROR(
+                f"BankAccount {bank_account_id} of User {user_id}: "
+                f"balance {usd_balance}, ledger {ledger_balance}"
+            ))
+
+        if count:
+            raise CommandError(f"{count} balances do not match the ledger")
+        self.stdout.write(self.style.SUCCESS("All balances match the ledger"))
@@ -0,0 +1,65 @@
+"""Module for the simulate_fees management command.
+
+Projects fee_difference of the Transaction history for candidate Fee/ServiceFee values.
+Parameters that are not set are taken from the current Fee and ServiceFee.
+
+Invoke like so:
+    python manage.py simulate_fees --set fee_percent_stripe=2.5,3,3.5 --set fee_min_stripe=25,50
+    python manage.py simulate_fees --days 30 --top 5
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payment.fee_config import get_fee_config
+from payment.fee_simulator import get_amount_histogram, build_candidates, simulate_fee_difference, \
+    get_actual_fee_difference
+
+
+class Command(BaseCommand):
+    """Project fee_difference of Transaction history for candidate fees."""
+
+    help = "Project fee_difference of Transaction history for candidate fees."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--set",
+            action="append",
+            default=[],
+            metavar="FIELD=V1,V2",
+            help="candidate values of Fee/ServiceFee field, may be repeated",
+        )
+        parser.add_argument("--days", type=int, help="only Transactions of the last days")
+        parser.add_argument("--top", type=int, default=10, help="number of best candidates to print")
+
+    def handle(self, *args, **options):
+        grid = {}
+        for item in options["set"]:
+            name, _, values = item.partition("=")
+            grid[name] = [value for value in values.split(",") if value]
+        since = timezone.now() - timedelta(days=options["days"]) if options["days"] else None
+
+        try:
+            candidates = build_candidates(get_fee_config(), grid)
+        except ValueError as e:
+            raise CommandError(e)
+
+        start = time.monotonic()
+        histogram = get_amount_histogram(since=since)
+        loaded = time.monotonic()
+        results = simulate_fee_difference(candidates, histogram)
+        finished = time.monotonic()
+
+        self.stdout.write(
+            f"{sum(row[3] for row in histogram)} Transactions, {len(histogram)} distinct amounts "
+            f"loaded in {(loaded - start) * 1000:.0f} ms, "
+            f"{len(candidates)} candidates simulated in {(finished - loaded) * 1000:.0f} ms"
+        )
+        actual = get_actual_fee_difference(since=since)
+        self.stdout.write(f"Actual fee_difference: {sum(actual.values())}")
+        for result in sorted(results, key=lambda r: r["total"], reverse=True)[:options["top"]]:
+            params = ", ".join(f"{name}={getattr(result['fees'], name)}" for name in grid) or "current fees"
+            by_type = ", ".join(f"{service}/{action}: {total}" for (service, action), total in result["by_type"].items())
+            self.stdout.write(f"{result['total']:>12} {params} ({by_type})")
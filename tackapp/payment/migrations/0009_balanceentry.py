@@ -0,0 +1,54 @@
+# Generated by Django 4.0.8 on 2026-10-18 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_opening_balances(apps, schema_editor):
+    BankAccount = apps.get_model("payment", "BankAccount")
+    BalanceEntry = apps.get_model("payment", "BalanceEntry")
+    BalanceEntry.objects.bulk_create(
+        (
+            BalanceEntry(
+                bank_account_id=bank_account_id,
+                amount=usd_balance,
+                balance_after=usd_balance,
+                reason="opening"
+            )
+            for bank_account_id, usd_balance in BankAccount.objects.exclude(
+                usd_balance=0
+            ).values_list("id", "usd_balance").iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tack', '0011_offer_offers_tack_active_idx_and_more'),
+        ('payment', '0008_transaction_paid_tack'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('balance_after', models.IntegerField()),
+                ('reason', models.CharField(choices=[('opening', 'Opening balance'), ('deposit', 'Deposit'), ('withdraw', 'Withdraw'), ('tack_payment', 'Tack payment'), ('tack_refund', 'Tack refund'), ('runner_payout', 'Runner payout'), ('admin', 'Admin adjustment')], max_length=16)),
+                ('idempotency_key', models.CharField(blank=True, default=None, max_length=64, null=True, unique=True)),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='payment.bankaccount')),
+                ('tack', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tack.tack')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='payment.transaction')),
+            ],
+            options={
+                'verbose_name': 'Balance entry',
+                'verbose_name_plural': 'Balance entries',
+                'db_table': 'balance_entries',
+            },
+        ),
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.0.8 on 2026-10-18 12:48
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Q
+import django.db.models.deletion
+
+
+def create_holds_of_paid_tacks(apps, schema_editor):
+    """
+    Tacks that were already charged from Tacker balance but not paid to Runner get a held BalanceHold.
+    Deleted Tacks were refunded on delete and get no hold
+    """
+
+    Tack = apps.get_model("tack", "Tack")
+    BalanceHold = apps.get_model("payment", "BalanceHold")
+    paid_tacks = Tack.objects.filter(
+        Q(status__in=("accepted", "in_progress", "waiting_review")) |
+        Q(status__in=("created", "active"), auto_accept=True),
+        is_active=True,
+        is_canceled=False,
+        is_paid=False,
+        tacker__bankaccount__isnull=False
+    ).values_list(
+        "id",
+        "price",
+        "creation_time",
+        "tacker__bankaccount__id"
+    )
+    BalanceHold.objects.bulk_create(
+        (
+            BalanceHold(
+                bank_account_id=bank_account_id,
+                amount=price,
+                reason="tack_payment",
+                tack_id=tack_id,
+                expiration_time=creation_time + timedelta(days=3)
+            )
+            for tack_id, price, creation_time, bank_account_id in paid_tacks.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tack', '0011_offer_offers_tack_active_idx_and_more'),
+        ('payment', '0009_balanceentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='balanceentry',
+            name='reason',
+            field=models.CharField(choices=[('opening', 'Opening balance'), ('deposit', 'Deposit'), ('withdraw', 'Withdraw'), ('tack_payment', 'Tack payment'), ('tack_refund', 'Tack refund'), ('runner_payout', 'Runner payout'), ('admin', 'Admin adjustment'), ('hold_release', 'Hold release')], max_length=16),
+        ),
+        migrations.CreateModel(
+            name='BalanceHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('reason', models.CharField(choices=[('opening', 'Opening balance'), ('deposit', 'Deposit'), ('withdraw', 'Withdraw'), ('tack_payment', 'Tack payment'), ('tack_refund', 'Tack refund'), ('runner_payout', 'Runner payout'), ('admin', 'Admin adjustment'), ('hold_release', 'Hold release')], max_length=16)),
+                ('status', models.CharField(choices=[('held', 'Held'), ('captured', 'Captured'), ('released', 'Released')], default='held', max_length=16)),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+                ('expiration_time', models.DateTimeField(blank=True, default=None, null=True)),
+                ('resolution_time', models.DateTimeField(blank=True, default=None, null=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='payment.bankaccount')),
+                ('tack', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tack.tack')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='payment.transaction')),
+            ],
+            options={
+                'verbose_name': 'Balance hold',
+                'verbose_name_plural': 'Balance holds',
+                'db_table': 'balance_holds',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='balancehold',
+            index=models.Index(condition=models.Q(('status', 'held')), fields=['expiration_time'], name='balance_holds_held_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='balancehold',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'held')), fields=('tack',), name='balance_holds_one_held_per_tack'),
+        ),
+        migrations.RunPython(create_holds_of_paid_tacks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.0.8 on 2026-10-18 12:52
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, F
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def fill_loss_buckets(apps, schema_editor):
+    """Buckets of the last 24h, same as payment.loss_limit_service.correct_loss_buckets builds"""
+
+    Transaction = apps.get_model("payment", "Transaction")
+    TransactionLossBucket = apps.get_model("payment", "TransactionLossBucket")
+    bucket_seconds = 600
+    losses = defaultdict(int)
+    for user_id, creation_time, loss in Transaction.objects.filter(
+        Q(service_name="stripe", is_succeeded=True) | Q(service_name="dwolla"),
+        creation_time__gt=timezone.now() - timedelta(hours=25)
+    ).values_list(
+        "user_id",
+        "creation_time",
+        F("amount_with_fees") - F("amount_requested") - F("service_fee")
+    ).iterator():
+        bucket_start = datetime.fromtimestamp(
+            creation_time.timestamp() // bucket_seconds * bucket_seconds,
+            tz=creation_time.tzinfo
+        )
+        losses[(user_id, bucket_start)] += loss
+    TransactionLossBucket.objects.bulk_create(
+        TransactionLossBucket(user_id=user_id, bucket_start=bucket_start, fee_difference=loss)
+        for (user_id, bucket_start), loss in losses.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payment', '0010_alter_balanceentry_reason_balancehold_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionLossBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('fee_difference', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Transaction loss bucket',
+                'verbose_name_plural': 'Transaction loss buckets',
+                'db_table': 'transaction_loss_buckets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='transactionlossbucket',
+            constraint=models.UniqueConstraint(fields=('user', 'bucket_start'), name='transaction_loss_buckets_user_bucket'),
+        ),
+        migrations.RunPython(fill_loss_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.0.8 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0011_transactionlossbucket_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='bank_account_type',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='bank_name',
+            field=models.CharField(blank=True, default='', max_length=256),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='channels',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='dwolla_created',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='is_removed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='name',
+            field=models.CharField(blank=True, default='', max_length=256),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='status',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='synced_time',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='userpaymentmethods',
+            name='type',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0012_userpaymentmethods_bank_account_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djstripe', '0011_alter_invoiceitem_tax_rates_and_more'),
+        ('payment', '0013_alter_transaction_transaction_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeWebhookQueueItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(db_index=True, max_length=255)),
+                ('event_type', models.CharField(max_length=250)),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+                ('processed_time', models.DateTimeField(blank=True, default=None, null=True)),
+                ('next_attempt_time', models.DateTimeField(blank=True, default=None, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('trigger', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='djstripe.webhookeventtrigger')),
+            ],
+            options={
+                'verbose_name': 'Stripe webhook queue item',
+                'verbose_name_plural': 'Stripe webhook queue',
+                'db_table': 'stripe_webhook_queue',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stripewebhookqueueitem',
+            index=models.Index(condition=models.Q(('processed_time__isnull', True)), fields=['id'], name='stripe_webhook_queue_pending'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0014_stripewebhookqueueitem_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankaccount',
+            name='funding_sources_synced_time',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+    ]
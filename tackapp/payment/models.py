@@ -2,7 +2,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.db.models import Q, UniqueConstraint
 
-from core.choices import PaymentService, PaymentAction
+from core.choices import PaymentService, PaymentAction, BalanceEntryReason, BalanceHoldStatus
 from djstripe.models import PaymentMethod as dsPaymentMethod
 
 from core.validators import percent_validator
@@ -20,6 +20,8 @@ class BankAccount(models.Model):
     stripe_user = models.CharField(max_length=64, null=True, blank=True, default=None)
     dwolla_user = models.CharField(max_length=64, null=True, blank=True, default=None)
     dwolla_access_token = models.CharField(max_length=128, null=True, blank=True, default=None)
+    # last sync of UserPaymentMethods mirror with Dwolla funding sources
+    funding_sources_synced_time = models.DateTimeField(null=True, blank=True, default=None)
 
     def __str__(self):
         return f"{str(self.user)}: {self.usd_balance / 100:.2f} $"
@@ -29,12 +31,79 @@ class BankAccount(models.Model):
         verbose_name_plural = "Bank Accounts"
 
 
+class BalanceEntry(models.Model):
+    """Append-only ledger of BankAccount balance changes. Sum of amounts equals usd_balance"""
+
+    bank_account = models.ForeignKey("payment.BankAccount", on_delete=models.CASCADE)
+    amount = models.IntegerField()
+    balance_after = models.IntegerField()
+    reason = models.CharField(max_length=16, choices=BalanceEntryReason.choices)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, default=None)
+    tack = models.ForeignKey("tack.Tack", null=True, blank=True, on_delete=models.SET_NULL)
+    transaction = models.ForeignKey("payment.Transaction", null=True, blank=True, on_delete=models.SET_NULL)
+    creation_time = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.bank_account_id}: {self.amount} ({self.reason})"
+
+    class Meta:
+        db_table = "balance_entries"
+        verbose_name = "Balance entry"
+        verbose_name_plural = "Balance entries"
+
+
+class BalanceHold(models.Model):
+    """Funds taken from BankAccount balance and reserved until they are captured or released"""
+
+    bank_account = models.ForeignKey("payment.BankAccount", on_delete=models.CASCADE)
+    amount = models.IntegerField()
+    reason = models.CharField(max_length=16, choices=BalanceEntryReason.choices)
+    status = models.CharField(max_length=16, choices=BalanceHoldStatus.choices, default=BalanceHoldStatus.HELD)
+    tack = models.ForeignKey("tack.Tack", null=True, blank=True, on_delete=models.SET_NULL)
+    transaction = models.ForeignKey("payment.Transaction", null=True, blank=True, on_delete=models.SET_NULL)
+    creation_time = models.DateTimeField(auto_now_add=True)
+    expiration_time = models.DateTimeField(null=True, blank=True, default=None)
+    resolution_time = models.DateTimeField(null=True, blank=True, default=None)
+
+    def __str__(self):
+        return f"{self.bank_account_id}: {self.amount} ({self.status})"
+
+    class Meta:
+        db_table = "balance_holds"
+        verbose_name = "Balance hold"
+        verbose_name_plural = "Balance holds"
+        constraints = [
+            UniqueConstraint(
+                fields=("tack",),
+                condition=Q(status=BalanceHoldStatus.HELD),
+                name="balance_holds_one_held_per_tack"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=("expiration_time",),
+                condition=Q(status=BalanceHoldStatus.HELD),
+                name="balance_holds_held_idx"
+            ),
+        ]
+
+
 class UserPaymentMethods(models.Model):
     bank_account = models.ForeignKey("payment.BankAccount", on_delete=models.CASCADE)
     dwolla_payment_method = models.CharField(max_length=64)
     plaid_account_id = models.CharField(max_length=128, null=True, blank=True, default=None)
     is_primary = models.BooleanField(default=False)
     dwolla_access_token = models.CharField(max_length=128, null=True, blank=True, default=None)
+    # mirror of Dwolla funding source, refreshed by webhooks and reconcile_dwolla_funding_sources_task
+    name = models.CharField(max_length=256, blank=True, default="")
+    bank_name = models.CharField(max_length=256, blank=True, default="")
+    type = models.CharField(max_length=32, blank=True, default="")
+    bank_account_type = models.CharField(max_length=32, blank=True, default="")
+    status = models.CharField(max_length=32, blank=True, default="")
+    channels = models.JSONField(default=list, blank=True)
+    dwolla_created = models.CharField(max_length=64, blank=True, default="")
+    is_removed = models.BooleanField(default=False)
+    synced_time = models.DateTimeField(null=True, blank=True, default=None)
 
     class Meta:
         db_table = "payment_methods"
@@ -92,7 +161,7 @@ class Transaction(models.Model):
     fee_difference = models.SmallIntegerField(null=True, default=None)
     service_name = models.CharField(max_length=10, choices=PaymentService.choices)
     action_type = models.CharField(max_length=10, choices=PaymentAction.choices)
-    transaction_id = models.CharField(max_length=255)
+    transaction_id = models.CharField(max_length=255, db_index=True)
     creation_time = models.DateTimeField(auto_now_add=True)
     is_succeeded = models.BooleanField(default=False)
     paid_tack = models.ForeignKey(
@@ -119,3 +188,54 @@ class ServiceFee(models.Model):
         max_digits=4,
         validators=(percent_validator,))
     dwolla_const_sum = models.PositiveIntegerField(default=0)
+
+
+class TransactionLossBucket(models.Model):
+    """Sum of User Transactions fee_difference created in the bucket, used for the 24h loss limit"""
+
+    user = models.ForeignKey("user.User", on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField()
+    fee_difference = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.bucket_start} {self.fee_difference}"
+
+    class Meta:
+        db_table = "transaction_loss_buckets"
+        verbose_name = "Transaction loss bucket"
+        verbose_name_plural = "Transaction loss buckets"
+        constraints = [
+            UniqueConstraint(
+                fields=("user", "bucket_start"),
+                name="transaction_loss_buckets_user_bucket"
+            ),
+        ]
+
+
+class StripeWebhookQueueItem(models.Model):
+    """Valid djstripe WebhookEventTrigger waiting for payment.tasks.process_stripe_webhooks_task"""
+
+    trigger = models.OneToOneField("djstripe.WebhookEventTrigger", on_delete=models.CASCADE)
+    # events of the same Stripe object are processed in the order they were received
+    object_id = models.CharField(max_length=255, db_index=True)
+    event_type = models.CharField(max_length=250)
+    creation_time = models.DateTimeField(auto_now_add=True)
+    processed_time = models.DateTimeField(null=True, blank=True, default=None)
+    next_attempt_time = models.DateTimeField(null=True, blank=True, default=None)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"{self.id}: {self.event_type} {self.object_id}"
+
+    class Meta:
+        db_table = "stripe_webhook_queue"
+        verbose_name = "Stripe webhook queue item"
+        verbose_name_plural = "Stripe webhook queue"
+        indexes = [
+            models.Index(
+                fields=("id",),
+                condition=Q(processed_time__isnull=True),
+                name="stripe_webhook_queue_pending"
+            ),
+        ]
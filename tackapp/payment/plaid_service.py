@@ -1,8 +1,12 @@
 import plaid
 from plaid.api import plaid_api
+from urllib3.util.retry import Retry
 
 from tackapp.settings import PLAID_CLIENT_ID, PLAID_CLIENT_SECRET
 
+# (connect, read) seconds, pass as _request_timeout to every plaid_client call
+PLAID_TIMEOUT = (3.05, 20)
+
 configuration = plaid.Configuration(
     host=plaid.Environment.Production,
     api_key={
@@ -10,6 +14,9 @@ configuration = plaid.Configuration(
         'secret': PLAID_CLIENT_SECRET
     }
 )
+# every Plaid API request is POST, so only connection errors are retried
+configuration.retries = Retry(total=2, read=0, backoff_factor=0.3)
+configuration.connection_pool_maxsize = 10
 
 api_client = plaid.ApiClient(configuration)
 plaid_client = plaid_api.PlaidApi(api_client)
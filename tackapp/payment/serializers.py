@@ -145,3 +145,16 @@ class FeeSerializer(serializers.Serializer):
             "fee_min": obj.fee_min_dwolla,
             "fee_max": obj.fee_max_dwolla
         }
+
+
+class FeeSimulationSerializer(serializers.Serializer):
+    grid = serializers.DictField(
+        child=serializers.ListField(
+            child=serializers.DecimalField(max_digits=12, decimal_places=2),
+            min_length=1
+        ),
+        required=False,
+        default=dict
+    )
+    days = serializers.IntegerField(required=False, min_value=1)
+    top = serializers.IntegerField(required=False, min_value=1, max_value=100, default=10)
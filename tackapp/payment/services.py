@@ -1,8 +1,11 @@
 import logging
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from decimal import Decimal, Context
 from typing import Optional
 
+import dwollav2
+import requests
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 from django.db.models import Q, F, Sum
@@ -27,11 +30,13 @@ from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUse
 from plaid.model.processor_token_create_request import ProcessorTokenCreateRequest
 from plaid.model.products import Products
 
-from core.choices import PaymentType, PaymentService, PaymentAction
-from dwolla_service.models import DwollaEvent
-from payment.plaid_service import plaid_client
-from payment.dwolla_service import dwolla_client
-from payment.models import BankAccount, UserPaymentMethods, Fee, StripePaymentMethodsHolder, Transaction, ServiceFee
+from core.choices import PaymentType, PaymentService, PaymentAction, BalanceEntryReason, BalanceHoldStatus
+from payment.balance_service import change_balance, hold_balance, capture_hold, release_hold, capture_tack_hold, \
+    WITHDRAW_HOLD_TTL
+from payment.plaid_service import plaid_client, PLAID_TIMEOUT
+from payment.dwolla_service import get_dwolla_token
+from payment.fee_config import get_fee_config, amount_with_fees, service_fee_amount, transaction_loss
+from payment.models import BankAccount, UserPaymentMethods, StripePaymentMethodsHolder, Transaction, BalanceHold
 from tack.models import Tack
 from tackapp.settings import DWOLLA_MAIN_FUNDING_SOURCE
 from user.models import User
@@ -39,6 +44,10 @@ from user.models import User
 
 logger = logging.getLogger("payments")
 
+# bounds concurrent requests to Dwolla and Plaid made for one User action (e.g. every account of a bank)
+PAYMENT_API_MAX_WORKERS = 8
+payment_api_executor = ThreadPoolExecutor(max_workers=PAYMENT_API_MAX_WORKERS, thread_name_prefix="payment-api")
+
 
 @transaction.atomic
 def send_payment_to_runner(tack: Tack):
@@ -48,8 +57,18 @@ def send_payment_to_runner(tack: Tack):
     if tack.is_paid:
         logger.debug("if tack.is_paid:")
         return True
-    tack.runner.bankaccount.usd_balance += tack.price
-    tack.runner.bankaccount.save()
+    with transaction.atomic():
+        hold = capture_tack_hold(tack)
+        if hold is None:
+            logger.error(f"payment.services.send_payment_to_runner: no balance hold for Tack {tack.id}")
+            return False
+        change_balance(
+            tack.runner_id,
+            hold.amount,
+            BalanceEntryReason.RUNNER_PAYOUT,
+            idempotency_key=f"tack_{tack.id}_payout",
+            tack=tack
+        )
     return True
 
 
@@ -58,7 +77,7 @@ def get_dwolla_payment_methods(dwolla_user_id):
 
     # payment_methods = UserPaymentMethods.objects.filter(bank_account__dwolla_user=dwolla_user_id)
 
-    token = dwolla_client.Auth.client()
+    token = get_dwolla_token()
     response = token.get(f"customers/{dwolla_user_id}/funding-sources?removed=false")
     logger.debug(f"{response.body = }")
     return response.body
@@ -88,7 +107,7 @@ def get_link_token(dwolla_id_user):
         )
     )
 
-    link_token = plaid_client.link_token_create(request)
+    link_token = plaid_client.link_token_create(request, _request_timeout=PLAID_TIMEOUT)
     return link_token['link_token']
 
 
@@ -108,7 +127,7 @@ def get_access_token(public_token: str) -> str:
     exchange_request = ItemPublicTokenExchangeRequest(
         public_token=public_token
     )
-    exchange_response = plaid_client.item_public_token_exchange(exchange_request)
+    exchange_response = plaid_client.item_public_token_exchange(exchange_request, _request_timeout=PLAID_TIMEOUT)
     access_token = exchange_response['access_token']
     return access_token
 
@@ -117,7 +136,7 @@ def get_bank_account_ids(access_token: str) -> list[AccountBase]:
     """Get all supported bank accounts(checking+depository) to manage from Plaid"""
 
     request = AuthGetRequest(access_token=access_token)
-    response = plaid_client.auth_get(request)
+    response = plaid_client.auth_get(request, _request_timeout=PLAID_TIMEOUT)
     supported_accounts = []
     for account in response.get('accounts'):
         if account.subtype == AccountSubtype("checking") and account.type == AccountType("depository"):
@@ -131,43 +150,67 @@ def get_accounts_with_processor_tokens(access_token: str) -> list[AccountBase]:
 
     accounts = get_bank_account_ids(access_token)
 
-    for account in accounts:
+    def create_processor_token(account: AccountBase) -> str:
         request = ProcessorTokenCreateRequest(
             access_token=access_token,
             account_id=account.get("account_id"),
             processor="dwolla"
         )
-        response = plaid_client.processor_token_create(request)
-        processor_token = response.get("processor_token")
+        response = plaid_client.processor_token_create(request, _request_timeout=PLAID_TIMEOUT)
+        return response.get("processor_token")
+
+    for account, processor_token in zip(accounts, payment_api_executor.map(create_processor_token, accounts)):
         account["plaidToken"] = processor_token
 
     return accounts
 
 
 def attach_all_accounts_to_dwolla(user: User, accounts: list, access_token: str) -> list:
-    """Attach and return all Dwolla payment methods to our BankAccount"""
+    """
+    Attach and return all Dwolla payment methods to our BankAccount.
+    If any account can't be attached, funding sources created for the others are removed
+    and the first error is raised, so the bank is attached fully or not at all
+    """
 
-    payment_methods = []
     dwolla_id = get_dwolla_id(user)
-    for account in accounts:
-        payment_method_id = attach_account_to_dwolla(dwolla_id, account, access_token)
-        payment_methods.append(payment_method_id)
+    # Dwolla requests run concurrently, DB records are made in this thread
+    futures = [
+        payment_api_executor.submit(get_dwolla_pm_by_plaid_token, dwolla_id, account)
+        for account in accounts
+    ]
+    payment_methods = []
+    errors = []
+    for future in futures:
+        try:
+            payment_methods.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        logger.error(
+            f"payment.services.attach_all_accounts_to_dwolla: {len(errors)} of {len(accounts)} accounts "
+            f"of {dwolla_id} are not attached, removing {payment_methods = }"
+        )
 
-    return payment_methods
+        def remove_funding_source(funding_source_id: str):
+            try:
+                detach_dwolla_funding_source(funding_source_id)
+            except dwollav2.Error as e:
+                logger.error(f"Funding source {funding_source_id} of {dwolla_id} is not removed: {e = }")
 
+        list(payment_api_executor.map(remove_funding_source, payment_methods))
+        raise errors[0]
 
-def attach_account_to_dwolla(dwolla_id: str, account: dict, access_token: str) -> str:
-    """Attach one Dwolla payment method to our Tack BankAccount"""
+    with transaction.atomic():
+        for account, payment_method_id in zip(accounts, payment_methods):
+            add_dwolla_payment_method(dwolla_id, payment_method_id, account["account_id"], access_token)
 
-    payment_method_id = get_dwolla_pm_by_plaid_token(dwolla_id, account)
-    add_dwolla_payment_method(dwolla_id, payment_method_id, account["account_id"], access_token)
-    return payment_method_id
+    return payment_methods
 
 
 def get_dwolla_pm_by_plaid_token(dwolla_customer_id, pm_account):
     """Exchange plaidToken for Dwolla payment method"""
 
-    token = dwolla_client.Auth.client()
+    token = get_dwolla_token()
     response = token.post(
         f"customers/{dwolla_customer_id}/funding-sources",
         {
@@ -208,10 +251,13 @@ def add_money_to_bank_account(payment_intent: PaymentIntent, cur_transaction: Tr
         logger.debug(f"{payment_intent.customer.id = }")
         ba = BankAccount.objects.get(stripe_user=payment_intent.customer.id)
         logger.debug(f"{ba = }")
-        ba.usd_balance += cur_transaction.amount_requested
-        logger.debug(f"{ba = }")
-        ba.save()
-        logger.debug(f"{ba = }")
+        change_balance(
+            ba.user_id,
+            cur_transaction.amount_requested,
+            BalanceEntryReason.DEPOSIT,
+            idempotency_key=f"transaction_{cur_transaction.id}",
+            payment_transaction=cur_transaction
+        )
     except BankAccount.DoesNotExist:
         # TODO: Error handling/create BA
         logger.error(f"Bank account of {payment_intent.customer} is not found")
@@ -223,7 +269,7 @@ def save_dwolla_access_token(access_token: str, user: User):
     try:
         ba = BankAccount.objects.get(user=user)
         ba.dwolla_access_token = access_token
-        ba.save()
+        ba.save(update_fields=("dwolla_access_token",))
     except BankAccount.DoesNotExist:
         # TODO: error handling/creating new BA
         pass
@@ -234,7 +280,8 @@ def get_transfer_request(
         destination: str,
         currency: str,
         amount: int | Decimal,
-        channel: str
+        channel: str,
+        correlation_id: str = None
 ):
     """Form Dwolla transaction request"""
 
@@ -264,6 +311,9 @@ def get_transfer_request(
             'source': 'next-available',
             'destination': 'next-available'
         }
+    if correlation_id:
+        # transfer can be found by it when our record of the transfer is lost
+        transfer_request["correlationId"] = correlation_id
 
     return transfer_request
 
@@ -276,7 +326,7 @@ def check_dwolla_balance(user: User, amount: int, payment_method: str = None):
     request = AccountsBalanceGetRequest(
         access_token=pm.dwolla_access_token
     )
-    response = plaid_client.accounts_balance_get(request)
+    response = plaid_client.accounts_balance_get(request, _request_timeout=PLAID_TIMEOUT)
     logger.debug(f"plaid {response = }")
     try:
         payment_method_qs = UserPaymentMethods.objects.get(
@@ -306,7 +356,6 @@ def convert_to_decimal(amount: int, currency: str = "USD") -> Decimal:
     return amount / currency_cents_dict[currency]
 
 
-@transaction.atomic
 def dwolla_transaction(
         user: User,
         amount: int,
@@ -335,43 +384,135 @@ def dwolla_transaction(
             status=400
         )
 
+    hold = None
+    correlation_id = None
+    headers = {}
+    if action == PaymentAction.WITHDRAW:
+        # reserve funds before the transfer is created. Hold is committed so balance row
+        # is not locked during the request, hold without Transaction is resolved by reconcile_withdraw_holds
+        hold = hold_balance(
+            user.id,
+            amount,
+            BalanceEntryReason.WITHDRAW,
+            expiration_time=timezone.now() + WITHDRAW_HOLD_TTL
+        )
+        correlation_id = get_withdraw_correlation_id(hold)
+        headers = {"Idempotency-Key": correlation_id}
+
     transfer_request = get_transfer_request(
         source=source,
         destination=destination,
         currency=currency,
         amount=amount_with_fees,
-        channel=channel
+        channel=channel,
+        correlation_id=correlation_id
     )
     logger.debug(f"payment.services.dwolla_transaction: {transfer_request = }")
-    token = dwolla_client.Auth.client()
-    response = token.post('transfers', transfer_request)
+    try:
+        token = get_dwolla_token()
+        response = token.post('transfers', transfer_request, headers)
+    except dwollav2.Error as e:
+        # transfer rejected by Dwolla is not created, on other errors it may be
+        if hold and 400 <= getattr(e, "status", 0) < 500:
+            release_hold(hold)
+        raise
     transaction_id = response.headers["Location"].split("/")[-1]
-    service_fee = calculate_service_fee(amount=amount, service=PaymentService.DWOLLA)
     logger.debug(response.body)
-    ba = BankAccount.objects.get(user=user)
+    save_dwolla_transaction(user, transaction_id, amount, amount_with_fees, action, hold)
+
+    return transaction_id
+
+
+def get_withdraw_correlation_id(hold: BalanceHold) -> str:
+    return f"withdraw_hold_{hold.id}"
+
+
+def save_dwolla_transaction(
+        user: User,
+        transaction_id: str,
+        amount: int,
+        amount_with_fees: int,
+        action: str,
+        hold: BalanceHold = None
+) -> Transaction:
+    """Record created Dwolla transfer, capture withdraw hold or add deposit to balance"""
+
+    service_fee = calculate_service_fee(amount=amount, service=PaymentService.DWOLLA)
     current_transaction_loss = calculate_transaction_loss(
         amount=amount,
         service=PaymentService.DWOLLA
     )
-    Transaction.objects.create(
-        user=user,
-        transaction_id=transaction_id,
-        service_name=PaymentService.DWOLLA,
-        amount_requested=amount,
-        amount_with_fees=amount_with_fees,
-        fee_difference=current_transaction_loss,
-        service_fee=service_fee,
-        action_type=action
-    )
-    match action:
-        case PaymentAction.WITHDRAW:
-            ba.usd_balance -= amount
-            ba.save()
-        case PaymentAction.DEPOSIT:
-            ba.usd_balance += amount
-            ba.save()
+    with transaction.atomic():
+        cur_transaction = Transaction.objects.create(
+            user=user,
+            transaction_id=transaction_id,
+            service_name=PaymentService.DWOLLA,
+            amount_requested=amount,
+            amount_with_fees=amount_with_fees,
+            fee_difference=current_transaction_loss,
+            service_fee=service_fee,
+            action_type=action
+        )
+        match action:
+            case PaymentAction.WITHDRAW:
+                capture_hold(hold, payment_transaction=cur_transaction)
+            case PaymentAction.DEPOSIT:
+                change_balance(
+                    user.id,
+                    amount,
+                    BalanceEntryReason.DEPOSIT,
+                    idempotency_key=f"transaction_{cur_transaction.id}",
+                    payment_transaction=cur_transaction
+                )
+    return cur_transaction
 
-    return transaction_id
+
+def reconcile_withdraw_holds() -> int:
+    """
+    Resolve withdraw holds left without Transaction after WITHDRAW_HOLD_TTL, e.g. by a crash
+    or a lost Dwolla response. Transfer is looked up in Dwolla by its correlationId:
+    found transfer is recorded and the hold captured, the hold is released only when Dwolla
+    has no transfer or it was cancelled or failed. Holds Dwolla can't be asked about are kept.
+    Returns number of resolved holds
+    """
+
+    holds = BalanceHold.objects.filter(
+        status=BalanceHoldStatus.HELD,
+        reason=BalanceEntryReason.WITHDRAW,
+        transaction__isnull=True,
+        expiration_time__lte=timezone.now()
+    ).select_related("bank_account__user").order_by("id")
+    token = get_dwolla_token()
+    resolved = 0
+    for hold in holds.iterator():
+        correlation_id = get_withdraw_correlation_id(hold)
+        try:
+            transfers = token.get(
+                f"customers/{hold.bank_account.dwolla_user}/transfers",
+                correlationId=correlation_id
+            ).body["_embedded"]["transfers"]
+        except (dwollav2.Error, requests.RequestException, KeyError) as e:
+            logger.error(f"Withdraw BalanceHold {hold.id} is not reconciled: {e = }")
+            continue
+        transfers = [
+            transfer for transfer in transfers
+            if transfer.get("correlationId") == correlation_id and transfer.get("status") not in ("cancelled", "failed")
+        ]
+        if transfers:
+            save_dwolla_transaction(
+                hold.bank_account.user,
+                transfers[0]["id"],
+                hold.amount,
+                int(Decimal(transfers[0]["amount"]["value"]) * 100),
+                PaymentAction.WITHDRAW,
+                hold
+            )
+            logger.warning(f"Withdraw BalanceHold {hold.id} is captured by Dwolla transfer {transfers[0]['id']}")
+        else:
+            release_hold(hold)
+            logger.warning(f"Withdraw BalanceHold {hold.id} is released, Dwolla has no transfer of it")
+        resolved += 1
+    return resolved
 
 
 def calculate_amount_with_fees(amount: int, service: PaymentService) -> int:
@@ -381,79 +522,28 @@ def calculate_amount_with_fees(amount: int, service: PaymentService) -> int:
     :param service: service name e.g. "stripe", "dwolla"
     :return: new calculated amount
     """
-    fees = Fee.objects.all().last()
-    abs_fee = 0
-    match service:
-        case PaymentService.STRIPE:
-            abs_fee = amount * fees.fee_percent_stripe / 100
-            if abs_fee < fees.fee_min_stripe:
-                abs_fee = fees.fee_min_stripe
-            elif abs_fee > fees.fee_max_stripe and fees.fee_max_stripe:
-                abs_fee = fees.fee_max_stripe
-        case PaymentService.DWOLLA:
-            abs_fee = amount * fees.fee_percent_dwolla / 100
-            if abs_fee < fees.fee_min_dwolla:
-                abs_fee = fees.fee_min_dwolla
-            elif abs_fee > fees.fee_max_dwolla and fees.fee_max_dwolla:
-                abs_fee = fees.fee_max_dwolla
-
-    amount = int(amount + abs_fee)
+    amount = amount_with_fees(get_fee_config(), amount, service)
     logger.debug(f"{amount = }")
     return amount
 
 
 def get_dwolla_pms_by_id(pms_id: list):
-    token = dwolla_client.Auth.client()
-    responses = []
-    for pm in pms_id:
-        response = token.get(f"funding-sources/{pm}")
-        responses.append(response.body)
-    return responses
-
-
-def dwolla_webhook_handler(request):
-    # TODO: check hash
-
-    try:
-        DwollaEvent.objects.get(event_id=request.data.get("id"))
-        return
-    except DwollaEvent.DoesNotExist:
-        pass
-
-    topic = request.data.get("topic")
-    DwollaEvent.objects.create(
-        event_id=request.data.get("id"),
-        topic=topic,
-        timestamp=request.data.get("timestamp"),
-        self_res=request.data.get("_links").get("self"),
-        account=request.data.get("_links").get("account"),
-        resource=request.data.get("_links").get("resource"),
-        customer=request.data.get("_links").get("customer"),
-        created=request.data.get("created"),
-    )
-    match topic:
-        case "transfer_completed" | "customer_transfer_completed" | "bank_transfer_completed":
-            transfer_id = request.data.get("_links").get("resource").get("href").split("/")[-1]
-            try:
-                trnsctn = Transaction.objects.get(transaction_id=transfer_id)
-                trnsctn.is_succeeded = True
-                trnsctn.save()
-            except Transaction.DoesNotExist:
-                pass
-            except Transaction.MultipleObjectsReturned:
-                pass
+    token = get_dwolla_token()
+    return list(payment_api_executor.map(lambda pm: token.get(f"funding-sources/{pm}").body, pms_id))
 
 
 def detach_dwolla_funding_sources(dwolla_id):
     funding_sources = get_dwolla_payment_methods(dwolla_id)['_embedded']['funding-sources']
 
     logger.debug(f"in detach_dwolla_funding_sources: {funding_sources = }")
-    for funding_source in funding_sources:
-        detach_dwolla_funding_source(funding_source['id'])
+    list(payment_api_executor.map(
+        detach_dwolla_funding_source,
+        [funding_source['id'] for funding_source in funding_sources]
+    ))
 
 
 def detach_dwolla_funding_source(funding_source_id):
-    token = dwolla_client.Auth.client()
+    token = get_dwolla_token()
     token.post(
         f"funding-sources/{funding_source_id}",
         {"removed": True}
@@ -468,7 +558,7 @@ def detach_stripe_payment_method(payment_method: str):
 
 
 def _deactivate_dwolla_account(dwolla_id):
-    token = dwolla_client.Auth.client()
+    token = get_dwolla_token()
     token.post(
         f"customers/{dwolla_id}",
         {"status": "deactivated"}
@@ -476,7 +566,7 @@ def _deactivate_dwolla_account(dwolla_id):
 
 
 def is_user_have_dwolla_pending_transfers(dwolla_id):
-    token = dwolla_client.Auth.client()
+    token = get_dwolla_token()
     response = token.get(f"customers/{dwolla_id}/transfers?status=pending")
     return bool(response.body["total"])
 
@@ -507,80 +597,39 @@ def detach_payment_method(user: User, payment_type: str, payment_method: str):
         detach_stripe_payment_method(payment_method)
 
 
-def update_dwolla_pms_with_primary(pms: dict, user: User):
-    """Enrich (data: list) of (funding_source's: dict) (is_primary: bool) values"""
-
-    data = pms["_embedded"]["funding-sources"]
-    dwolla_pm_ids = [funding_source["id"] for funding_source in data]
-
-    # [{"dwolla_payment_method": "id-1", "is_primary": bool}, ...]
-    upms_values = UserPaymentMethods.objects.filter(
-        dwolla_payment_method__in=dwolla_pm_ids
-    ).values(
-        "dwolla_payment_method",
-        "is_primary"
-    )
-
-    # Additional check if retrieved funding-sources from Dwolla API matched our UserPaymentMethods model
-    if len(data) != len(upms_values):
-        # TODO: add UserPaymentMethods
-        for dwolla_pm_id in dwolla_pm_ids:
-            if dwolla_pm_id not in upms_values.values_list("dwolla_payment_method", flat=True):
-                dwolla_id = BankAccount.objects.get(user=user).dwolla_user
-                add_dwolla_payment_method(dwolla_id, dwolla_pm_id)
-
-        upms_values = UserPaymentMethods.objects.filter(
-            dwolla_payment_method__in=dwolla_pm_ids
-        ).values(
-            "dwolla_payment_method",
-            "is_primary"
-        )
+def calculate_service_fee(amount: int, service: PaymentService):
+    fee = service_fee_amount(get_fee_config(), amount, service)
+    logger.debug(f"calculate_service_fee, {service} {fee}")
+    return fee
 
-    # [{"id-1": bool}, ...]
-    upms_dict = {
-        upm['dwolla_payment_method']: upm['is_primary']
-        for upm in upms_values
-    }
-    data = [
-        funding_source | {'is_primary': upms_dict.get(funding_source['id']) or False}
-        for funding_source in data
-    ]
-    return data
 
+def get_loss_limited_transactions(since: datetime):
+    """Transactions counted in the 24h loss limit annotated with their fee_difference as loss"""
 
-def calculate_service_fee(amount: int, service: PaymentService):
-    service_fee = ServiceFee.objects.last()
-    match service:
-        case PaymentService.DWOLLA:
-            logger.debug("calculate_service_fee, DWOLLA")
-            logger.debug(int(amount * service_fee.dwolla_percent / 100 + service_fee.dwolla_const_sum))
-            return int(amount * service_fee.dwolla_percent / 100 + service_fee.dwolla_const_sum)
-        case PaymentService.STRIPE:
-            logger.debug("calculate_service_fee, STRIPE")
-            logger.debug(int(amount * service_fee.stripe_percent / 100 + service_fee.stripe_const_sum))
-            return int(amount * service_fee.stripe_percent / 100 + service_fee.stripe_const_sum)
+    return Transaction.objects.filter(
+        Q(service_name=PaymentService.STRIPE, is_succeeded=True) | Q(service_name=PaymentService.DWOLLA),
+        creation_time__gt=since
+    ).annotate(
+        loss=F('amount_with_fees') - F('amount_requested') - F('service_fee')
+    )
 
 
 def get_sum24h_transactions(user: User) -> int:
-    sum24h = Transaction.objects.filter(
-                Q(service_name=PaymentService.STRIPE, is_succeeded=True) | Q(service_name=PaymentService.DWOLLA),
-                user=user,
-                creation_time__gt=timezone.now() - timedelta(hours=24)
-            ).aggregate(
-                sum24h=Sum(
-                    F('amount_with_fees') - F('amount_requested') - F('service_fee')
-                )
-            )['sum24h']
+    sum24h = get_loss_limited_transactions(
+        since=timezone.now() - timedelta(hours=24)
+    ).filter(
+        user=user
+    ).aggregate(
+        sum24h=Sum('loss')
+    )['sum24h']
     return sum24h if sum24h else 0
 
 
 def calculate_transaction_loss(amount: int, service: PaymentService):
     logger.debug("INSIDE calculate_transaction_loss")
-    amount_with_fees = calculate_amount_with_fees(amount=amount, service=service)
-    service_fee = calculate_service_fee(amount=amount_with_fees, service=service)
-    logger.debug(f"{service_fee = }")
-    logger.debug(f"{amount_with_fees = }")
-    return amount_with_fees - amount - service_fee
+    loss = transaction_loss(get_fee_config(), amount, service)
+    logger.debug(f"{loss = }")
+    return loss
 
 
 @transaction.atomic
@@ -588,9 +637,13 @@ def add_money_to_bank_account_custom(cur_transaction: Transaction):
     """Add balance to User BankAccount based on Stripe PaymentIntent when succeeded"""
 
     try:
-        ba = BankAccount.objects.get(user=cur_transaction.user)
-        ba.usd_balance += cur_transaction.amount_requested
-        ba.save()
+        change_balance(
+            cur_transaction.user_id,
+            cur_transaction.amount_requested,
+            BalanceEntryReason.DEPOSIT,
+            idempotency_key=f"transaction_{cur_transaction.id}",
+            payment_transaction=cur_transaction
+        )
     except BankAccount.DoesNotExist:
         # TODO: Error handling/create BA
         pass
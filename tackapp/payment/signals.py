@@ -1,7 +1,7 @@
 import logging
 
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from core.choices import PaymentService
@@ -9,7 +9,8 @@ from core.choices import PaymentService
 from djstripe import webhooks
 from djstripe.models import PaymentIntent, PaymentMethod
 
-from payment.models import StripePaymentMethodsHolder, Transaction, BankAccount
+from payment.fee_config import invalidate_fee_config
+from payment.models import StripePaymentMethodsHolder, Transaction, BankAccount, Fee, ServiceFee
 from payment.serializers import BankAccountSerializer
 from payment.services import add_money_to_bank_account, calculate_service_fee
 from tackapp.websocket_messages import WSSender
@@ -50,3 +51,11 @@ def ba_save(instance: BankAccount, *args, **kwargs):
         f"user_{instance.user.id}",
         'balance.update',
         BankAccountSerializer(instance).data)
+
+
+@receiver(signal=post_save, sender=Fee)
+@receiver(signal=post_delete, sender=Fee)
+@receiver(signal=post_save, sender=ServiceFee)
+@receiver(signal=post_delete, sender=ServiceFee)
+def fee_config_changed(*args, **kwargs):
+    transaction.on_commit(invalidate_fee_config)
@@ -0,0 +1,134 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from djstripe.models import WebhookEventTrigger
+from payment.models import StripeWebhookQueueItem
+
+
+logger = logging.getLogger("payments")
+
+STRIPE_WEBHOOK_BATCH_SIZE = 100
+STRIPE_WEBHOOK_MAX_ATTEMPTS = 8
+STRIPE_WEBHOOK_MIN_BACKOFF = timedelta(seconds=10)
+STRIPE_WEBHOOK_MAX_BACKOFF = timedelta(hours=1)
+
+
+def enqueue_stripe_webhook(trigger: WebhookEventTrigger):
+    """
+    DJSTRIPE_WEBHOOK_EVENT_CALLBACK: acknowledge valid webhook and process it on Celery.
+    djstripe saves the trigger after this callback, processing waits for that save
+    """
+
+    # local import: payment.tasks imports this module
+    from payment.tasks import process_stripe_webhooks_task
+
+    data = trigger.json_body
+    StripeWebhookQueueItem.objects.create(
+        trigger=trigger,
+        object_id=((data.get("data") or {}).get("object") or {}).get("id") or data.get("id", ""),
+        event_type=data.get("type", "")
+    )
+    transaction.on_commit(process_stripe_webhooks_task.delay)
+
+
+def get_backoff(attempts: int) -> timedelta:
+    return min(STRIPE_WEBHOOK_MIN_BACKOFF * 2 ** (attempts - 1), STRIPE_WEBHOOK_MAX_BACKOFF)
+
+
+def get_pending_items():
+    return StripeWebhookQueueItem.objects.filter(
+        processed_time__isnull=True,
+        attempts__lt=STRIPE_WEBHOOK_MAX_ATTEMPTS
+    )
+
+
+def process_stripe_webhooks(batch_size: int = STRIPE_WEBHOOK_BATCH_SIZE) -> tuple[int, timedelta | None]:
+    """
+    Process one batch of due queue items in the order they were received.
+    Item is skipped while an earlier item of the same Stripe object is pending.
+    Returns number of processed items and the delay before the nearest retry
+    """
+
+    now = timezone.now()
+    retry_in = None
+    with transaction.atomic():
+        items = list(
+            get_pending_items().select_for_update(
+                skip_locked=True,
+                of=("self",)
+            ).exclude(
+                next_attempt_time__gt=now
+            ).select_related(
+                "trigger"
+            ).order_by("id")[:batch_size]
+        )
+        # oldest pending item of every object outside of this batch: waiting for retry or taken by another worker
+        oldest_outside = dict(
+            get_pending_items().filter(
+                object_id__in={item.object_id for item in items}
+            ).exclude(
+                id__in=[item.id for item in items]
+            ).values(
+                "object_id"
+            ).annotate(
+                oldest_id=Min("id")
+            ).order_by().values_list("object_id", "oldest_id")
+        )
+        # objects with an earlier pending item, items of the batch are checked in id order
+        blocked_objects = set()
+        processed_ids = []
+        for item in items:
+            if item.object_id in blocked_objects:
+                continue
+            if oldest_outside.get(item.object_id, item.id) < item.id:
+                blocked_objects.add(item.object_id)
+                continue
+            if not item.trigger.valid:
+                # djstripe has not saved the trigger yet
+                blocked_objects.add(item.object_id)
+                retry_in = min(retry_in or STRIPE_WEBHOOK_MIN_BACKOFF, STRIPE_WEBHOOK_MIN_BACKOFF)
+                continue
+            try:
+                with transaction.atomic():
+                    item.trigger.process()
+            except Exception as e:
+                logger.exception(f"Stripe webhook {item} failed: {e}")
+                item.attempts += 1
+                item.error = repr(e)
+                backoff = get_backoff(item.attempts)
+                item.next_attempt_time = now + backoff
+                if item.attempts < STRIPE_WEBHOOK_MAX_ATTEMPTS:
+                    retry_in = min(retry_in or backoff, backoff)
+                blocked_objects.add(item.object_id)
+            else:
+                item.processed_time = timezone.now()
+                item.error = ""
+                processed_ids.append(item.id)
+        StripeWebhookQueueItem.objects.bulk_update(
+            items,
+            ("processed_time", "next_attempt_time", "attempts", "error")
+        )
+    return len(processed_ids), retry_in
+
+
+def get_stripe_webhook_lag() -> dict:
+    """Pending items count and age of the oldest one, shown in admin"""
+
+    stats = get_pending_items().aggregate(
+        oldest=Min("creation_time"),
+        next_attempt=Min("next_attempt_time")
+    )
+    now = timezone.now()
+    return {
+        "pending": get_pending_items().count(),
+        "failed": StripeWebhookQueueItem.objects.filter(
+            processed_time__isnull=True,
+            attempts__gte=STRIPE_WEBHOOK_MAX_ATTEMPTS
+        ).count(),
+        "lag": now - stats["oldest"] if stats["oldest"] else timedelta(0),
+        "next_attempt_time": stats["next_attempt"],
+    }
@@ -1,7 +1,13 @@
 from celery import shared_task
 from django.db.models import F
 
+from payment.balance_service import release_expired_holds
+from payment.dwolla_webhook_service import process_dwolla_webhooks, delete_processed_dwolla_webhooks
+from payment.funding_source_service import sync_dwolla_funding_source, reconcile_dwolla_funding_sources
+from payment.loss_limit_service import correct_loss_buckets
 from payment.models import Transaction
+from payment.services import reconcile_withdraw_holds
+from payment.stripe_webhook_service import process_stripe_webhooks
 
 
 @shared_task
@@ -10,3 +16,61 @@ def calculate_fee_difference_for_transaction_model():
     transactions.update(
         fee_difference=F('amount_with_fees') - F('amount_requested') - F('service_fee')
     )
+
+
+@shared_task
+def release_expired_holds_task():
+    """Release balance holds of cancelled, deleted and never accepted Tacks"""
+
+    while release_expired_holds():
+        pass
+
+
+@shared_task
+def reconcile_withdraw_holds_task():
+    """Resolve withdraw holds left without Transaction by checking their transfers in Dwolla"""
+
+    reconcile_withdraw_holds()
+
+
+@shared_task
+def correct_loss_buckets_task():
+    """Fix drift of 24h transaction loss buckets against Transactions"""
+
+    correct_loss_buckets()
+
+
+@shared_task
+def sync_dwolla_funding_source_task(funding_source_id: str):
+    """Refresh UserPaymentMethods mirror after Dwolla funding source webhook"""
+
+    sync_dwolla_funding_source(funding_source_id)
+
+
+@shared_task
+def reconcile_dwolla_funding_sources_task():
+    """Resync UserPaymentMethods mirrors with Dwolla, catches missed webhooks"""
+
+    reconcile_dwolla_funding_sources()
+
+
+@shared_task
+def process_dwolla_webhooks_task():
+    """Drain queued Dwolla webhooks, also scheduled periodically to pick up missed ones"""
+
+    while process_dwolla_webhooks():
+        pass
+    delete_processed_dwolla_webhooks()
+
+
+@shared_task
+def process_stripe_webhooks_task():
+    """Process queued djstripe webhooks, also scheduled periodically as a fallback"""
+
+    retry_in = None
+    while True:
+        processed, retry_in = process_stripe_webhooks()
+        if not processed:
+            break
+    if retry_in:
+        process_stripe_webhooks_task.apply_async(countdown=retry_in.total_seconds())
@@ -15,5 +15,6 @@ urlpatterns = [
     path("payment/set-primary-method/", SetPrimaryPaymentMethod.as_view()),
     path("payment/detach-payment-method/", DetachPaymentMethod.as_view()),
     path("payment/get-fees/", GetFees.as_view()),
+    path("payment/fee-simulation/", FeeSimulation.as_view()),
     path("webhooks/dwolla/", DwollaWebhook.as_view()),
 ]
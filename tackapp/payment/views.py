@@ -1,7 +1,12 @@
+import json
 import logging
+import time
+from datetime import timedelta
+
 from django.db import transaction
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 import djstripe.models
 import dwollav2
@@ -10,7 +15,7 @@ import stripe
 from django.core.exceptions import ObjectDoesNotExist
 
 from core.choices import PaymentType, PaymentService, PaymentAction
-from core.exceptions import InvalidActionError
+from core.exceptions import InvalidActionError, InsufficientFundsError
 
 from djstripe.models import Customer as dsCustomer
 from djstripe.models import PaymentMethod as dsPaymentMethod
@@ -18,15 +23,21 @@ from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiExamp
 from rest_framework import views, serializers
 from rest_framework.response import Response
 
-from payment.models import BankAccount, UserPaymentMethods, Transaction, Fee
+from payment.dwolla_webhook_service import is_valid_dwolla_signature, enqueue_dwolla_webhook
+from payment.fee_config import get_fee_config
+from payment.fee_simulator import get_amount_histogram, build_candidates, simulate_fee_difference, \
+    get_actual_fee_difference
+from payment.funding_source_service import get_withdraw_methods, sync_dwolla_funding_sources
+from payment.loss_limit_service import reserve_transaction_loss, release_transaction_loss
+from payment.models import BankAccount, UserPaymentMethods, Transaction
 from payment.serializers import StripePaymentMethodSerializer, AddWithdrawMethodSerializer, \
     DwollaMoneyWithdrawSerializer, DwollaPaymentMethodSerializer, GetCardByIdSerializer, \
     DeletePaymentMethodSerializer, SetPrimaryPaymentMethodSerializer, AddBalanceDwollaSerializer, \
-    AddBalanceStripeSerializer, FeeSerializer
-from payment.services import get_dwolla_payment_methods, get_dwolla_id, get_link_token, get_access_token, \
+    AddBalanceStripeSerializer, FeeSerializer, FeeSimulationSerializer
+from payment.services import get_dwolla_id, get_link_token, get_access_token, \
     get_accounts_with_processor_tokens, attach_all_accounts_to_dwolla, save_dwolla_access_token, check_dwolla_balance, \
-    get_dwolla_pms_by_id, dwolla_webhook_handler, dwolla_transaction, detach_dwolla_funding_source, set_primary_method, \
-    detach_payment_method, update_dwolla_pms_with_primary, calculate_amount_with_fees, get_sum24h_transactions, \
+    get_dwolla_pms_by_id, dwolla_transaction, detach_dwolla_funding_source, set_primary_method, \
+    detach_payment_method, calculate_amount_with_fees, \
     calculate_transaction_loss, calculate_service_fee
 
 
@@ -134,15 +145,13 @@ class AddBalanceStripe(views.APIView):
             service=PaymentService.STRIPE
         )
 
-        sum24h = get_sum24h_transactions(user=request.user)
         current_transaction_loss = calculate_transaction_loss(
             amount=serializer.validated_data.get("amount"),
             service=PaymentService.STRIPE
         )
 
         logger.debug(f"{current_transaction_loss = }")
-        total_loss = - (sum24h + current_transaction_loss)
-        if total_loss >= Fee.objects.all().last().max_loss:
+        if not reserve_transaction_loss(request.user.id, current_transaction_loss, get_fee_config().max_loss):
             return Response(
                 {
                     "error": "Px1",
@@ -162,23 +171,27 @@ class AddBalanceStripe(views.APIView):
         if payment_method:
             pi_request["payment_method"] = payment_method
         logger.info(f"{pi_request = }")
-        with transaction.atomic():
-            pi = stripe.PaymentIntent.create(**pi_request)
-            Transaction.objects.create(
-                user=request.user,
-                service_name=PaymentService.STRIPE if payment_method else PaymentService.DIGITAL_WALLET,
-                action_type=PaymentAction.DEPOSIT,
-                amount_requested=serializer.validated_data["amount"],
-                amount_with_fees=amount_with_fees,
-                fee_difference=current_transaction_loss,
-                service_fee=calculate_service_fee(
-                    amount=amount_with_fees,
-                    service=PaymentService.STRIPE),
-                transaction_id=pi["id"]
-            )
-            logger.info(f"{pi = }")
-            logger.debug(f"{type(pi) = }")
-            return Response(pi)
+        try:
+            with transaction.atomic():
+                pi = stripe.PaymentIntent.create(**pi_request)
+                Transaction.objects.create(
+                    user=request.user,
+                    service_name=PaymentService.STRIPE if payment_method else PaymentService.DIGITAL_WALLET,
+                    action_type=PaymentAction.DEPOSIT,
+                    amount_requested=serializer.validated_data["amount"],
+                    amount_with_fees=amount_with_fees,
+                    fee_difference=current_transaction_loss,
+                    service_fee=calculate_service_fee(
+                        amount=amount_with_fees,
+                        service=PaymentService.STRIPE),
+                    transaction_id=pi["id"]
+                )
+        except Exception:
+            release_transaction_loss(request.user.id, current_transaction_loss)
+            raise
+        logger.info(f"{pi = }")
+        logger.debug(f"{type(pi) = }")
+        return Response(pi)
 
 
 class AddBalanceDwolla(views.APIView):
@@ -210,14 +223,12 @@ class AddBalanceDwolla(views.APIView):
         amount = serializer.validated_data["amount"]
         payment_method = serializer.validated_data["payment_method"]
 
-        sum24h = get_sum24h_transactions(user=request.user)
         current_transaction_loss = calculate_transaction_loss(
             amount=serializer.validated_data.get("amount"),
             service=PaymentService.STRIPE
         )
         logger.debug(f"{current_transaction_loss = }")
-        total_loss = - (sum24h + current_transaction_loss)
-        if total_loss >= Fee.objects.all().last().max_loss:
+        if not reserve_transaction_loss(request.user.id, current_transaction_loss, get_fee_config().max_loss):
             return Response(
                 {
                     "error": "Px1",
@@ -225,15 +236,16 @@ class AddBalanceDwolla(views.APIView):
                 },
                 status=400)
 
-        is_enough_funds = check_dwolla_balance(request.user, amount, payment_method)
-        if not is_enough_funds:
-            logger.info(f"NOT ENOUGH FUNDS from {request.user = }, {amount = }. {total_loss = }")
-            return Response(
-                {
-                    "error": "Px2",
-                    "message": "Insufficient funds"
-                }, status=400)
         try:
+            is_enough_funds = check_dwolla_balance(request.user, amount, payment_method)
+            if not is_enough_funds:
+                logger.info(f"NOT ENOUGH FUNDS from {request.user = }, {amount = }")
+                release_transaction_loss(request.user.id, current_transaction_loss)
+                return Response(
+                    {
+                        "error": "Px2",
+                        "message": "Insufficient funds"
+                    }, status=400)
             transaction_id = dwolla_transaction(
                 user=request.user,
                 action=PaymentAction.DEPOSIT,
@@ -242,6 +254,7 @@ class AddBalanceDwolla(views.APIView):
             logger.info(f"AddBalanceDwolla {transaction_id = }")
         except InvalidActionError as e:
             logger.warning(f"InvalidActionError {e = }")
+            release_transaction_loss(request.user.id, current_transaction_loss)
             return Response(
                 {
                     "error": e.error,
@@ -251,7 +264,11 @@ class AddBalanceDwolla(views.APIView):
             )
         except dwollav2.Error as e:
             logger.warning(f"dwollav2.Error {e = }")
+            release_transaction_loss(request.user.id, current_transaction_loss)
             return Response(e.body)
+        except Exception:
+            release_transaction_loss(request.user.id, current_transaction_loss)
+            raise
 
         return Response(
             {
@@ -302,7 +319,6 @@ class GetUserWithdrawMethods(views.APIView):
 
     permission_classes = (IsAuthenticated,)
 
-    # TODO: get methods from DB
     @extend_schema(request=None, responses=DwollaPaymentMethodSerializer)
     def get(self, request, *args, **kwargs):
         try:
@@ -317,11 +333,10 @@ class GetUserWithdrawMethods(views.APIView):
                 status=400)
 
         try:
-            pms = get_dwolla_payment_methods(ba.dwolla_user)
+            data = get_withdraw_methods(request.user)
         except dwollav2.Error as e:
             return Response(e.body)
 
-        data = update_dwolla_pms_with_primary(pms, request.user)
         serializer = DwollaPaymentMethodSerializer(data, many=True)
         return Response(
             {
@@ -401,8 +416,12 @@ class AddUserWithdrawMethod(views.APIView):
             logger.error(f"{e = }")
             return Response(e.body, status=e.status)
 
-        pms = get_dwolla_payment_methods(ba.dwolla_user)
-        data = update_dwolla_pms_with_primary(pms, request.user)
+        try:
+            sync_dwolla_funding_sources(ba)
+        except dwollav2.Error as e:
+            logger.error(f"{e = }")
+            return Response(e.body, status=e.status)
+        data = get_withdraw_methods(request.user)
         if adding_first_bank:
             set_primary_method(
                 user=request.user,
@@ -454,13 +473,11 @@ class DwollaMoneyWithdraw(views.APIView):
         except BankAccount.DoesNotExist:
             pass
 
-        sum24h = get_sum24h_transactions(user=request.user)
         current_transaction_loss = calculate_transaction_loss(
             amount=serializer.validated_data.get("amount"),
             service=PaymentService.DWOLLA
         )
-        total_loss = - (sum24h + current_transaction_loss)
-        if total_loss >= Fee.objects.all().last().max_loss:
+        if not reserve_transaction_loss(request.user.id, current_transaction_loss, get_fee_config().max_loss):
             return Response(
                 {
                     "error": "Px1",
@@ -468,11 +485,23 @@ class DwollaMoneyWithdraw(views.APIView):
                 },
                 status=400)
 
-        response_body = dwolla_transaction(
-            user=request.user,
-            action=PaymentAction.WITHDRAW,
-            **serializer.validated_data
-        )
+        try:
+            response_body = dwolla_transaction(
+                user=request.user,
+                action=PaymentAction.WITHDRAW,
+                **serializer.validated_data
+            )
+        except InsufficientFundsError as e:
+            release_transaction_loss(request.user.id, current_transaction_loss)
+            return Response(
+                {
+                    "error": e.error,
+                    "message": "Insufficient funds"
+                },
+                status=e.status)
+        except Exception:
+            release_transaction_loss(request.user.id, current_transaction_loss)
+            raise
         return Response(response_body)
 
 
@@ -595,11 +624,70 @@ class GetFees(views.APIView):
 
     @extend_schema(request=None, responses=FeeSerializer)
     def get(self, request, *args, **kwargs):
-        fees = Fee.objects.all().last()
+        fees = get_fee_config()
         serializer = FeeSerializer(fees)
         return Response(serializer.data)
 
 
+class FeeSimulation(views.APIView):
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(request=FeeSimulationSerializer, responses=None)
+    def post(self, request, *args, **kwargs):
+        """Endpoint for staff to project fee_difference of Transaction history for candidate fees"""
+
+        serializer = FeeSimulationSerializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError as e:
+            return Response(
+                {
+                    "error": "Ox3",
+                    "message": "Validation error. Some of the fields have invalid values",
+                    "details": e.detail,
+                },
+                status=400)
+        grid = serializer.validated_data["grid"]
+        days = serializer.validated_data.get("days")
+        since = timezone.now() - timedelta(days=days) if days else None
+        try:
+            candidates = build_candidates(get_fee_config(), grid)
+        except ValueError as e:
+            return Response(
+                {
+                    "error": "Ox3",
+                    "message": str(e)
+                },
+                status=400)
+
+        start = time.monotonic()
+        histogram = get_amount_histogram(since=since)
+        results = simulate_fee_difference(candidates, histogram)
+        results.sort(key=lambda result: result["total"], reverse=True)
+        return Response(
+            {
+                "transactions": sum(row[3] for row in histogram),
+                "actual_fee_difference": sum(get_actual_fee_difference(since=since).values()),
+                "elapsed_ms": int((time.monotonic() - start) * 1000),
+                "results": [
+                    {
+                        "fees": {name: getattr(result["fees"], name) for name in grid},
+                        "fee_difference": result["total"],
+                        "by_type": [
+                            {
+                                "service_name": service_name,
+                                "action_type": action_type,
+                                "fee_difference": total
+                            }
+                            for (service_name, action_type), total in result["by_type"].items()
+                        ]
+                    }
+                    for result in results[:serializer.validated_data["top"]]
+                ]
+            }
+        )
+
+
 class DwollaWebhook(views.APIView):
     @extend_schema(request=inline_serializer(
         name="Dwolla_webhook",
@@ -608,6 +696,26 @@ class DwollaWebhook(views.APIView):
         }
     ), responses=None)
     def post(self, request, *args, **kwargs):
-        dwolla_webhook_handler(request)
-        # logging.getLogger().warning(f"{request.data = }")
+        # raw body is signed, it is read before request.data
+        body = request.body
+        if not is_valid_dwolla_signature(body, request.headers.get("X-Request-Signature-SHA-256")):
+            logger.warning("Dwolla webhook with invalid signature")
+            return Response(
+                {
+                    "error": "Px9",
+                    "message": "Invalid webhook signature"
+                },
+                status=403
+            )
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return Response(
+                {
+                    "error": "Px9",
+                    "message": "Invalid webhook payload"
+                },
+                status=400
+            )
+        enqueue_dwolla_webhook(payload)
         return Response()
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from socials.models import NotificationSettings
+from tack.notification import invalidate_message_templates
+
+
+@receiver(signal=post_save, sender=NotificationSettings)
+@receiver(signal=post_delete, sender=NotificationSettings)
+def notification_templates_changed(*args, **kwargs):
+    invalidate_message_templates()
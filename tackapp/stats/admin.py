@@ -1,5 +1,5 @@
 from advanced_filters.admin import AdminAdvancedFiltersMixin
-from stats.models import GlobalStats, GroupStats, UserVisits, Definitions
+from stats.models import GlobalStats, GroupStats, UserVisits, Definitions, StatsBucket
 from django.contrib.admin import ModelAdmin
 
 from payment.admin import ReadOnlyMixin
@@ -31,6 +31,21 @@ class GroupStatsAdmin(AdminAdvancedFiltersMixin, ReadOnlyMixin, ModelAdmin):
     )
 
 
+@admin.register(StatsBucket)
+class StatsBucketAdmin(ReadOnlyMixin, ModelAdmin):
+    list_display = (
+        "id",
+        "bucket_start",
+        "group",
+        "tacks_created",
+        "tacks_accepted",
+        "tacks_completed",
+        "card_deposits",
+        "bank_deposits",
+    )
+    list_filter = ("bucket_start",)
+
+
 @admin.register(Definitions)
 class GroupStatsAdmin(AdminAdvancedFiltersMixin, ModelAdmin):
     list_display = [
@@ -51,4 +66,5 @@ class UserVisitsAdmin(ModelAdmin):
     list_display = [
         'get_user_name',
         'timestamp',
+        'count',
     ]
@@ -0,0 +1,68 @@
+import time
+from dataclasses import dataclass
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from stats.models import Definitions
+
+
+DEFINITIONS_VERSION_KEY = "stats_definitions_version"
+# how often process checks shared version of its snapshot, seconds
+DEFINITIONS_CHECK_INTERVAL = 5
+
+
+@dataclass(frozen=True)
+class StatsDefinitions:
+    """Snapshot of the latest Definitions"""
+
+    active_user_timedelta_days: int
+    amount_of_tacks_for_tacker: int
+    amount_of_tacks_for_runner: int
+    tack_created_last_x_days_for_tacker: int
+
+
+# (snapshot, version, monotonic time of the last version check)
+_cached: tuple[StatsDefinitions, str, float] | None = None
+
+
+def get_definitions() -> StatsDefinitions:
+    """
+    Per process Definitions snapshot, loaded on the first use.
+    Reloaded from DB only when shared version in cache is changed by invalidate_definitions
+    """
+
+    global _cached
+    now = time.monotonic()
+    if _cached is not None and now - _cached[2] < DEFINITIONS_CHECK_INTERVAL:
+        return _cached[0]
+
+    version = cache.get(DEFINITIONS_VERSION_KEY)
+    if version is None:
+        cache.add(DEFINITIONS_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(DEFINITIONS_VERSION_KEY)
+    if _cached is not None and _cached[1] == version:
+        snapshot = _cached[0]
+    else:
+        snapshot = load_definitions()
+    _cached = (snapshot, version, now)
+    return snapshot
+
+
+def load_definitions() -> StatsDefinitions:
+    # model defaults are used until Definitions are created in admin
+    definitions = Definitions.objects.last() or Definitions()
+    return StatsDefinitions(
+        active_user_timedelta_days=definitions.active_user_timedelta_days,
+        amount_of_tacks_for_tacker=definitions.amount_of_tacks_for_tacker,
+        amount_of_tacks_for_runner=definitions.amount_of_tacks_for_runner,
+        tack_created_last_x_days_for_tacker=definitions.tack_created_last_x_days_for_tacker,
+    )
+
+
+def invalidate_definitions():
+    """Make every process reload Definitions on its next version check"""
+
+    global _cached
+    cache.set(DEFINITIONS_VERSION_KEY, uuid4().hex, None)
+    _cached = None
@@ -0,0 +1,57 @@
+# Generated by Django 4.0.8 on 2026-10-18 15:10
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('group', '0007_alter_group_collect_stats'),
+        ('stats', '0011_alter_globalstats_avg_first_offer_time_seconds_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('tacks_created', models.PositiveIntegerField(default=0)),
+                ('sum_price', models.BigIntegerField(default=0)),
+                ('allowed_counteroffers', models.PositiveIntegerField(default=0)),
+                ('tacks_accepted', models.PositiveIntegerField(default=0)),
+                ('sum_offers_before_accept', models.PositiveIntegerField(default=0)),
+                ('sum_first_offer_time', models.DurationField(default=datetime.timedelta)),
+                ('tacks_completed', models.PositiveIntegerField(default=0)),
+                ('sum_fee_difference', models.BigIntegerField(default=0)),
+                ('card_deposits', models.PositiveIntegerField(default=0)),
+                ('sum_card_deposits_w_fees', models.BigIntegerField(default=0)),
+                ('sum_card_deposits_wo_fees', models.BigIntegerField(default=0)),
+                ('dg_wallet_deposits', models.PositiveIntegerField(default=0)),
+                ('sum_dg_wallet_deposits_w_fees', models.BigIntegerField(default=0)),
+                ('sum_dg_wallet_deposits_wo_fees', models.BigIntegerField(default=0)),
+                ('bank_deposits', models.PositiveIntegerField(default=0)),
+                ('sum_bank_deposits_w_fees', models.BigIntegerField(default=0)),
+                ('sum_bank_deposits_wo_fees', models.BigIntegerField(default=0)),
+                ('bank_withdraws', models.PositiveIntegerField(default=0)),
+                ('sum_bank_withdraws_w_fees', models.BigIntegerField(default=0)),
+                ('sum_bank_withdraws_wo_fees', models.BigIntegerField(default=0)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='group.group')),
+            ],
+            options={
+                'verbose_name': 'Stats bucket',
+                'verbose_name_plural': 'Stats buckets',
+                'db_table': 'stats_buckets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='statsbucket',
+            constraint=models.UniqueConstraint(condition=models.Q(('group__isnull', False)), fields=('group', 'bucket_start'), name='stats_buckets_group_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='statsbucket',
+            constraint=models.UniqueConstraint(condition=models.Q(('group__isnull', True)), fields=('bucket_start',), name='stats_buckets_global_bucket'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.0.8 on 2026-10-18 16:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0012_statsbucket_statsbucket_stats_buckets_group_bucket_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uservisits',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='uservisits',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.0.8 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0013_uservisits_count_alter_uservisits_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserVisitsBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=32, unique=True)),
+                ('flush_time', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'User Visits batch',
+                'verbose_name_plural': 'User Visits batches',
+                'db_table': 'user_visits_batches',
+            },
+        ),
+    ]
@@ -1,4 +1,9 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import Q, UniqueConstraint
+from django.utils import timezone
+
 from user.models import User
 
 
@@ -185,8 +190,11 @@ class GroupStats(models.Model):
 
 
 class UserVisits(models.Model):
+    """Visits of User coalesced by stats.visits_service into one row per flushed hour"""
+
     user = models.ForeignKey(to=User, verbose_name='User visits', related_name='visits', on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+    count = models.PositiveIntegerField(default=1)
 
     class Meta:
         db_table = "user_visits"
@@ -194,6 +202,18 @@ class UserVisits(models.Model):
         verbose_name_plural = "User Visits"
 
 
+class UserVisitsBatch(models.Model):
+    """Buffered visits batch written to UserVisits, makes repeated flush of the same batch a no-op"""
+
+    batch_id = models.CharField(max_length=32, unique=True)
+    flush_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "user_visits_batches"
+        verbose_name = "User Visits batch"
+        verbose_name_plural = "User Visits batches"
+
+
 class Definitions(models.Model):
     active_user_timedelta_days = models.PositiveSmallIntegerField(default=7)
     amount_of_tacks_for_tacker = models.PositiveSmallIntegerField(default=1)
@@ -204,3 +224,53 @@ class Definitions(models.Model):
         db_table = "custom_definitions"
         verbose_name = "Tack Definition"
         verbose_name_plural = "Tack Definitions"
+
+
+class StatsBucket(models.Model):
+    """
+    Tack and Transaction counters of one hour, incremented as the events happen.
+    Row without group holds global counters
+    """
+
+    group = models.ForeignKey("group.Group", null=True, blank=True, on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField()
+    tacks_created = models.PositiveIntegerField(default=0)
+    sum_price = models.BigIntegerField(default=0)
+    allowed_counteroffers = models.PositiveIntegerField(default=0)
+    tacks_accepted = models.PositiveIntegerField(default=0)
+    sum_offers_before_accept = models.PositiveIntegerField(default=0)
+    sum_first_offer_time = models.DurationField(default=timedelta)
+    tacks_completed = models.PositiveIntegerField(default=0)
+    sum_fee_difference = models.BigIntegerField(default=0)
+    card_deposits = models.PositiveIntegerField(default=0)
+    sum_card_deposits_w_fees = models.BigIntegerField(default=0)
+    sum_card_deposits_wo_fees = models.BigIntegerField(default=0)
+    dg_wallet_deposits = models.PositiveIntegerField(default=0)
+    sum_dg_wallet_deposits_w_fees = models.BigIntegerField(default=0)
+    sum_dg_wallet_deposits_wo_fees = models.BigIntegerField(default=0)
+    bank_deposits = models.PositiveIntegerField(default=0)
+    sum_bank_deposits_w_fees = models.BigIntegerField(default=0)
+    sum_bank_deposits_wo_fees = models.BigIntegerField(default=0)
+    bank_withdraws = models.PositiveIntegerField(default=0)
+    sum_bank_withdraws_w_fees = models.BigIntegerField(default=0)
+    sum_bank_withdraws_wo_fees = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.group_id or 'Global'}: {self.bucket_start}"
+
+    class Meta:
+        db_table = "stats_buckets"
+        verbose_name = "Stats bucket"
+        verbose_name_plural = "Stats buckets"
+        constraints = [
+            UniqueConstraint(
+                fields=("group", "bucket_start"),
+                condition=Q(group__isnull=False),
+                name="stats_buckets_group_bucket"
+            ),
+            UniqueConstraint(
+                fields=("bucket_start",),
+                condition=Q(group__isnull=True),
+                name="stats_buckets_global_bucket"
+            ),
+        ]
@@ -0,0 +1,257 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction, IntegrityError
+from django.db.models import F, Count, Min, Subquery, OuterRef, IntegerField, DateTimeField
+from django.utils import timezone
+
+from core.choices import PaymentService, PaymentAction
+from payment.models import Transaction
+from stats.models import StatsBucket
+from tack.models import Tack, Offer
+
+
+logger = logging.getLogger("debug")
+
+ROLLUP_BUCKET = timedelta(hours=1)
+# closed buckets of this window are rebuilt from Tacks and Transactions by correct_stats_buckets
+ROLLUP_CORRECTION_WINDOW = timedelta(hours=24)
+# counters of committed events may still be on the way to buckets younger than this
+ROLLUP_CORRECTION_DELAY = timedelta(minutes=10)
+COUNTER_FIELDS = tuple(
+    field.name for field in StatsBucket._meta.concrete_fields
+    if field.name not in ("id", "group", "bucket_start")
+)
+# (service_name, action_type): count, sum with fees and sum without fees counters
+TRANSACTION_COUNTERS = {
+    (PaymentService.STRIPE, PaymentAction.DEPOSIT):
+        ("card_deposits", "sum_card_deposits_w_fees", "sum_card_deposits_wo_fees"),
+    (PaymentService.DIGITAL_WALLET, PaymentAction.DEPOSIT):
+        ("dg_wallet_deposits", "sum_dg_wallet_deposits_w_fees", "sum_dg_wallet_deposits_wo_fees"),
+    (PaymentService.DWOLLA, PaymentAction.DEPOSIT):
+        ("bank_deposits", "sum_bank_deposits_w_fees", "sum_bank_deposits_wo_fees"),
+    (PaymentService.DWOLLA, PaymentAction.WITHDRAW):
+        ("bank_withdraws", "sum_bank_withdraws_w_fees", "sum_bank_withdraws_wo_fees"),
+}
+
+
+def get_bucket_start(time: datetime) -> datetime:
+    return datetime.fromtimestamp(
+        time.timestamp() // ROLLUP_BUCKET.total_seconds() * ROLLUP_BUCKET.total_seconds(),
+        tz=time.tzinfo
+    )
+
+
+def get_bucket_keys(group_id: int | None) -> set:
+    """Global bucket and bucket of the group"""
+
+    return {None, group_id}
+
+
+def get_tack_created_counters(tack: Tack) -> dict:
+    return {
+        "tacks_created": 1,
+        "sum_price": tack.price,
+        "allowed_counteroffers": int(tack.allow_counter_offer),
+    }
+
+
+def get_tack_accepted_counters(tack: Tack, num_offers: int, first_offer_creation_time: datetime | None) -> dict:
+    return {
+        "tacks_accepted": 1,
+        "sum_offers_before_accept": num_offers,
+        "sum_first_offer_time": (first_offer_creation_time or tack.accepted_time) - tack.creation_time,
+    }
+
+
+def get_tack_completed_counters(tack: Tack) -> dict:
+    return {"tacks_completed": 1}
+
+
+def get_transaction_counters(tr: Transaction) -> dict:
+    counters = {"sum_fee_difference": tr.fee_difference or 0}
+    if (tr.service_name, tr.action_type) in TRANSACTION_COUNTERS:
+        count, sum_w_fees, sum_wo_fees = TRANSACTION_COUNTERS[(tr.service_name, tr.action_type)]
+        counters |= {
+            count: 1,
+            sum_w_fees: tr.amount_with_fees,
+            sum_wo_fees: tr.amount_requested,
+        }
+    return counters
+
+
+def add_to_bucket(group_id: int | None, bucket_start: datetime, counters: dict):
+    buckets = StatsBucket.objects.filter(group=group_id, bucket_start=bucket_start)
+    increments = {field: F(field) + value for field, value in counters.items()}
+    if buckets.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            StatsBucket.objects.create(group_id=group_id, bucket_start=bucket_start, **counters)
+    except IntegrityError:
+        # bucket was created by a concurrent event
+        buckets.update(**increments)
+
+
+def add_to_buckets(keys: set, time: datetime, counters: dict):
+    bucket_start = get_bucket_start(time)
+    for group_id in keys:
+        add_to_bucket(group_id, bucket_start, counters)
+
+
+def record_event(keys: set, time: datetime, counters: dict):
+    """
+    Add counters after the commit, so hot bucket rows are locked only for a short UPDATE.
+    Lost increments are fixed by correct_stats_buckets in buckets of ROLLUP_CORRECTION_WINDOW,
+    GlobalStats and GroupStats snapshots taken before the correction are not changed
+    """
+
+    def add():
+        try:
+            add_to_buckets(keys, time, counters)
+        except Exception as e:
+            logger.exception(f"stats.rollup_service.record_event {counters = } {e = }")
+
+    transaction.on_commit(add)
+
+
+def record_tack_created(tack: Tack):
+    record_event(get_bucket_keys(tack.group_id), tack.creation_time, get_tack_created_counters(tack))
+
+
+def record_tack_accepted(tack: Tack):
+    offers = Offer.objects.filter(tack=tack).aggregate(
+        num_offers=Count("id"),
+        first_offer_creation_time=Min("creation_time"),
+    )
+    record_event(
+        get_bucket_keys(tack.group_id),
+        tack.accepted_time,
+        get_tack_accepted_counters(tack, offers["num_offers"], offers["first_offer_creation_time"])
+    )
+
+
+def record_tack_completed(tack: Tack):
+    record_event(get_bucket_keys(tack.group_id), tack.completion_time, get_tack_completed_counters(tack))
+
+
+def record_transaction_created(tr: Transaction):
+    """Transaction is counted in the group bucket when it gets paid Tack"""
+
+    record_event({None}, tr.creation_time, get_transaction_counters(tr))
+
+
+def record_transaction_paid_tack(tr: Transaction):
+    """
+    Transaction is counted in the group bucket of its creation hour, which may be closed already.
+    GroupStats snapshot of that hour taken by collect_stats before the Tack was attached misses it,
+    only StatsBucket rows get it
+    """
+
+    if tr.paid_tack and tr.paid_tack.group_id:
+        record_event({tr.paid_tack.group_id}, tr.creation_time, get_transaction_counters(tr))
+
+
+def get_buckets(bucket_start: datetime, group_ids: list[int] | None = None) -> dict:
+    """
+    Global bucket as {None: bucket} when group_ids is None, otherwise {group_id: bucket}.
+    Missing buckets are empty unsaved ones
+    """
+
+    if group_ids is None:
+        buckets = StatsBucket.objects.filter(group__isnull=True, bucket_start=bucket_start)
+        keys = [None]
+    else:
+        buckets = StatsBucket.objects.filter(group__in=group_ids, bucket_start=bucket_start)
+        keys = group_ids
+    found = {bucket.group_id: bucket for bucket in buckets}
+    return {key: found.get(key) or StatsBucket(group_id=key, bucket_start=bucket_start) for key in keys}
+
+
+def get_actual_counters(start: datetime, end: datetime) -> dict:
+    """Counters of buckets in [start, end) computed from Tacks, Offers and Transactions"""
+
+    actual = defaultdict(dict)
+
+    def add(keys: set, time: datetime, counters: dict):
+        for group_id in keys:
+            bucket = actual[(group_id, get_bucket_start(time))]
+            for field, value in counters.items():
+                bucket[field] = bucket[field] + value if field in bucket else value
+
+    for tack in Tack.objects.filter(
+            creation_time__gte=start,
+            creation_time__lt=end
+    ).only("group", "creation_time", "price", "allow_counter_offer").iterator():
+        add(get_bucket_keys(tack.group_id), tack.creation_time, get_tack_created_counters(tack))
+
+    offers = Offer.objects.filter(tack=OuterRef("pk")).order_by().values("tack")
+    for tack in Tack.objects.filter(
+            accepted_time__gte=start,
+            accepted_time__lt=end
+    ).annotate(
+        num_offers=Subquery(offers.annotate(count=Count("id")).values("count"), output_field=IntegerField()),
+        first_offer_creation_time=Subquery(
+            offers.annotate(first=Min("creation_time")).values("first"),
+            output_field=DateTimeField()
+        ),
+    ).only("group", "creation_time", "accepted_time").iterator():
+        add(
+            get_bucket_keys(tack.group_id),
+            tack.accepted_time,
+            get_tack_accepted_counters(tack, tack.num_offers or 0, tack.first_offer_creation_time)
+        )
+
+    for tack in Tack.objects.filter(
+            completion_time__gte=start,
+            completion_time__lt=end
+    ).only("group", "completion_time").iterator():
+        add(get_bucket_keys(tack.group_id), tack.completion_time, get_tack_completed_counters(tack))
+
+    for tr in Transaction.objects.filter(
+            creation_time__gte=start,
+            creation_time__lt=end
+    ).annotate(
+        paid_tack_group_id=F("paid_tack__group")
+    ).iterator():
+        add(get_bucket_keys(tr.paid_tack_group_id), tr.creation_time, get_transaction_counters(tr))
+
+    return actual
+
+
+def correct_stats_buckets() -> int:
+    """
+    Rebuild closed buckets of the correction window from Tacks, Offers and Transactions
+    and fix buckets that missed or doubled events. Returns number of corrected buckets
+    """
+
+    now = timezone.now()
+    window_start = get_bucket_start(now - ROLLUP_CORRECTION_WINDOW)
+    correction_end = get_bucket_start(now - ROLLUP_CORRECTION_DELAY)
+    actual = get_actual_counters(window_start, correction_end)
+
+    with transaction.atomic():
+        buckets = StatsBucket.objects.select_for_update().filter(
+            bucket_start__gte=window_start,
+            bucket_start__lt=correction_end
+        )
+        changed = []
+        for bucket in buckets:
+            counters = actual.pop((bucket.group_id, bucket.bucket_start), {})
+            empty = StatsBucket()
+            values = {field: counters.get(field, getattr(empty, field)) for field in COUNTER_FIELDS}
+            if any(getattr(bucket, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(bucket, field, value)
+                changed.append(bucket)
+        StatsBucket.objects.bulk_update(changed, COUNTER_FIELDS)
+        missing = StatsBucket.objects.bulk_create(
+            StatsBucket(group_id=group_id, bucket_start=bucket_start, **counters)
+            for (group_id, bucket_start), counters in actual.items()
+        )
+        corrected = len(changed) + len(missing)
+
+    if corrected:
+        logger.warning(f"Corrected {corrected} stats buckets")
+    return corrected
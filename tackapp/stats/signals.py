@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from payment.models import Transaction
+from stats.definitions import invalidate_definitions
+from stats.models import Definitions
+from stats.rollup_service import record_tack_created, record_transaction_created
+from tack.models import Tack
+
+
+@receiver(signal=post_save, sender=Tack)
+def tack_created_stats(instance: Tack, created: bool, *args, **kwargs):
+    if created:
+        record_tack_created(instance)
+
+
+@receiver(signal=post_save, sender=Transaction)
+def transaction_created_stats(instance: Transaction, created: bool, *args, **kwargs):
+    if created:
+        record_transaction_created(instance)
+
+
+@receiver(signal=post_save, sender=Definitions)
+@receiver(signal=post_delete, sender=Definitions)
+def definitions_changed(*args, **kwargs):
+    transaction.on_commit(invalidate_definitions)
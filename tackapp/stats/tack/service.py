@@ -1,43 +1,39 @@
-import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from django.db.models import Count, Avg, FloatField, ExpressionWrapper, QuerySet, F, Min, Q, DateTimeField
+from django.db.models import Count, Avg, QuerySet, F, OuterRef, Subquery, DateTimeField
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from core.choices import TackStatus, OfferStatus
 from group.models import Group
-from stats.models import Definitions
-from stats.utils import _setup_filters
-from tack.models import Tack
+from stats.definitions import get_definitions
+from stats.rollup_service import get_buckets
+from stats.utils import aggregate_by_group, average
+from tack.models import Tack, Offer
 from user.models import User
 
-definitions = Definitions.objects.last()
-
-tack_created_last_x_days_for_tacker = definitions.tack_created_last_x_days_for_tacker if definitions else 7
-amount_of_tacks_for_tacker = definitions.amount_of_tacks_for_tacker if definitions else 1
-amount_of_tacks_for_runner = definitions.amount_of_tacks_for_runner if definitions else 3
-
 
 class TackStats:
     def __init__(
             self,
+            bucket_start: datetime,
             created_tacks_last_hour: QuerySet[Tack],
-            accepted_tacks_last_hour: QuerySet[Tack],
             completed_tacks_last_hour: QuerySet[Tack],
             active_users_last_week: QuerySet[User],
     ):
+        self.bucket_start = bucket_start
         self.created_tacks_last_hour = created_tacks_last_hour
-        self.accepted_tacks_last_hour = accepted_tacks_last_hour
         self.completed_tacks_last_hour = completed_tacks_last_hour
         self.active_users_last_week = active_users_last_week
+        definitions = get_definitions()
+        tacker_days = timedelta(days=definitions.tack_created_last_x_days_for_tacker)
         self.tackers = self.active_users_last_week.filter(
-            tack_tacker__creation_time__gte=timezone.now() - timedelta(days=tack_created_last_x_days_for_tacker),
+            tack_tacker__creation_time__gte=timezone.now() - tacker_days,
             tack_tacker__is_active=True,
         ).annotate(
             tack_num_as_tacker=Count('tack_tacker')
         ).filter(
-            tack_num_as_tacker__gte=amount_of_tacks_for_tacker
+            tack_num_as_tacker__gte=definitions.amount_of_tacks_for_tacker
         )
         self.runners = self.active_users_last_week.filter(
             offer__status__in=(
@@ -48,124 +44,103 @@ class TackStats:
         ).annotate(
             tack_num_as_runner=Count('tack_runner')
         ).filter(
-            tack_num_as_runner__gte=amount_of_tacks_for_runner
+            tack_num_as_runner__gte=definitions.amount_of_tacks_for_runner
         )
 
-    def get_num_tacks_created_last_hour(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        return self.created_tacks_last_hour.filter(
-            **filters
-        ).count()
-
-    def get_num_tacks_accepted_last_hour(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        return self.accepted_tacks_last_hour.filter(
-            **filters
-        ).count()
-
-    def get_num_tacks_completed_last_hour(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        return self.completed_tacks_last_hour.filter(
-            **filters
-        ).count()
-
-    def get_num_tacks_created_by_tackers_last_hour(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        tackers = self.tackers.filter(**filters)
-        return self.created_tacks_last_hour.filter(
-            tacker__in=tackers,
-            **filters
-        ).count()
-
-    def get_num_tacks_completed_by_runners_last_hour(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        runners = self.runners.filter(**filters)
-        return self.completed_tacks_last_hour.filter(
-            runner__in=runners,
-            creation_time__gte=timezone.now() - timedelta(hours=1),
-            **filters
-        ).count()
-
-    def get_avg_price_last_hour(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        return self.created_tacks_last_hour.filter(
-            **filters
-        ).aggregate(
-            avg_price=Avg('price')
-        )["avg_price"] or 0
-
-    def get_avg_tackers_time_estimation(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        tackers = self.tackers.filter(**filters)
-        return self.created_tacks_last_hour.filter(
-            tacker__in=tackers,
-            **filters
-        ).aggregate(
-            avg_time_estimation_sec=Avg('estimation_time_seconds')
-        )["avg_time_estimation_sec"] or 0
-
-    def get_avg_first_offer_time(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        return self.accepted_tacks_last_hour.filter(
-            accepted_time__isnull=False,
-            **filters
-        ).annotate(
-            offer_min_creation_time=Min('offer__creation_time'),
-        ).aggregate(
-            avg_first_offer_time=Avg(
-                Coalesce(
-                    F('offer_min_creation_time'),
-                    timezone.now()
-                ) - F('creation_time'))
-        )["avg_first_offer_time"] or timedelta(minutes=0)
-
-    def get_avg_first_offer_time_seconds(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        avg_first_offer_time_seconds = Tack.active.filter(
-            **filters,
-            status__in=(
-                TackStatus.CREATED,
-                TackStatus.ACTIVE,
-                TackStatus.ACCEPTED,
-                TackStatus.IN_PROGRESS
-            ),
-        ).annotate(
-            first_offer_time=Coalesce(
-                Min('offer__creation_time'),
-                timezone.now()
-            ) - F('creation_time')
-        ).aggregate(
-            avg_first_offer_time=Avg(
-                'first_offer_time'
-            )
-        )["avg_first_offer_time"]
-        return avg_first_offer_time_seconds.total_seconds() if avg_first_offer_time_seconds else 0
-
-    def get_runner_tacker_ratio(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        tackers = self.tackers.filter(**filters)
-        runners = self.runners.filter(**filters)
-        return len(runners) / len(tackers) if len(tackers) else len(runners)
+    def get_stats(self, groups: list[Group] = None) -> dict:
+        """
+        GroupStats/GlobalStats Tack fields as {None: fields} for global stats,
+        otherwise {group_id: fields} of every group.
+        Event counters are read from the hour StatsBucket, the rest is computed with GROUP BY queries
+        """
+
+        group_ids = [group.id for group in groups] if groups is not None else None
+        keys = group_ids if groups is not None else [None]
+        now = timezone.now()
+
+        buckets = get_buckets(self.bucket_start, group_ids)
+        tackers_tacks = self.created_tacks_last_hour.filter(tacker__in=self.tackers.values("id"))
+        runners_tacks = self.completed_tacks_last_hour.filter(
+            runner__in=self.runners.values("id"),
+            creation_time__gte=self.bucket_start,
+        )
+        if groups is not None:
+            # tackers and runners of a group are narrowed down to the group owner
+            tackers_tacks = tackers_tacks.filter(tacker=F("group__owner"))
+            runners_tacks = runners_tacks.filter(runner=F("group__owner"))
+
+        first_offer_creation_time = Subquery(
+            Offer.objects.filter(
+                tack=OuterRef("pk")
+            ).order_by(
+                "creation_time"
+            ).values("creation_time")[:1],
+            output_field=DateTimeField()
+        )
 
-    def get_avg_num_offers_before_accept(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        return self.accepted_tacks_last_hour.filter(
-            **filters
-        ).annotate(
-            num_offers=Count("offer")
-        ).aggregate(
-            avg_offer_num_before_accept=ExpressionWrapper(
-                Coalesce(
-                    Avg("num_offers"),
-                    0
+        tackers_stats = aggregate_by_group(
+            tackers_tacks,
+            group_ids,
+            num_tacks_created_by_tackers_last_hour=Count("id"),
+            avg_tackers_time_estimation=Avg("estimation_time_seconds"),
+        )
+        runners_stats = aggregate_by_group(
+            runners_tacks,
+            group_ids,
+            num_tacks_completed_by_runners_last_hour=Count("id"),
+        )
+        first_offer_stats = aggregate_by_group(
+            Tack.active.filter(
+                status__in=(
+                    TackStatus.CREATED,
+                    TackStatus.ACTIVE,
+                    TackStatus.ACCEPTED,
+                    TackStatus.IN_PROGRESS
                 ),
-                output_field=FloatField()
-            )
-        )["avg_offer_num_before_accept"]
+            ).annotate(
+                first_offer_time=Coalesce(first_offer_creation_time, now) - F("creation_time")
+            ),
+            group_ids,
+            avg_first_offer_time_seconds=Avg("first_offer_time"),
+        )
 
-    def get_num_allowed_counteroffers(self, group: Group = None):
-        filters = _setup_filters(group=group)
-        return self.created_tacks_last_hour.filter(
-            allow_counter_offer=True,
-            **filters
-        ).count()
+        if groups is None:
+            ratios = {None: self.get_runner_tacker_ratio(len(self.runners), len(self.tackers))}
+        else:
+            tacker_ids = set(self.tackers.values_list("id", flat=True))
+            runner_ids = set(self.runners.values_list("id", flat=True))
+            ratios = {
+                group.id: self.get_runner_tacker_ratio(
+                    int(group.owner_id in runner_ids),
+                    int(group.owner_id in tacker_ids)
+                )
+                for group in groups
+            }
+
+        stats = {}
+        for key in keys:
+            bucket = buckets[key]
+            values = tackers_stats.get(key, {}) | runners_stats.get(key, {})
+            avg_first_offer_time_seconds = first_offer_stats.get(key, {}).get("avg_first_offer_time_seconds")
+            stats[key] = {
+                "num_tacks_created_last_hour": bucket.tacks_created,
+                "num_tacks_accepted_last_hour": bucket.tacks_accepted,
+                "num_tacks_completed_last_hour": bucket.tacks_completed,
+                "num_tacks_created_by_tackers_last_hour": values.get("num_tacks_created_by_tackers_last_hour") or 0,
+                "num_tacks_completed_by_runners_last_hour": values.get("num_tacks_completed_by_runners_last_hour") or 0,
+                "avg_price_last_hour": average(bucket.sum_price, bucket.tacks_created),
+                "avg_tackers_time_estimation": values.get("avg_tackers_time_estimation") or 0,
+                "avg_first_offer_time":
+                    bucket.sum_first_offer_time / bucket.tacks_accepted if bucket.tacks_accepted
+                    else timedelta(minutes=0),
+                "avg_first_offer_time_seconds":
+                    avg_first_offer_time_seconds.total_seconds() if avg_first_offer_time_seconds else 0,
+                "runner_tacker_ratio": ratios[key],
+                "avg_num_offers_before_accept": average(bucket.sum_offers_before_accept, bucket.tacks_accepted),
+                "num_allowed_counteroffers": bucket.allowed_counteroffers,
+            }
+        return stats
+
+    @staticmethod
+    def get_runner_tacker_ratio(runners_count: int, tackers_count: int):
+        return runners_count / tackers_count if tackers_count else runners_count
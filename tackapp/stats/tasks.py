@@ -3,25 +3,24 @@ import time
 from datetime import timedelta
 
 import django
+import redis
 from celery import shared_task
 from django.db import models
 from django.db.models import F
 from django.utils import timezone
 
-from stats.payment.utils import get_payment_stats_dict
-from stats.models import GlobalStats, GroupStats, Definitions
-from stats.tack.utils import get_tack_stats_dict
-from stats.user.utils import get_user_stats_dict
+from stats.definitions import get_definitions
+from stats.models import GlobalStats, GroupStats
 from stats.payment.service import PaymentStats
+from stats.rollup_service import get_bucket_start, correct_stats_buckets, ROLLUP_BUCKET
 from stats.user.service import UserStats
+from stats.visits_service import flush_user_visits
 from stats.tack.service import TackStats
 from group.models import Group
 from tack.models import Tack
 from user.models import User
 
 logger = logging.getLogger('debug')
-definitions = Definitions.objects.last()
-active_user_timedelta_days = definitions.active_user_timedelta_days if definitions else 7
 
 
 @shared_task
@@ -45,44 +44,69 @@ def migrate_avg_first_offer_time():
 def collect_stats():
     """Main task for collecting statistics for grafana"""
 
+    try:
+        # visits of the last hour may still be buffered in Redis
+        flush_user_visits()
+    except redis.RedisError as e:
+        logger.error(f"stats.tasks.collect_stats: visits are not flushed {e = }")
+
+    # snapshot of the last closed hour. Transactions attached to a Tack of a group later and
+    # corrections made by correct_stats_buckets reach StatsBucket, but not this snapshot
+    bucket_start = get_bucket_start(timezone.now()) - ROLLUP_BUCKET
+    bucket_end = bucket_start + ROLLUP_BUCKET
     tack_stats = TackStats(
+        bucket_start=bucket_start,
         created_tacks_last_hour=Tack.objects.filter(
-            creation_time__gte=timezone.now() - timedelta(hours=1)
-        ),
-        accepted_tacks_last_hour=Tack.objects.filter(
-            accepted_time__gte=timezone.now() - timedelta(hours=1)
+            creation_time__gte=bucket_start,
+            creation_time__lt=bucket_end
         ),
         completed_tacks_last_hour=Tack.objects.filter(
-            completion_time__gte=timezone.now() - timedelta(hours=1)
+            completion_time__gte=bucket_start,
+            completion_time__lt=bucket_end
         ),
         active_users_last_week=User.objects.filter(
-            last_login__gte=timezone.now() - timedelta(days=active_user_timedelta_days)
+            last_login__gte=timezone.now() - timedelta(days=get_definitions().active_user_timedelta_days)
         ),
     )
-    user_stats = UserStats()
-    payment_stats = PaymentStats()
+    user_stats = UserStats(bucket_start)
+    payment_stats = PaymentStats(bucket_start)
 
     start_time = time.time()
-    global_tack_stats_dict = get_tack_stats_dict(tack_stats)
-    global_user_stats_dict = get_user_stats_dict(user_stats)
-    global_payment_stats_dict = get_payment_stats_dict(payment_stats)
-    global_stats_dict = global_tack_stats_dict | global_user_stats_dict | global_payment_stats_dict
+    global_stats_dict = tack_stats.get_stats()[None] | user_stats.get_stats()[None] | payment_stats.get_stats()[None]
     logger.debug(f"{global_stats_dict = }")
     GlobalStats.objects.create(**global_stats_dict)
     logger.info(f"Global stats took ~ {round(time.time() - start_time, 2)} seconds")
 
     start_time = time.time()
-    collected_group_for_stats = Group.objects.filter(collect_stats=True)
-    group_stats_list = []
-    for group in collected_group_for_stats:
-        payment_stats = PaymentStats(group=group)
-        group_tack_stats_dict = get_tack_stats_dict(tack_stats, group=group)
-        group_user_stats_dict = get_user_stats_dict(user_stats, group=group)
-        group_payment_stats_dict = get_payment_stats_dict(payment_stats, group=group)
-        group_stats_dict = {"group": group} | group_tack_stats_dict | group_user_stats_dict | group_payment_stats_dict
-        logger.debug(f"{group_stats_dict = }")
-        group_stats_list.append(GroupStats(**group_stats_dict))
+    # every metric is computed for all groups at once with GROUP BY group queries
+    collected_group_for_stats = list(Group.objects.filter(collect_stats=True))
+    group_tack_stats = tack_stats.get_stats(collected_group_for_stats)
+    group_user_stats = user_stats.get_stats(collected_group_for_stats)
+    group_payment_stats = payment_stats.get_stats(collected_group_for_stats)
+    group_stats_list = [
+        GroupStats(
+            group=group,
+            **group_tack_stats[group.id],
+            **group_user_stats[group.id],
+            **group_payment_stats[group.id]
+        )
+        for group in collected_group_for_stats
+    ]
     GroupStats.objects.bulk_create(group_stats_list)
     logger.info(f"Group stats took ~ {round(time.time() - start_time, 2)} seconds")
 
     logger.info("Stats collection finished")
+
+
+@shared_task
+def correct_stats_buckets_task():
+    """Fix drift of hourly stats buckets against Tacks and Transactions"""
+
+    correct_stats_buckets()
+
+
+@shared_task
+def flush_user_visits_task():
+    """Write visits buffered in Redis to UserVisits"""
+
+    flush_user_visits()
@@ -1,50 +1,60 @@
-from datetime import timedelta
-from django.db.models import Avg, Sum, Q
-from django.utils import timezone
+from datetime import datetime
+from django.db.models import Avg, Sum
 
-from stats.utils import _setup_filters
 from payment.models import BankAccount
 from stats.models import UserVisits
-from group.models import Group
-from user.models import User
+from stats.rollup_service import ROLLUP_BUCKET
+from stats.utils import aggregate_by_group
+from group.models import Group, GroupMembers
 
 
 class UserStats:
-    def __init__(self):
-        pass
+    def __init__(self, bucket_start: datetime):
+        self.bucket_start = bucket_start
 
-    def get_avg_total_user_balance(self, group: Group = None):
-        filters = _setup_filters(groupmembers__group=group)
-        users = User.objects.filter(
-            **filters,
-        )
-        return BankAccount.objects.filter(
-            user__in=users
-        ).aggregate(
-            avg_user_balance=Avg('usd_balance')
-        )["avg_user_balance"] or 0
-
-    def get_sum_total_user_balance(self, group: Group = None):
-        filters = _setup_filters(groupmembers__group=group)
-        users = User.objects.filter(
-            **filters,
-        )
-        return BankAccount.objects.filter(
-            user__in=users
-        ).aggregate(
-            sum_user_balance=Sum('usd_balance')
-        )["sum_user_balance"] or 0
-
-    def get_user_visits_count_per_hour(self, group: Group = None) -> int:
+    def get_stats(self, groups: list[Group] = None) -> dict:
         """
-        Collect  information about attendance by users of the application
+        GroupStats/GlobalStats User fields as {None: fields} for global stats,
+        otherwise {group_id: fields} of group members computed with GROUP BY queries
         """
-        filters: dict = _setup_filters(groupmembers__group=group)
-        users = User.objects.filter(
-            **filters,
-        )
-        count_users_visits: int = UserVisits.objects.filter(
-                user__in=users,
-                timestamp__gte=timezone.now() - timedelta(hours=1)
-        ).count()
-        return count_users_visits
+
+        bucket_end = self.bucket_start + ROLLUP_BUCKET
+        if groups is None:
+            keys = [None]
+            balance_stats = aggregate_by_group(
+                BankAccount.objects.all(),
+                None,
+                avg_total_user_balance=Avg("usd_balance"),
+                sum_total_user_balance=Sum("usd_balance"),
+            )
+            visits_stats = aggregate_by_group(
+                UserVisits.objects.filter(timestamp__gte=self.bucket_start, timestamp__lt=bucket_end),
+                None,
+                users_visits_per_hour=Sum("count"),
+            )
+        else:
+            keys = [group.id for group in groups]
+            members = GroupMembers.objects.filter(member__isnull=False)
+            balance_stats = aggregate_by_group(
+                members,
+                keys,
+                avg_total_user_balance=Avg("member__bankaccount__usd_balance"),
+                sum_total_user_balance=Sum("member__bankaccount__usd_balance"),
+            )
+            visits_stats = aggregate_by_group(
+                members.filter(
+                    member__visits__timestamp__gte=self.bucket_start,
+                    member__visits__timestamp__lt=bucket_end
+                ),
+                keys,
+                users_visits_per_hour=Sum("member__visits__count"),
+            )
+
+        return {
+            key: {
+                "avg_total_user_balance": balance_stats.get(key, {}).get("avg_total_user_balance") or 0,
+                "sum_total_user_balance": balance_stats.get(key, {}).get("sum_total_user_balance") or 0,
+                "users_visits_per_hour": visits_stats.get(key, {}).get("users_visits_per_hour") or 0,
+            }
+            for key in keys
+        }
@@ -1,6 +1,23 @@
-def _setup_filters(**kwargs):
-    filters = dict()
-    for key, value in kwargs.items():
-        if value:
-            filters[key] = value
-    return filters
+from django.db.models import F, QuerySet
+
+
+def aggregate_by_group(queryset: QuerySet, group_ids: list[int] | None, group_field: str = "group", **aggregates):
+    """
+    Global aggregate as {None: values} when group_ids is None,
+    otherwise one GROUP BY group_field query as {group_id: values}. Groups without rows are missing
+    """
+
+    if group_ids is None:
+        return {None: queryset.aggregate(**aggregates)}
+    rows = queryset.filter(
+        **{f"{group_field}__in": group_ids}
+    ).values(
+        group_key=F(group_field)
+    ).annotate(
+        **aggregates
+    ).order_by()
+    return {row.pop("group_key"): row for row in rows}
+
+
+def average(total, count: int):
+    return total / count if count else 0
@@ -0,0 +1,104 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import redis
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+
+from stats.models import UserVisits, UserVisitsBatch
+from stats.rollup_service import get_bucket_start
+from tackapp.settings import CACHES
+from user.models import User
+
+
+logger = logging.getLogger("debug")
+
+# hash of "<user_id>:<hour timestamp>": visits not written to DB yet
+USER_VISITS_PENDING_KEY = "user_visits:pending"
+# pending hash taken by flush_user_visits, kept until its visits are written
+USER_VISITS_FLUSHING_KEY = "user_visits:flushing"
+# field of the flushing hash with id of its UserVisitsBatch
+USER_VISITS_BATCH_FIELD = "batch"
+# written batch ids are kept longer than a batch can wait in the flushing hash
+USER_VISITS_BATCH_RETENTION = timedelta(days=7)
+USER_VISITS_FLUSH_LOCK_KEY = "user_visits:flush_lock"
+USER_VISITS_FLUSH_LOCK_TIMEOUT = 300
+USER_VISITS_BATCH_SIZE = 1000
+
+_redis: redis.Redis | None = None
+
+
+def get_redis() -> redis.Redis:
+    """Client of the Redis used by cache, created on the first use"""
+
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(CACHES["default"]["LOCATION"])
+    return _redis
+
+
+def add_visit(user_id: int):
+    """Count visit with one HINCRBY, visits are written to DB by flush_user_visits"""
+
+    hour_start = get_bucket_start(timezone.now())
+    try:
+        get_redis().hincrby(USER_VISITS_PENDING_KEY, f"{user_id}:{int(hour_start.timestamp())}", 1)
+    except redis.RedisError as e:
+        logger.error(f"stats.visits_service.add_visit {e = }")
+        UserVisits.objects.create(user_id=user_id, timestamp=hour_start)
+
+
+def flush_user_visits() -> int:
+    """
+    Write buffered visits as one UserVisits row per User and hour.
+    Pending hash is renamed first, so visits counted during the flush go to a new hash.
+    Hash left by a failed flush is written on the next run, its batch id is saved with
+    the visits in one transaction, so a hash that was already written is only deleted.
+    Returns number of visits
+    """
+
+    client = get_redis()
+    with client.lock(USER_VISITS_FLUSH_LOCK_KEY, timeout=USER_VISITS_FLUSH_LOCK_TIMEOUT):
+        if not client.exists(USER_VISITS_FLUSHING_KEY):
+            try:
+                client.rename(USER_VISITS_PENDING_KEY, USER_VISITS_FLUSHING_KEY)
+            except redis.ResponseError:
+                # no visits since the last flush
+                return 0
+        client.hsetnx(USER_VISITS_FLUSHING_KEY, USER_VISITS_BATCH_FIELD, uuid4().hex)
+
+        batch_id = None
+        counts = defaultdict(int)
+        for field, value in client.hgetall(USER_VISITS_FLUSHING_KEY).items():
+            field = field.decode()
+            if field == USER_VISITS_BATCH_FIELD:
+                batch_id = value.decode()
+                continue
+            user_id, hour = field.split(":")
+            counts[(int(user_id), int(hour))] += int(value)
+        # visits of Users deleted since are dropped
+        user_ids = set(User.objects.filter(
+            id__in={user_id for user_id, _ in counts}
+        ).values_list("id", flat=True))
+        user_visits = [
+            UserVisits(user_id=user_id, timestamp=datetime.fromtimestamp(hour, tz=timezone.utc), count=count)
+            for (user_id, hour), count in counts.items()
+            if user_id in user_ids
+        ]
+        try:
+            with transaction.atomic():
+                UserVisitsBatch.objects.create(batch_id=batch_id)
+                UserVisits.objects.bulk_create(user_visits, batch_size=USER_VISITS_BATCH_SIZE)
+        except IntegrityError:
+            if not UserVisitsBatch.objects.filter(batch_id=batch_id).exists():
+                raise
+            logger.warning(f"User visits batch {batch_id} is already written")
+            user_visits = []
+        client.delete(USER_VISITS_FLUSHING_KEY)
+
+    UserVisitsBatch.objects.filter(flush_time__lt=timezone.now() - USER_VISITS_BATCH_RETENTION).delete()
+    visits = sum(user_visit.count for user_visit in user_visits)
+    logger.info(f"Flushed {visits} visits of {len(user_ids)} users")
+    return visits
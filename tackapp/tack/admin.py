@@ -10,8 +10,9 @@ from django.db import transaction
 from django.utils import timezone
 
 from core.choices import TackStatus
+from payment.balance_service import release_tack_hold
 from payment.services import convert_to_decimal
-from .models import Tack, Offer, PopularTack
+from .models import Tack, Offer, PopularTack, OutboxEvent
 from django.contrib.admin import ModelAdmin
 from core.choices import TackStatus
 from django.utils import timezone
@@ -28,6 +29,7 @@ from django.db.models import (
 )
 
 from .services import confirm_complete_tack, delete_tack_offers
+from .tasks import dispatch_outbox_events_task
 logger = logging.getLogger('debug')
 
 
@@ -168,9 +170,7 @@ class TackAdmin(AdminAdvancedFiltersMixin, ModelAdmin):
         for tack in filtered_queryset:
             with transaction.atomic():
                 delete_tack_offers(tack)
-                if tack.auto_accept:
-                    tack.tacker.bankaccount.usd_balance += tack.price
-                    tack.tacker.bankaccount.save()
+                release_tack_hold(tack)
                 tack.delete()
 
     @admin.action(description='Finish selected Tacks (from Waiting Review)')
@@ -271,3 +271,20 @@ class OfferAdmin(AdminAdvancedFiltersMixin, ModelAdmin):
         if decimal_amount % 1:
             return f"${decimal_amount:.2f}"
         return f"${str(decimal_amount)}"
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(ModelAdmin):
+    list_per_page = 50
+    list_display = ('id', 'event_type', 'tack', 'offer', 'creation_time', 'processed_time', 'attempts')
+    list_filter = ('event_type',)
+    readonly_fields = ('event_type', 'tack', 'offer', 'creation_time', 'processed_time')
+    search_fields = ('id', 'tack__id', 'offer__id')
+    search_help_text = "Search by Outbox event id; Tack id; Offer id"
+    ordering = ('-id',)
+    actions = ('retry_events',)
+
+    @admin.action(description="Retry selected events")
+    def retry_events(self, request, queryset):
+        queryset.filter(processed_time__isnull=True).update(attempts=0)
+        dispatch_outbox_events_task.delay()
@@ -0,0 +1,104 @@
+"""Module for the explain_hot_queries management command.
+
+Runs EXPLAIN for the hot Tack and Offer queries of the API
+and fails if any of them reads tacks or offers table with a sequential scan.
+Sequential scans are disabled for the session, so a Seq Scan in the plan means
+there is no index the query can use at all (plans of small seeded DBs are still meaningful).
+
+Invoke like so:
+    python manage.py explain_hot_queries
+    python manage.py explain_hot_queries --verbose-plans
+"""
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from core.choices import TackStatus, OfferStatus
+from tack.models import Tack, Offer
+
+
+CHECKED_TABLES = (Tack._meta.db_table, Offer._meta.db_table)
+
+HOT_QUERIES = {
+    "group tacks": lambda ids: Tack.active.filter(
+        group=ids["group"],
+        status__in=(TackStatus.CREATED, TackStatus.ACTIVE)
+    ).order_by("-creation_time", "-id")[:10],
+    "me as tacker": lambda ids: Tack.active.filter(
+        tacker=ids["user"]
+    ).exclude(
+        status=TackStatus.FINISHED
+    ).order_by("-creation_time"),
+    "previous as tacker": lambda ids: Tack.active.filter(
+        tacker=ids["user"],
+        status=TackStatus.FINISHED
+    ).order_by("-creation_time")[:10],
+    "previous as runner": lambda ids: Tack.active.filter(
+        runner=ids["user"],
+        status=TackStatus.FINISHED
+    ).order_by("-creation_time")[:10],
+    "ongoing runner tacks": lambda ids: Tack.active.filter(
+        runner=ids["user"],
+        status=TackStatus.IN_PROGRESS
+    ),
+    "tack offers": lambda ids: Offer.active.filter(
+        tack=ids["tack"],
+        status=OfferStatus.CREATED
+    ),
+    "me offers": lambda ids: Offer.active.filter(
+        runner=ids["user"]
+    ).order_by("-creation_time")[:10],
+}
+
+
+class Command(BaseCommand):
+    """EXPLAIN hot Tack/Offer queries and fail on sequential scans."""
+
+    help = "EXPLAIN hot Tack/Offer queries and fail on sequential scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="print full plan of every query",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("explain_hot_queries requires PostgreSQL")
+
+        ids = self.get_sample_ids()
+        seq_scan_re = re.compile(rf"Seq Scan on ({'|'.join(CHECKED_TABLES)})\b")
+        failed = []
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            for name, build_queryset in HOT_QUERIES.items():
+                plan = build_queryset(ids).explain()
+                if options["verbose_plans"]:
+                    self.stdout.write(f"{name}:\n{plan}\n")
+                if seq_scan_re.search(plan):
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f"SEQ SCAN {name}"))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK {name}"))
+
+        if failed:
+            raise CommandError(f"Sequential scan in: {', '.join(failed)}")
+
+    @staticmethod
+    def get_sample_ids() -> dict:
+        """Ids of the most active tacker, Group and Tack. Plans do not depend on them much"""
+
+        def most_frequent(queryset, field: str) -> int:
+            row = queryset.values(field).annotate(n=Count("id")).order_by("-n").first()
+            return (row or {}).get(field) or 0
+
+        return {
+            "user": most_frequent(Tack.objects, "tacker"),
+            "group": most_frequent(Tack.objects, "group"),
+            "tack": most_frequent(Offer.objects, "tack"),
+        }
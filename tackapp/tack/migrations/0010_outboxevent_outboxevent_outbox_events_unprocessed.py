@@ -0,0 +1,35 @@
+# Generated by Django 4.0.8 on 2026-10-18 12:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tack', '0009_populartack_auto_accept_tack_auto_accept'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('offer_expiration', 'Offer expiration'), ('offer_created', 'Offer created'), ('offer_accepted', 'Offer accepted'), ('offer_in_progress', 'Offer in progress'), ('offer_finished', 'Offer finished'), ('offer_expired', 'Offer expired'), ('offer_deleted', 'Offer deleted'), ('offer_cancelled', 'Offer cancelled'), ('tack_created', 'Tack created'), ('tack_deleted', 'Tack deleted'), ('tack_cancelled', 'Tack cancelled'), ('tack_created_from_active', 'Tack created from active'), ('tack_active', 'Tack active'), ('tack_accepted', 'Tack accepted'), ('tack_in_progress', 'Tack in progress'), ('tack_waiting_review', 'Tack waiting for review'), ('tack_finished', 'Tack finished')], max_length=32)),
+                ('creation_time', models.DateTimeField(auto_now_add=True)),
+                ('processed_time', models.DateTimeField(blank=True, default=None, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('offer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tack.offer')),
+                ('tack', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tack.tack')),
+            ],
+            options={
+                'verbose_name': 'Outbox event',
+                'verbose_name_plural': 'Outbox events',
+                'db_table': 'outbox_events',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('processed_time__isnull', True)), fields=['id'], name='outbox_events_unprocessed'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.8 on 2026-10-18 12:38
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('tack', '0010_outboxevent_outboxevent_outbox_events_unprocessed'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['tack', 'status'], name='offers_tack_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['runner', '-creation_time'], name='offers_runner_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tack',
+            index=models.Index(condition=models.Q(('is_active', True), ('status__in', ('created', 'active'))), fields=['group', '-creation_time', '-id'], name='tacks_group_feed_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tack',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['tacker', 'status', '-creation_time'], name='tacks_tacker_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tack',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['runner', 'status', '-creation_time'], name='tacks_runner_active_idx'),
+        ),
+    ]
@@ -6,7 +6,8 @@ from django.core.validators import (
 from django.db.models import UniqueConstraint, Q
 
 from core.abstract_models import CoreModel
-from core.choices import TackStatus, OfferType, TackType, OfferStatus
+from core.choices import TackStatus, OfferType, TackType, OfferStatus, OutboxEventType
+from payment.balance_service import release_tack_hold
 from payment.models import BankAccount
 from user.models import User
 
@@ -62,9 +63,7 @@ class Tack(CoreModel):
             if self.accepted_offer:
                 self.accepted_offer.status = OfferStatus.CANCELLED
                 self.accepted_offer.is_active = False
-                ba = BankAccount.objects.get(user=self.tacker)
-                ba.usd_balance += self.price
-                ba.save()
+                release_tack_hold(self)
                 self.accepted_offer.save()
             self.save()
 
@@ -82,6 +81,24 @@ class Tack(CoreModel):
         db_table = "tacks"
         verbose_name = "Tack"
         verbose_name_plural = "Tacks"
+        indexes = [
+            # Group feed: created and active Tacks of Group by creation time
+            models.Index(
+                fields=("group", "-creation_time", "-id"),
+                condition=Q(is_active=True, status__in=(TackStatus.CREATED, TackStatus.ACTIVE)),
+                name="tacks_group_feed_idx"
+            ),
+            models.Index(
+                fields=("tacker", "status", "-creation_time"),
+                condition=Q(is_active=True),
+                name="tacks_tacker_active_idx"
+            ),
+            models.Index(
+                fields=("runner", "status", "-creation_time"),
+                condition=Q(is_active=True),
+                name="tacks_runner_active_idx"
+            ),
+        ]
 
 
 class Offer(CoreModel):
@@ -122,6 +139,18 @@ class Offer(CoreModel):
                 name='unique_runner_for_tack'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=("tack", "status"),
+                condition=Q(is_active=True),
+                name="offers_tack_active_idx"
+            ),
+            models.Index(
+                fields=("runner", "-creation_time"),
+                condition=Q(is_active=True),
+                name="offers_runner_active_idx"
+            ),
+        ]
 
 
 class PopularTack(models.Model):
@@ -148,3 +177,29 @@ class PopularTack(models.Model):
         db_table = "popular_tacks"
         verbose_name = "Popular Tack"
         verbose_name_plural = "Popular Tacks"
+
+
+class OutboxEvent(models.Model):
+    """Side effect of Tack/Offer save written in the same DB transaction and processed by outbox dispatcher"""
+
+    event_type = models.CharField(max_length=32, choices=OutboxEventType.choices)
+    tack = models.ForeignKey("tack.Tack", null=True, blank=True, on_delete=models.CASCADE)
+    offer = models.ForeignKey("tack.Offer", null=True, blank=True, on_delete=models.CASCADE)
+    creation_time = models.DateTimeField(auto_now_add=True)
+    processed_time = models.DateTimeField(null=True, blank=True, default=None)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.id}: {self.event_type}"
+
+    class Meta:
+        db_table = "outbox_events"
+        verbose_name = "Outbox event"
+        verbose_name_plural = "Outbox events"
+        indexes = [
+            models.Index(
+                fields=("id",),
+                condition=Q(processed_time__isnull=True),
+                name="outbox_events_unprocessed"
+            )
+        ]
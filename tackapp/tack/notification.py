@@ -11,15 +11,18 @@ from firebase_admin.messaging import (
     APNSPayload
 )
 
+from django.core.cache import cache
+
 from core.choices import NotificationType
-from group.models import Group
 from payment.services import convert_to_decimal
 from socials.models import NotificationSettings
 from tack.models import Tack, Offer
-from user.models import User
+from tack.utils import select_tack_relations, select_offer_relations
 
 logger = logging.getLogger("django")
 
+NTF_TEMPLATES_CACHE_KEY = "ntf_templates"
+
 ntf_type_dict = {
         NotificationType.TACK_CREATED: {
             "title": "Tack",
@@ -88,16 +91,33 @@ def human_readable_price(amount: int, currency: str = "USD"):
     return str(decimal_amount)
 
 
-def get_message_template(message_type: NotificationType) -> tuple:
-    try:
-        ntf_setting = NotificationSettings.objects.get(type=message_type)
-        selected_template = {
-            "title": ntf_setting.title_template,
-            "body": ntf_setting.body_template,
-            "image_url": None
+def get_message_templates() -> dict:
+    """NotificationSettings templates by type. Loaded with one query and cached until NotificationSettings change"""
+
+    templates = cache.get(NTF_TEMPLATES_CACHE_KEY)
+    if templates is None:
+        templates = {
+            ntf_type: (title_template, body_template)
+            for ntf_type, title_template, body_template in NotificationSettings.objects.values_list(
+                "type",
+                "title_template",
+                "body_template"
+            )
         }
-    except NotificationSettings.DoesNotExist:
-        selected_template = ntf_type_dict.get(message_type)
+        cache.set(NTF_TEMPLATES_CACHE_KEY, templates, None)
+    return templates
+
+
+def invalidate_message_templates():
+    cache.delete(NTF_TEMPLATES_CACHE_KEY)
+
+
+def get_message_template(message_type: NotificationType) -> tuple:
+    templates = get_message_templates()
+    if message_type in templates:
+        title, body = templates[message_type]
+        return title, body, None
+    selected_template = ntf_type_dict.get(message_type)
     return (
         selected_template.get("title"),
         selected_template.get("body"),
@@ -107,17 +127,19 @@ def get_message_template(message_type: NotificationType) -> tuple:
 
 def get_properties_dict(instance: Tack | Offer):
     match instance:
+        # already loaded relations are reused, missing ones are fetched with one select_related query
         case Tack() as tack:
-            tack = tack
-            tacker = User.objects.filter(id=tack.tacker_id).first()
-            runner = User.objects.filter(id=tack.runner_id).first()
-            group = Group.objects.filter(id=tack.group_id).first()
+            select_tack_relations(tack)
+            tacker = tack.tacker
+            runner = tack.runner
+            group = tack.group
             tack_or_offer_price = tack.price
         case Offer() as offer:
-            tack = Tack.objects.filter(id=offer.tack_id).first()
-            tacker = User.objects.filter(id=tack.tacker_id).first()
-            runner = User.objects.filter(id=offer.runner_id).first()
-            group = Group.objects.filter(id=tack.group_id).first()
+            select_offer_relations(offer)
+            tack = offer.tack
+            tacker = tack.tacker
+            runner = offer.runner
+            group = tack.group
             tack_or_offer_price = offer.price or tack.price
         case _:
             return dict()
@@ -169,20 +191,15 @@ def get_properties_dict(instance: Tack | Offer):
 
 def get_formatted_ntf_title_and_body(ntf_title: str, ntf_body: str, instance: Tack | Offer):
     properties = get_properties_dict(instance)
-    # TODO: map function?
     logger.debug(f"{properties = }")
-    formatted_ntf_title = ntf_title.format(
-        **properties.get("tack"),
-        **properties.get("tacker"),
-        **properties.get("runner"),
-        **properties.get("group"),
-    )
-    formatted_ntf_body = ntf_body.format(
+    format_kwargs = {
         **properties.get("tack"),
         **properties.get("tacker"),
         **properties.get("runner"),
         **properties.get("group"),
-    )
+    }
+    formatted_ntf_title = ntf_title.format_map(format_kwargs)
+    formatted_ntf_body = ntf_body.format_map(format_kwargs)
     return formatted_ntf_title, formatted_ntf_body
 
 
@@ -0,0 +1,124 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+
+from core.choices import OutboxEventType
+from core.ws_actions import ws_offer_created, ws_offer_in_progress, ws_offer_finished, ws_offer_expired, \
+    ws_offer_deleted, ws_offer_cancelled, ws_offer_accepted, ws_tack_created, ws_tack_deleted, ws_tack_cancelled, \
+    ws_tack_created_from_active, ws_tack_active, ws_tack_accepted, ws_tack_in_progress, ws_tack_waiting_review, \
+    ws_tack_finished
+from tack.models import OutboxEvent, Offer, Tack
+from tack.services import notification_on_tack_finished, notification_on_tack_waiting_review, \
+    notification_on_tack_in_progress, notification_on_tack_cancelled, deferred_notification_tack_inactive, \
+    notification_on_tack_created, notification_on_offer_expired, deferred_notification_tack_will_expire_soon, \
+    notification_on_offer_accepted, notification_on_offer_created, notification_on_tack_accepted, \
+    notification_on_offer_finished, deferred_offer_expiration, deferred_tack_status_finished
+from tackapp.websocket_messages import WSSender
+
+
+logger = logging.getLogger("django")
+
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+
+OFFER_HANDLERS = {
+    OutboxEventType.OFFER_EXPIRATION: (deferred_offer_expiration,),
+    OutboxEventType.OFFER_CREATED: (ws_offer_created, notification_on_offer_created),
+    OutboxEventType.OFFER_ACCEPTED: (ws_offer_accepted, notification_on_offer_accepted),
+    OutboxEventType.OFFER_IN_PROGRESS: (ws_offer_in_progress, deferred_notification_tack_will_expire_soon),
+    OutboxEventType.OFFER_FINISHED: (ws_offer_finished, notification_on_offer_finished),
+    OutboxEventType.OFFER_EXPIRED: (ws_offer_expired, notification_on_offer_expired),
+    OutboxEventType.OFFER_DELETED: (ws_offer_deleted,),
+    OutboxEventType.OFFER_CANCELLED: (ws_offer_cancelled,),
+}
+
+TACK_HANDLERS = {
+    OutboxEventType.TACK_CREATED: (
+        ws_tack_created,
+        notification_on_tack_created,
+        deferred_notification_tack_inactive
+    ),
+    OutboxEventType.TACK_DELETED: (ws_tack_deleted,),
+    OutboxEventType.TACK_CANCELLED: (ws_tack_cancelled, notification_on_tack_cancelled),
+    OutboxEventType.TACK_CREATED_FROM_ACTIVE: (ws_tack_created_from_active,),
+    OutboxEventType.TACK_ACTIVE: (ws_tack_active,),
+    OutboxEventType.TACK_ACCEPTED: (ws_tack_accepted, notification_on_tack_accepted),
+    OutboxEventType.TACK_IN_PROGRESS: (ws_tack_in_progress, notification_on_tack_in_progress),
+    OutboxEventType.TACK_WAITING_REVIEW: (
+        ws_tack_waiting_review,
+        notification_on_tack_waiting_review,
+        deferred_tack_status_finished
+    ),
+    OutboxEventType.TACK_FINISHED: (ws_tack_finished, notification_on_tack_finished),
+}
+
+
+def add_offer_event(offer: Offer, event_type: OutboxEventType):
+    OutboxEvent.objects.create(event_type=event_type, offer=offer, tack_id=offer.tack_id)
+    _schedule_dispatch()
+
+
+def add_tack_event(tack: Tack, event_type: OutboxEventType):
+    OutboxEvent.objects.create(event_type=event_type, tack=tack)
+    _schedule_dispatch()
+
+
+def _schedule_dispatch():
+    transaction.on_commit(_send_dispatch)
+
+
+def _send_dispatch():
+    # local import: tack.tasks is imported by tack.services
+    from tack.tasks import dispatch_outbox_events_task
+
+    try:
+        dispatch_outbox_events_task.delay()
+    except OperationalError as e:
+        # events are committed, periodic dispatch_outbox_events_task picks them up
+        logger.error(f"Outbox dispatch is not scheduled: {e}")
+
+
+def run_outbox_event(event: OutboxEvent):
+    if event.event_type in OFFER_HANDLERS:
+        handlers, instance = OFFER_HANDLERS[event.event_type], event.offer
+    else:
+        handlers, instance = TACK_HANDLERS[event.event_type], event.tack
+    for handler in handlers:
+        handler(instance)
+
+
+def dispatch_outbox_events(batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Process one batch of unprocessed outbox events in creation order.
+    Failed events are retried by the next dispatch until OUTBOX_MAX_ATTEMPTS.
+    Returns number of events taken from the table
+    """
+
+    with WSSender.batch(), transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(
+                skip_locked=True,
+                of=("self",)
+            ).filter(
+                processed_time__isnull=True,
+                attempts__lt=OUTBOX_MAX_ATTEMPTS
+            ).select_related(
+                "offer",
+                "tack"
+            ).order_by("id")[:batch_size]
+        )
+        for event in events:
+            try:
+                with transaction.atomic():
+                    run_outbox_event(event)
+            except Exception as e:
+                logger.exception(f"Outbox event {event} failed: {e}")
+                event.attempts += 1
+                if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    logger.error(f"Outbox event {event} is abandoned after {event.attempts} attempts")
+            else:
+                event.processed_time = timezone.now()
+        OutboxEvent.objects.bulk_update(events, ("processed_time", "attempts"))
+    return len(events)
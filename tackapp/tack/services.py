@@ -1,16 +1,19 @@
 import logging
+from datetime import timedelta
 
 from django.db import transaction, IntegrityError
 from django.utils import timezone
 from fcm_django.models import FCMDevice
 
 from core.choices import TackStatus, OfferStatus, NotificationType, OfferType
-from group.models import GroupMembers
+from payment.balance_service import hold_tack_price
 from payment.services import send_payment_to_runner
+from stats.rollup_service import record_tack_accepted, record_tack_completed
+from tackapp.fcm_messages import FCMSender
 from tackapp.websocket_messages import WSSender
 from .models import Offer, Tack
 from .notification import build_ntf_message
-from .tasks import tack_long_inactive, tack_will_expire_soon
+from .tasks import tack_long_inactive, tack_will_expire_soon, set_expire_offer_task, change_tack_status_finished
 
 
 logger = logging.getLogger("debug")
@@ -30,10 +33,10 @@ def accept_offer(offer: Offer):
     offer.tack.accepted_time = timezone.now()
     offer.tack.price = price
     offer.tack.save()
+    record_tack_accepted(offer.tack)
 
-    if not offer.tack.auto_accept:
-        offer.tack.tacker.bankaccount.usd_balance -= price
-    offer.tack.tacker.bankaccount.save()
+    # auto accept Tacks are held on creation, the hold is kept if price is the same
+    hold_tack_price(offer.tack, price)
 
 
 def delete_other_tack_offers(offer: Offer):
@@ -84,6 +87,7 @@ def complete_tack(tack: Tack, message: str = None):
     tack.completion_time = timezone.now()
     tack.status = TackStatus.WAITING_REVIEW
     tack.save()
+    record_tack_completed(tack)
 
     tack.accepted_offer.status = OfferStatus.FINISHED
     tack.accepted_offer.save()
@@ -115,18 +119,7 @@ def notification_on_tack_created(tack: Tack):  # TACK_CREATED
     if not tack.tacker:
         return
     message = build_ntf_message(NotificationType.TACK_CREATED, tack)
-    not_muted_members = GroupMembers.objects.filter(
-        group=tack.group_id,
-        is_muted=False
-    ).exclude(
-        member=tack.tacker_id
-    ).values_list(
-        "member",
-        flat=True
-    )
-    FCMDevice.objects.filter(
-        user__in=not_muted_members
-    ).send_message(message)
+    FCMSender.send_to_group(tack.group_id, message, exclude_user_id=tack.tacker_id)
 
 
 def deferred_notification_tack_inactive(tack: Tack):  # TACK_INACTIVE
@@ -142,6 +135,19 @@ def deferred_notification_tack_inactive(tack: Tack):  # TACK_INACTIVE
     )
 
 
+def deferred_tack_status_finished(tack: Tack):
+    # tacker has 12 hours to review completed tack, after that it is finished automatically
+    change_tack_status_finished.apply_async(countdown=43200, kwargs={"tack_id": tack.id})
+
+
+def deferred_offer_expiration(offer: Offer):
+    # counted from Offer creation so dispatcher delay does not prolong Offer lifetime
+    set_expire_offer_task.apply_async(
+        eta=offer.creation_time + timedelta(seconds=offer.lifetime_seconds),
+        kwargs={"offer_id": offer.id}
+    )
+
+
 def notification_on_tack_cancelled(tack: Tack):  # TACK_CANCELLED
     if not tack.tacker:
         return
@@ -1,29 +1,15 @@
 import logging
 
-from django.db.models import Subquery
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from core.choices import OfferStatus
-from core.ws_actions import ws_offer_created, ws_offer_in_progress, ws_offer_finished, ws_offer_expired, \
-    ws_offer_deleted, ws_offer_cancelled, ws_offer_accepted, ws_tack_created, ws_tack_deleted, ws_tack_cancelled, \
-    ws_tack_created_from_active, ws_tack_active, ws_tack_accepted, ws_tack_in_progress, ws_tack_waiting_review, \
-    ws_tack_finished
-from group.models import GroupMembers
+from core.choices import OfferStatus, OutboxEventType
 from tack.models import Offer, Tack
-from tack.serializers import TackDetailSerializer, OfferSerializer, TacksOffersSerializer
-from tackapp.websocket_messages import WSSender
-from tack.tasks import set_expire_offer_task, tack_long_inactive, tack_will_expire_soon, change_tack_status_finished
-from tack.services import notification_on_tack_finished, notification_on_tack_waiting_review, \
-    notification_on_tack_in_progress, notification_on_tack_cancelled, deferred_notification_tack_inactive, \
-    notification_on_tack_created, notification_on_offer_expired, deferred_notification_tack_will_expire_soon, \
-    notification_on_offer_accepted, notification_on_offer_created, notification_on_tack_accepted, \
-    notification_on_offer_finished
+from tack.outbox import add_offer_event, add_tack_event
 
 from core.choices import TackStatus
 
 
-ws_sender = WSSender()
 logger = logging.getLogger('debug')
 
 
@@ -31,11 +17,7 @@ logger = logging.getLogger('debug')
 def run_delete_offer_task(instance: Offer, created: bool, *args, **kwargs):
     logger.debug(f"run_delete_offer_task. {instance.status = }")
     if created:
-        task = set_expire_offer_task.apply_async(
-            countdown=instance.lifetime_seconds,
-            kwargs={"offer_id": instance.id}
-        )
-        logger.debug(f"run_delete_offer_task {task}")
+        add_offer_event(instance, OutboxEventType.OFFER_EXPIRATION)
 
 
 @receiver(signal=post_save, sender=Offer)
@@ -67,24 +49,19 @@ def offer_ws_actions(instance: Offer, created: bool, *args, **kwargs):
         case OfferStatus.CREATED:
             if instance.tack.auto_accept:
                 return
-            ws_offer_created(instance)
-            notification_on_offer_created(instance)
+            add_offer_event(instance, OutboxEventType.OFFER_CREATED)
         case OfferStatus.ACCEPTED:
-            ws_offer_accepted(instance)
-            notification_on_offer_accepted(instance)
+            add_offer_event(instance, OutboxEventType.OFFER_ACCEPTED)
         case OfferStatus.IN_PROGRESS:
-            ws_offer_in_progress(instance)
-            deferred_notification_tack_will_expire_soon(instance)
+            add_offer_event(instance, OutboxEventType.OFFER_IN_PROGRESS)
         case OfferStatus.FINISHED:
-            ws_offer_finished(instance)
-            notification_on_offer_finished(instance)
+            add_offer_event(instance, OutboxEventType.OFFER_FINISHED)
         case OfferStatus.EXPIRED:
-            ws_offer_expired(instance)
-            notification_on_offer_expired(instance)
+            add_offer_event(instance, OutboxEventType.OFFER_EXPIRED)
         case OfferStatus.DELETED:
-            ws_offer_deleted(instance)
+            add_offer_event(instance, OutboxEventType.OFFER_DELETED)
         case OfferStatus.CANCELLED:
-            ws_offer_cancelled(instance)
+            add_offer_event(instance, OutboxEventType.OFFER_CANCELLED)
 
 
 @receiver(signal=post_save, sender=Tack)
@@ -94,45 +71,36 @@ def tack_ws_actions(instance: Tack, created: bool, *args, **kwargs):
     logger.debug(f"### TACK {instance.status = }")
     # initial creation from tacker
     if created:
-        ws_tack_created(instance)
-        notification_on_tack_created(instance)
-        deferred_notification_tack_inactive(instance)  # celery task on sending a notification after some amount of time
+        add_tack_event(instance, OutboxEventType.TACK_CREATED)
         return
     # tack deletion process
     if not instance.is_active:
         # deletion from tacker (tack should be in status CREATED or ACTIVE)
         if instance.status in (TackStatus.CREATED, TackStatus.ACTIVE):
-            ws_tack_deleted(instance)
+            add_tack_event(instance, OutboxEventType.TACK_DELETED)
             return
         # deletion(cancellation) from runner (tack might be in status ACCEPTED, IN_PROGRESS)
         if instance.is_canceled:
-            ws_tack_cancelled(instance)
-            notification_on_tack_cancelled(instance)
+            add_tack_event(instance, OutboxEventType.TACK_CANCELLED)
             return
     match instance.status:
         # status changed from active to created (all offers have been deleted)
         case TackStatus.CREATED:
-            ws_tack_created_from_active(instance)
+            add_tack_event(instance, OutboxEventType.TACK_CREATED_FROM_ACTIVE)
         # status changed from created to active (first offer was sent to this tack)
         case TackStatus.ACTIVE:
             if instance.auto_accept:
                 return
-            ws_tack_active(instance)
+            add_tack_event(instance, OutboxEventType.TACK_ACTIVE)
         # status changed to accepted (tacker accepted offer)
         case TackStatus.ACCEPTED:
-            ws_tack_accepted(instance)
-            notification_on_tack_accepted(instance)
+            add_tack_event(instance, OutboxEventType.TACK_ACCEPTED)
         # status changed to in_progress (runner began tack completion)
         case TackStatus.IN_PROGRESS:
-            ws_tack_in_progress(instance)
-            notification_on_tack_in_progress(instance)
+            add_tack_event(instance, OutboxEventType.TACK_IN_PROGRESS)
         # status changed to waiting_review (runner completed the tack)
         case TackStatus.WAITING_REVIEW:
-            ws_tack_waiting_review(instance)
-            notification_on_tack_waiting_review(instance)
-            change_tack_status_finished.apply_async(countdown=43200, kwargs={"tack_id": instance.id})
+            add_tack_event(instance, OutboxEventType.TACK_WAITING_REVIEW)
         # status changed to finished (tacker confirmed tack completion)
         case TackStatus.FINISHED:
-            ws_tack_finished(instance)
-            notification_on_tack_finished(instance)
-
+            add_tack_event(instance, OutboxEventType.TACK_FINISHED)
@@ -111,3 +111,17 @@ def delete_inactive_tacks():
     ).update(
         is_active=False
     )
+
+
+@shared_task
+def dispatch_outbox_events_task() -> None:
+    """
+    Drain outbox of Tack/Offer side effects. Routed to dedicated 'outbox' queue,
+    also scheduled periodically to retry failed events and pick up ones not dispatched on commit
+    """
+
+    # local import: tack.outbox depends on tack.services which imports this module
+    from tack.outbox import dispatch_outbox_events, OUTBOX_BATCH_SIZE
+
+    while dispatch_outbox_events(OUTBOX_BATCH_SIZE) == OUTBOX_BATCH_SIZE:
+        pass
@@ -7,10 +7,50 @@ import djstripe.models
 from payment.models import Transaction
 from djstripe.models import PaymentIntent as dsPaymentIntent
 from payment.services import add_money_to_bank_account, add_money_to_bank_account_custom
-from tack.models import Tack
+from stats.rollup_service import record_transaction_paid_tack
+from tack.models import Tack, Offer
 
 logger = logging.getLogger('debug')
 
+TACK_RELATIONS = ("tacker", "runner", "group")
+
+
+def _not_cached_relations(instance: Tack | Offer, fields: tuple) -> list[str]:
+    return [
+        field for field in fields
+        if getattr(instance, f"{field}_id") is not None
+        and not instance._meta.get_field(field).is_cached(instance)
+    ]
+
+
+def select_tack_relations(tack: Tack) -> Tack:
+    """Load not cached Tack relations used by TackDetailSerializer with one query"""
+
+    fields = _not_cached_relations(tack, TACK_RELATIONS)
+    if fields:
+        related_tack = Tack.objects.select_related(*fields).get(pk=tack.pk)
+        for field in fields:
+            setattr(tack, field, getattr(related_tack, field))
+    return tack
+
+
+def select_offer_relations(offer: Offer) -> Offer:
+    """Load not cached Offer runner, Offer tack and its relations with one query"""
+
+    fields = _not_cached_relations(offer, ("runner", "tack"))
+    if "tack" in fields:
+        tack_fields = list(TACK_RELATIONS)
+    else:
+        tack_fields = _not_cached_relations(offer.tack, TACK_RELATIONS)
+    lookups = fields + [f"tack__{field}" for field in tack_fields]
+    if lookups:
+        related_offer = Offer.objects.select_related(*lookups).get(pk=offer.pk)
+        for field in fields:
+            setattr(offer, field, getattr(related_offer, field))
+        for field in tack_fields:
+            setattr(offer.tack, field, getattr(related_offer.tack, field))
+    return offer
+
 
 def stripe_desync_check(request, transaction_id):
     """
@@ -67,5 +107,8 @@ def set_pay_for_tack_id(transaction_id, tack: Tack):
         except Transaction.DoesNotExist:
             pass
         else:
+            is_new_paid_tack = tr.paid_tack_id is None
             tr.paid_tack = tack
             tr.save()
+            if is_new_paid_tack:
+                record_transaction_paid_tack(tr)
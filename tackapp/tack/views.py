@@ -8,7 +8,9 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from core.exceptions import InsufficientFundsError
 from core.permissions import *
+from payment.balance_service import hold_tack_price, release_tack_hold
 from tack.utils import set_pay_for_tack_id, stripe_desync_check
 from .serializers import *
 from .services import accept_offer, complete_tack, confirm_complete_tack, delete_tack_offers
@@ -88,19 +90,22 @@ class TackViewset(
                     case _:
                         pass
 
-                ba = BankAccount.objects.get(user=request.user)
-                if ba.usd_balance < price:
+            tack = self.perform_create(serializer)
+            if tack_info.get("auto_accept"):
+                try:
+                    hold_tack_price(tack, price)
+                except InsufficientFundsError:
+                    # no queries are allowed in the atomic block after set_rollback
+                    balance = BankAccount.objects.get(user=request.user).usd_balance
+                    transaction.set_rollback(True)
                     return Response(
                         {
                             "error": "Px2",
                             "message": "Not enough money",
-                            "balance": ba.usd_balance,
+                            "balance": balance,
                             "tack_price": price
                         },
                         status=400)
-                ba.usd_balance -= price
-                ba.save()
-            tack = self.perform_create(serializer)
         if transaction_id:
             set_pay_for_tack_id(transaction_id, tack)
         output_serializer = TackDetailSerializer(tack, context={"request": request})
@@ -151,9 +156,7 @@ class TackViewset(
                 status=400)
         with transaction.atomic():
             delete_tack_offers(tack)
-            if tack.auto_accept:
-                request.user.bankaccount.usd_balance += tack.price
-                request.user.bankaccount.save()
+            release_tack_hold(tack)
             self.perform_destroy(tack)
         return Response(status=204)
 
@@ -449,9 +452,20 @@ class OfferViewset(
                     "message": "You can create Offers only on Active Tacks"
                 },
                 status=400)
-        created_offer = self.perform_create(serializer)
-        if tack.auto_accept:
-            accept_offer(created_offer)
+        with transaction.atomic():
+            created_offer = self.perform_create(serializer)
+            if tack.auto_accept:
+                try:
+                    accept_offer(created_offer)
+                except InsufficientFundsError as e:
+                    # Offer is not created when Tacker can't pay for the auto accept
+                    transaction.set_rollback(True)
+                    return Response(
+                        {
+                            "error": e.error,
+                            "message": e.message
+                        },
+                        status=e.status)
         headers = self.get_success_headers(serializer.data)
 
         return Response(serializer.data, status=201, headers=headers)
@@ -509,7 +523,17 @@ class OfferViewset(
                 },
                 status=400)
 
-        accept_offer(offer)
+        try:
+            accept_offer(offer)
+        except InsufficientFundsError as e:
+            return Response(
+                {
+                    "error": e.error,
+                    "message": e.message,
+                    "balance": BankAccount.objects.get(user=request.user).usd_balance,
+                    "tack_price": price
+                },
+                status=e.status)
         serializer = OfferSerializer(offer)
         return Response(serializer.data)
 
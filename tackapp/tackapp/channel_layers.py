@@ -0,0 +1,67 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Iterable
+
+from channels_redis.core import RedisChannelLayer
+
+
+class PipelinedRedisChannelLayer(RedisChannelLayer):
+    """
+    RedisChannelLayer that adds/discards channel to many groups with one pipelined request per shard.
+    Uses aioredis 1.x connection API of channels_redis 3.x pinned in Pipfile.lock
+    """
+
+    def _groups_by_shard(self, groups: Iterable[str]) -> dict[int, list[str]]:
+        groups_by_shard = defaultdict(list)
+        for group in groups:
+            assert self.valid_group_name(group), "Group name not valid"
+            groups_by_shard[self.consistent_hash(group)].append(group)
+        return groups_by_shard
+
+    async def group_add_many(self, groups: Iterable[str], channel: str):
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        timestamp = time.time()
+
+        async def add_to_shard(index: int, shard_groups: list[str]):
+            async with self.connection(index) as connection:
+                pipeline = connection.pipeline()
+                for group in shard_groups:
+                    group_key = self._group_key(group)
+                    pipeline.zadd(group_key, timestamp, channel)
+                    pipeline.expire(group_key, self.group_expiry)
+                await pipeline.execute()
+
+        await asyncio.gather(*(
+            add_to_shard(index, shard_groups)
+            for index, shard_groups in self._groups_by_shard(groups).items()
+        ))
+
+    async def group_discard_many(self, groups: Iterable[str], channel: str):
+        assert self.valid_channel_name(channel), "Channel name not valid"
+
+        async def discard_from_shard(index: int, shard_groups: list[str]):
+            async with self.connection(index) as connection:
+                pipeline = connection.pipeline()
+                for group in shard_groups:
+                    pipeline.zrem(self._group_key(group), channel)
+                await pipeline.execute()
+
+        await asyncio.gather(*(
+            discard_from_shard(index, shard_groups)
+            for index, shard_groups in self._groups_by_shard(groups).items()
+        ))
+
+
+async def group_add_many(channel_layer, groups: Iterable[str], channel: str):
+    if hasattr(channel_layer, "group_add_many"):
+        await channel_layer.group_add_many(groups, channel)
+    else:
+        await asyncio.gather(*(channel_layer.group_add(group, channel) for group in groups))
+
+
+async def group_discard_many(channel_layer, groups: Iterable[str], channel: str):
+    if hasattr(channel_layer, "group_discard_many"):
+        await channel_layer.group_discard_many(groups, channel)
+    else:
+        await asyncio.gather(*(channel_layer.group_discard(group, channel) for group in groups))
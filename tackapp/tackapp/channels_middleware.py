@@ -2,24 +2,47 @@ import logging
 
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from django.db import close_old_connections
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from jwt import decode as jwt_decode
-from django.conf import settings
 
 from user.models import User
 
 
 logger = logging.getLogger("tackapp.channels_middleware")
 
+USER_SNAPSHOT_FIELDS = ("id", "phone_number", "first_name", "last_name", "is_active")
+USER_SNAPSHOT_CACHE_TIMEOUT = 300
+
+
+def user_snapshot_cache_key(user_id: int) -> str:
+    return f"ws_user_snapshot_{user_id}"
+
+
+def invalidate_user_snapshot(user_id: int):
+    cache.delete(user_snapshot_cache_key(user_id))
+
 
 @database_sync_to_async
-def get_user(user_id):
-    try:
-        return User.objects.get(id=user_id)
-    except User.DoesNotExist:
-        return AnonymousUser()
+def get_user_snapshot_from_db(user_id: int) -> dict | None:
+    return User.objects.filter(id=user_id).values(*USER_SNAPSHOT_FIELDS).first()
+
+
+async def get_user(user_id: int) -> User | AnonymousUser:
+    """
+    Lightweight unsaved User built from cached snapshot (enough for consumers: id, str).
+    DB is queried only on cache miss
+    """
+
+    key = user_snapshot_cache_key(user_id)
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        snapshot = await get_user_snapshot_from_db(user_id)
+        if snapshot is None:
+            return AnonymousUser()
+        await cache.aset(key, snapshot, USER_SNAPSHOT_CACHE_TIMEOUT)
+    return User(**snapshot)
 
 
 def extract_token(headers: tuple) -> bytes:
@@ -52,9 +75,6 @@ class TokenAuthMiddleware:
         self.inner = inner
 
     async def __call__(self, scope, receive, send):
-        # Close old database connections to prevent usage of timed out connections
-        close_old_connections()
-
         # Get the token
         token = extract_token(scope['headers'])
         device_info = extract_device_info(scope['headers'])
@@ -63,27 +83,18 @@ class TokenAuthMiddleware:
 
         # Try to authenticate the user
         try:
-            # This will automatically validate the token and raise an error if token is invalid
-            UntypedToken(token)
+            # Token is validated and decoded once, payload is like
+            # {"token_type": "access", "exp": 1568770772, "jti": "5c15e80d65b04c20ad34d77b6703251b", "user_id": 6}
+            validated_token = UntypedToken(token)
             # TODO: if token is not Blacklisted
         except (InvalidToken, TokenError) as e:
             # Token is invalid
             logger.info(f"{e = }")
             return None
         else:
-            #  Then token is valid, decode it
-            decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            logger.debug(f"{decoded_data = }")
-            # Will return a dictionary like -
-            # {
-            #     "token_type": "access",
-            #     "exp": 1568770772,
-            #     "jti": "5c15e80d65b04c20ad34d77b6703251b",
-            #     "user_id": 6
-            # }
-
+            logger.debug(f"{validated_token.payload = }")
             # Get the user using ID
-            user = await get_user(int(decoded_data["user_id"]))
+            user = await get_user(int(validated_token[api_settings.USER_ID_CLAIM]))
             logger.debug(f"{user = }")
         # Return the inner application directly and let it run everything else
         return await self.inner(dict(scope, user=user, device_info=device_info), receive, send)
@@ -2,12 +2,10 @@ import json
 import logging
 
 from channels.generic.websocket import AsyncWebsocketConsumer
+from tackapp.channel_layers import group_add_many, group_discard_many
 from tackapp.services import (
     form_websocket_message,
-    get_tacks_runner,
-    get_user_groups,
-    get_tacks_tacker,
-    get_user_offers,
+    get_user_subscriptions,
 )
 
 
@@ -19,64 +17,37 @@ class MainConsumer(AsyncWebsocketConsumer):
         self.user = self.scope['user']
         self.device_info = self.scope['device_info']
         logger.info(f"WS connected for [{self.user} :: {self.device_info}]")
+        self.ws_groups = set()
         if self.user.is_anonymous:
             await self.close()
+            return
 
+        await self.accept()
         self.room_group_name = f'user_{self.user.id}'
-
         logger.info(f"{self.room_group_name = }")
-        # Join user_id room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        logger.debug(f"[{self.user} :: {self.device_info}] Added to {self.room_group_name}")
-
-        group_members = await get_user_groups(self.user)
-        for gm in group_members:
-            await self.channel_layer.group_add(
-                f"group_{gm.group_id}",
-                self.channel_name
-            )
-            logger.debug(f"[{self.user} :: {self.device_info}] Added to group_{gm.group_id}")
-
-        tacks_tacker = await get_tacks_tacker(self.user)
-        for tack in tacks_tacker:
-            await self.channel_layer.group_add(
-                f"tack_{tack.id}_tacker",
-                self.channel_name
-            )
-            logger.debug(f"[{self.user} :: {self.device_info}] Added to tack_{tack.id}_tacker")
+        # user_id room group and group_{id} groups are joined with one pipelined channel layer request
+        self.ws_groups = {self.room_group_name, *await get_user_subscriptions(self.user)}
+        await group_add_many(self.channel_layer, self.ws_groups, self.channel_name)
+        logger.debug(f"[{self.user} :: {self.device_info}] Added to {self.ws_groups}")
 
-        tacks_runner = await get_tacks_runner(self.user)
-        for tack in tacks_runner:
-            await self.channel_layer.group_add(
-                f"tack_{tack.id}_runner",
-                self.channel_name
-            )
-            logger.debug(f"[{self.user} :: {self.device_info}] Added to tack_{tack.id}_runner")
+    async def ws_group_add(self, ws_group: str):
+        self.ws_groups.add(ws_group)
+        await self.channel_layer.group_add(ws_group, self.channel_name)
+        logger.debug(f"{self.user} Added to {ws_group}")
 
-        offers = await get_user_offers(self.user)
-        for offer in offers:
-            await self.channel_layer.group_add(
-                f"tack_{offer.tack_id}_offer",
-                self.channel_name
-            )
-            logger.debug(f"[{self.user} :: {self.device_info}] Added to tack_{offer.tack_id}_offer")
-        await self.accept()
+    async def ws_group_discard(self, ws_group: str):
+        self.ws_groups.discard(ws_group)
+        await self.channel_layer.group_discard(ws_group, self.channel_name)
+        logger.debug(f"{self.user} Discarded to {ws_group}")
 
     async def websocket_receive(self, message):
         logger.debug(f"Received from [{self.user} :: {self.device_info}] :: [{message['text']}]")
 
     async def disconnect(self, close_code):
-        # Leave room group
-        # TODO: leave all groups
         logger.info(f"Disconnected {self.user} with {close_code = }")
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-        logger.debug(f"[{self.user} :: {self.device_info}] Discarded [{self.room_group_name}]")
+        if self.ws_groups:
+            await group_discard_many(self.channel_layer, self.ws_groups, self.channel_name)
+        logger.debug(f"[{self.user} :: {self.device_info}] Discarded {self.ws_groups}")
 
     async def receive(self, text_data=None, bytes_data=None):
         text_data_json = json.loads(text_data)
@@ -90,11 +61,6 @@ class MainConsumer(AsyncWebsocketConsumer):
             text_data=form_websocket_message(
                 model='Tack', action='create', obj=message
             ))
-        await self.channel_layer.group_add(
-            f"tack_{message['id']}_tacker",
-            self.channel_name
-        )
-        logger.debug(f"{self.user} Added to tack_{message['id']}_tacker")
 
     async def tack_update(self, event):
         logger.debug(f"Sent to {self.user}({self.device_info}) - {event = }")
@@ -112,14 +78,6 @@ class MainConsumer(AsyncWebsocketConsumer):
                 model='Tack', action='delete', obj=message
             )
         )
-        await self.channel_layer.group_discard(
-            f"tack_{message}_tacker",
-            self.channel_name)
-        logger.debug(f"{self.user} Discarded to tack_{message}_tacker")
-        await self.channel_layer.group_discard(
-            f"tack_{message}_offer",
-            self.channel_name)
-        logger.debug(f"{self.user} Discarded to tack_{message}_offer")
 
     async def grouptack_create(self, event):
         logger.debug(f"Sent to {self.user}({self.device_info}) - {event = }")
@@ -185,10 +143,7 @@ class MainConsumer(AsyncWebsocketConsumer):
                 model='GroupDetails', action='create', obj=message
             )
         )
-        await self.channel_layer.group_add(
-            f"group_{message['id']}",
-            self.channel_name)
-        logger.debug(f"{self.user} Added to group_{message['id']}")
+        await self.ws_group_add(f"group_{message['id']}")
 
     async def groupdetails_update(self, event):
         logger.debug(f"Sent to {self.user}({self.device_info}) - {event = }")
@@ -207,10 +162,7 @@ class MainConsumer(AsyncWebsocketConsumer):
                 model='GroupDetails', action='delete', obj=message
             )
         )
-        await self.channel_layer.group_discard(
-            f"group_{message}",
-            self.channel_name)
-        logger.debug(f"{self.user} Discarded to group_{message}")
+        await self.ws_group_discard(f"group_{message}")
 
     async def offer_create(self, event):
         logger.debug(f"Sent to {self.user}({self.device_info}) - {event = }")
@@ -238,10 +190,6 @@ class MainConsumer(AsyncWebsocketConsumer):
                 model='RunnerTack', action='create', obj=message
             )
         )
-        await self.channel_layer.group_add(
-            f"tack_{message['id']}_offer",
-            self.channel_name)
-        logger.debug(f"{self.user} Added to tack_{message['id']}_offer")
 
     async def runnertack_update(self, event):
         logger.debug(f"Sent to {self.user}({self.device_info}) - {event = }")
@@ -261,10 +209,6 @@ class MainConsumer(AsyncWebsocketConsumer):
                 model='RunnerTack', action='delete', obj=message
             )
         )
-        await self.channel_layer.group_discard(
-            f"tack_{message}_offer",
-            self.channel_name)
-        logger.debug(f"{self.user} Discarded to tack_{message}_offer")
 
     async def completedtackrunner_create(self, event):
         logger.debug(f"Sent to {self.user}({self.device_info}) - {event = }")
@@ -0,0 +1,125 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from fcm_django.models import FCMDevice
+from firebase_admin import messaging
+from firebase_admin.exceptions import InvalidArgumentError
+
+from group.models import GroupMembers
+
+
+logger = logging.getLogger("django")
+
+# FCM limit of tokens in one multicast request
+FCM_MULTICAST_BATCH_SIZE = 500
+FCM_MAX_WORKERS = 4
+GROUP_TOKENS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# firebase-admin 6.6+ replaced send_multicast (FCM batch API) with send_each_for_multicast
+_send_multicast = getattr(messaging, "send_each_for_multicast", None) or messaging.send_multicast
+
+
+class FCMSender:
+    _executor = ThreadPoolExecutor(max_workers=FCM_MAX_WORKERS, thread_name_prefix="fcm")
+
+    @staticmethod
+    def group_tokens_cache_key(group_id: int) -> str:
+        return f"fcm_group_tokens_{group_id}"
+
+    @classmethod
+    def invalidate_group_tokens(cls, *group_ids: int):
+        cache.delete_many([cls.group_tokens_cache_key(group_id) for group_id in group_ids])
+
+    @classmethod
+    def invalidate_user_groups_tokens(cls, user_id: int):
+        cls.invalidate_group_tokens(
+            *GroupMembers.objects.filter(member=user_id).values_list("group_id", flat=True)
+        )
+
+    @classmethod
+    def get_group_tokens(cls, group_id: int) -> list[tuple[int, str]]:
+        """(user_id, registration_id) of active devices of not muted Group members"""
+
+        key = cls.group_tokens_cache_key(group_id)
+        tokens = cache.get(key)
+        if tokens is None:
+            tokens = list(
+                FCMDevice.objects.filter(
+                    active=True,
+                    user__groupmembers__group=group_id,
+                    user__groupmembers__is_muted=False
+                ).values_list(
+                    "user_id",
+                    "registration_id"
+                )
+            )
+            cache.set(key, tokens, GROUP_TOKENS_CACHE_TIMEOUT)
+        return tokens
+
+    @classmethod
+    def send_to_group(cls, group_id: int, message: messaging.Message, exclude_user_id: int = None):
+        cls.send_multicast(
+            [token for user_id, token in cls.get_group_tokens(group_id) if user_id != exclude_user_id],
+            message
+        )
+
+    @classmethod
+    def send_multicast(cls, registration_ids: list[str], message: messaging.Message):
+        """Send message in batches of 500 tokens concurrently and deactivate devices with dead tokens"""
+
+        batches = [
+            registration_ids[i:i + FCM_MULTICAST_BATCH_SIZE]
+            for i in range(0, len(registration_ids), FCM_MULTICAST_BATCH_SIZE)
+        ]
+        dead_tokens = []
+        for batch_dead_tokens in cls._executor.map(lambda batch: cls._send_batch(batch, message), batches):
+            dead_tokens.extend(batch_dead_tokens)
+        if dead_tokens:
+            cls.deactivate_devices(dead_tokens)
+
+    @classmethod
+    def _send_batch(cls, registration_ids: list[str], message: messaging.Message) -> list[str]:
+        multicast_message = messaging.MulticastMessage(
+            tokens=registration_ids,
+            data=message.data,
+            notification=message.notification,
+            android=message.android,
+            webpush=message.webpush,
+            apns=message.apns,
+            fcm_options=message.fcm_options
+        )
+        try:
+            response = _send_multicast(multicast_message)
+        except Exception as e:
+            logger.exception(f"FCM multicast of {len(registration_ids)} tokens failed: {e}")
+            return []
+        return [
+            token
+            for token, send_response in zip(registration_ids, response.responses)
+            if not send_response.success and cls._is_dead_token_error(send_response.exception)
+        ]
+
+    @staticmethod
+    def _is_dead_token_error(exception) -> bool:
+        return isinstance(
+            exception,
+            (messaging.UnregisteredError, messaging.SenderIdMismatchError, InvalidArgumentError)
+        )
+
+    @classmethod
+    def deactivate_devices(cls, registration_ids: list[str]):
+        logger.info(f"Deactivating {len(registration_ids)} FCM devices with dead tokens")
+        user_ids = set(
+            FCMDevice.objects.filter(
+                registration_id__in=registration_ids
+            ).values_list(
+                "user_id",
+                flat=True
+            )
+        )
+        FCMDevice.objects.filter(registration_id__in=registration_ids).update(active=False)
+        # queryset update does not send signals
+        cls.invalidate_group_tokens(
+            *GroupMembers.objects.filter(member__in=user_ids).values_list("group_id", flat=True).distinct()
+        )
@@ -2,6 +2,8 @@ import logging
 import time
 from threading import local
 
+from tackapp.websocket_messages import WSSender
+
 thread_locals = local()
 time_measurement_logger = logging.getLogger("sql_time_measurement")
 
@@ -23,3 +25,14 @@ class RequestTimeMiddleware:
         thread_locals.path = ''
 
         return response
+
+
+class WSBatchMiddleware:
+    """Middleware for sending all WebSocket messages of the request in one batch"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with WSSender.batch():
+            return self.get_response(request)
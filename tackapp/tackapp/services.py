@@ -1,11 +1,11 @@
 import json
 
 from channels.db import database_sync_to_async
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, Concat
 
-from core.choices import TackStatus
 from group.models import GroupMembers
 from stats.models import UserVisits
-from tack.models import Tack, Offer
 from user.models import User
 
 
@@ -29,36 +29,24 @@ def form_websocket_message(*, model: str, action: str, obj: dict) -> str:
     return response
 
 
-@database_sync_to_async
-def get_user_groups(user: User):
-    return list(GroupMembers.objects.filter(member=user).select_related("group"))
-
-
-@database_sync_to_async
-def get_tacks_tacker(user: User):
-    tacks_tacker = Tack.active.filter(
-            tacker=user
-        ).exclude(
-            status=TackStatus.FINISHED
-        )
-    return list(tacks_tacker)
-
-
-@database_sync_to_async
-def get_tacks_runner(user: User):
-    tacks_runner = Tack.active.filter(
-            runner=user
-        ).exclude(
-            status=TackStatus.FINISHED
-        )
-    return list(tacks_runner)
+def _ws_group_name(*parts) -> Concat:
+    return Concat(
+        *(Cast(part, CharField()) if isinstance(part, F) else Value(part) for part in parts),
+        output_field=CharField()
+    )
 
 
 @database_sync_to_async
-def get_user_offers(user: User):
-    offers = Offer.active.filter(
-            runner=user
-        ).select_related(
-            "tack"
-        )
-    return list(offers)
+def get_user_subscriptions(user: User) -> set[str]:
+    """
+    Names of Group WebSocket groups of User. Tack and Offer events are routed
+    to user_{id} channels of tacker and runners when they are sent
+    """
+
+    return set(
+        GroupMembers.objects.filter(
+            member=user
+        ).annotate(
+            ws_group=_ws_group_name("group_", F("group_id"))
+        ).values_list("ws_group", flat=True)
+    )
@@ -203,6 +203,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "tackapp.middleware.WSBatchMiddleware",
 ]
 
 ROOT_URLCONF = "tackapp.urls"
@@ -236,13 +237,20 @@ CHANNEL_LAYERS_HOSTS = read_secrets(app, env, "CHANNEL_LAYERS_HOSTS").split(",")
 logger.info(f"{CHANNEL_LAYERS_HOSTS = }")
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'BACKEND': 'tackapp.channel_layers.PipelinedRedisChannelLayer',
         'CONFIG': {
             "hosts": [CHANNEL_LAYERS_HOSTS],
         },
     },
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{CHANNEL_LAYERS_HOSTS[0]}:{CHANNEL_LAYERS_HOSTS[1]}/1",
+    }
+}
+
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
@@ -350,6 +358,9 @@ MESSAGING_SERVICE_SID = read_secrets(app, env, "MESSAGING_SERVICE_SID")
 
 
 CELERY_BROKER_URL = read_secrets(app, env, "CELERY_BROKER")
+CELERY_TASK_ROUTES = {
+    "tack.tasks.dispatch_outbox_events_task": {"queue": "outbox"},
+}
 
 
 SIMPLE_JWT = {
@@ -393,6 +404,8 @@ DJSTRIPE_USE_NATIVE_JSONFIELD = True  # We recommend setting to True for new ins
 DJSTRIPE_FOREIGN_KEY_TO_FIELD = "id"
 # DJSTRIPE_WEBHOOK_VALIDATION = 'retrieve_event'
 DJSTRIPE_WEBHOOK_SECRET = read_secrets(app, env, "STRIPE_WEBHOOK_SECRET")
+# valid webhooks are acknowledged right away and processed by payment.tasks.process_stripe_webhooks_task
+DJSTRIPE_WEBHOOK_EVENT_CALLBACK = "payment.stripe_webhook_service.enqueue_stripe_webhook"
 
 
 DWOLLA_APP_KEY = read_secrets(app, env, 'DWOLLA_APP_KEY')
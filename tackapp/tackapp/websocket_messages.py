@@ -1,9 +1,16 @@
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import local
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.db import transaction
 
 
 class WSSender:
     channel_layer = get_channel_layer()
+    _buffer = local()
 
     def __new__(cls):
         if not hasattr(cls, 'instance'):
@@ -17,9 +24,60 @@ class WSSender:
 
     @classmethod
     def send_message(cls, ws_group: str, ws_type: str, ws_message: dict | int):
-        async_to_sync(cls.channel_layer.group_send)(
-            ws_group,
-            {
-                'type': ws_type,
-                'message': ws_message
-            })
+        """
+        Message is sent only after current DB transaction is committed
+        (immediately if there is no transaction) so clients never receive events of rolled back writes.
+        Inside of WSSender.batch() messages are buffered and sent together on exit
+        """
+
+        message = {
+            'type': ws_type,
+            'message': ws_message
+        }
+        transaction.on_commit(lambda: cls._enqueue(ws_group, message))
+
+    @classmethod
+    @contextmanager
+    def batch(cls):
+        """Collect all messages sent inside this block and flush them with one channel layer call"""
+
+        if getattr(cls._buffer, 'messages', None) is not None:
+            # nested batch - outer block will flush
+            yield
+            return
+        cls._buffer.messages = []
+        try:
+            yield
+        finally:
+            messages = cls._buffer.messages
+            cls._buffer.messages = None
+            if messages:
+                cls._flush(messages)
+
+    @classmethod
+    def _enqueue(cls, ws_group: str, message: dict):
+        messages = getattr(cls._buffer, 'messages', None)
+        if messages is None:
+            cls._flush([(ws_group, message)])
+        else:
+            messages.append((ws_group, message))
+
+    @classmethod
+    def _flush(cls, messages: list[tuple[str, dict]]):
+        async_to_sync(cls._group_send_many)(messages)
+
+    @classmethod
+    async def _group_send_many(cls, messages: list[tuple[str, dict]]):
+        # Keep order of messages inside every ws_group, different ws_groups are sent concurrently
+        messages_by_group = defaultdict(list)
+        for ws_group, message in messages:
+            messages_by_group[ws_group].append(message)
+
+        async def send_to_group(ws_group: str, group_messages: list[dict]):
+            for message in group_messages:
+                await cls.channel_layer.group_send(ws_group, message)
+
+        await asyncio.gather(*(
+            send_to_group(ws_group, group_messages)
+            for ws_group, group_messages in messages_by_group.items()
+        ))
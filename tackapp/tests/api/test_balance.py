@@ -0,0 +1,306 @@
+from datetime import timedelta
+from importlib import import_module
+
+import dwollav2
+import pytest
+import requests
+from django.apps import apps
+from django.urls import reverse
+from django.utils import timezone
+
+from core.choices import BalanceEntryReason, BalanceHoldStatus, MethodType, PaymentAction, TackStatus
+from core.exceptions import InsufficientFundsError
+from payment.balance_service import change_balance, hold_balance, release_expired_holds
+from payment.services import dwolla_transaction, reconcile_withdraw_holds
+from payment.models import BalanceEntry, BalanceHold, BankAccount
+from tack.models import Tack, Offer
+
+
+def set_balance(user, usd_balance: int) -> BankAccount:
+    bank_account, _ = BankAccount.objects.update_or_create(user=user, defaults={"usd_balance": usd_balance})
+    return bank_account
+
+
+def get_balance(user) -> int:
+    return BankAccount.objects.get(user=user).usd_balance
+
+
+def create_tack(client, group, price: int, auto_accept: bool = False):
+    return client.post(
+        reverse("tack-list"),
+        {
+            "tack": {
+                "title": "Test Title",
+                "price": price,
+                "description": "Test Description",
+                "group": group.id,
+                "allow_counter_offer": False,
+                "auto_accept": auto_accept,
+            },
+            "payment_info": {"method_type": MethodType.TACK_BALANCE},
+        },
+        format="json"
+    )
+
+
+def accept_tack(user_client_tacker, user_client_runner, group, price: int) -> Tack:
+    response = create_tack(user_client_tacker, group, price)
+    assert response.status_code == 201
+    tack_id = response.data["id"]
+    response = user_client_runner.post(reverse("offer-list"), {"tack": tack_id})
+    assert response.status_code == 201
+    response = user_client_tacker.post(reverse("offer-accept", args=[response.data["id"]]))
+    assert response.status_code == 200
+    return Tack.objects.get(pk=tack_id)
+
+
+def test_auto_accept_tack_insufficient_balance(user_client_tacker, user_tacker, tack_group):
+    set_balance(user_tacker, 100)
+
+    response = create_tack(user_client_tacker, tack_group, 500, auto_accept=True)
+
+    assert response.status_code == 400
+    assert response.data["error"] == "Px2"
+    assert response.data["balance"] == 100
+    assert response.data["tack_price"] == 500
+    assert not Tack.objects.exists()
+    assert not BalanceHold.objects.exists()
+    assert get_balance(user_tacker) == 100
+
+
+def test_auto_accept_tack_holds_price(user_client_tacker, user_tacker, tack_group):
+    set_balance(user_tacker, 1000)
+
+    response = create_tack(user_client_tacker, tack_group, 400, auto_accept=True)
+
+    assert response.status_code == 201
+    hold = BalanceHold.objects.get(tack_id=response.data["id"])
+    assert hold.status == BalanceHoldStatus.HELD
+    assert hold.amount == 400
+    assert get_balance(user_tacker) == 600
+
+
+def test_auto_accept_offer_insufficient_balance(
+        user_client_tacker, user_client_runner, user_tacker, tack_group
+):
+    set_balance(user_tacker, 1000)
+    tack_id = create_tack(user_client_tacker, tack_group, 500, auto_accept=True).data["id"]
+    # Tack price is changed after the hold so the auto accept needs more money
+    Tack.objects.filter(pk=tack_id).update(price=2000, allow_counter_offer=True)
+
+    response = user_client_runner.post(reverse("offer-list"), {"tack": tack_id, "price": 2000})
+
+    assert response.status_code == 400
+    assert response.data["error"] == "Px2"
+    assert not Offer.objects.filter(tack_id=tack_id).exists()
+    assert Tack.objects.get(pk=tack_id).status == TackStatus.CREATED
+    assert BalanceHold.objects.get(tack_id=tack_id, status=BalanceHoldStatus.HELD).amount == 500
+    assert get_balance(user_tacker) == 500
+
+
+def test_tack_hold_captured_on_completion(
+        user_client_tacker, user_client_runner, user_tacker, user_runner, tack_group
+):
+    set_balance(user_tacker, 1000)
+    set_balance(user_runner, 0)
+    tack = accept_tack(user_client_tacker, user_client_runner, tack_group, 500)
+    hold = BalanceHold.objects.get(tack=tack)
+    assert hold.status == BalanceHoldStatus.HELD
+    assert get_balance(user_tacker) == 500
+
+    assert user_client_runner.post(reverse("tack-start-tack", args=[tack.id])).status_code == 200
+    assert user_client_runner.post(reverse("tack-complete", args=[tack.id])).status_code == 200
+    response = user_client_tacker.post(reverse("tack-confirm-complete", args=[tack.id]))
+
+    assert response.status_code == 200
+    hold.refresh_from_db()
+    assert hold.status == BalanceHoldStatus.CAPTURED
+    assert Tack.objects.get(pk=tack.id).status == TackStatus.FINISHED
+    assert get_balance(user_tacker) == 500
+    assert get_balance(user_runner) == 500
+    assert BalanceEntry.objects.filter(tack=tack, reason=BalanceEntryReason.RUNNER_PAYOUT).count() == 1
+
+
+def test_tack_hold_released_on_runner_cancel(
+        user_client_tacker, user_client_runner, user_tacker, user_runner, tack_group
+):
+    set_balance(user_tacker, 1000)
+    set_balance(user_runner, 0)
+    tack = accept_tack(user_client_tacker, user_client_runner, tack_group, 300)
+    assert get_balance(user_tacker) == 700
+
+    response = user_client_runner.post(reverse("tack-runner-cancel", args=[tack.id]))
+
+    assert response.status_code == 200
+    assert BalanceHold.objects.get(tack=tack).status == BalanceHoldStatus.RELEASED
+    assert get_balance(user_tacker) == 1000
+    assert get_balance(user_runner) == 0
+
+
+def test_tack_hold_released_on_delete(user_client_tacker, user_tacker, tack_group):
+    set_balance(user_tacker, 1000)
+    response = create_tack(user_client_tacker, tack_group, 250, auto_accept=True)
+    tack_id = response.data["id"]
+    assert get_balance(user_tacker) == 750
+
+    response = user_client_tacker.delete(reverse("tack-detail", args=[tack_id]))
+
+    assert response.status_code == 204
+    assert BalanceHold.objects.get(tack_id=tack_id).status == BalanceHoldStatus.RELEASED
+    assert get_balance(user_tacker) == 1000
+
+
+@pytest.mark.django_db
+def test_change_balance_refuses_negative(user_tacker):
+    set_balance(user_tacker, 100)
+
+    with pytest.raises(InsufficientFundsError):
+        change_balance(user_tacker.id, -101, BalanceEntryReason.WITHDRAW)
+
+    assert get_balance(user_tacker) == 100
+    assert not BalanceEntry.objects.filter(bank_account__user=user_tacker).exists()
+    assert change_balance(user_tacker.id, -100, BalanceEntryReason.WITHDRAW) == 0
+    assert BalanceEntry.objects.get(bank_account__user=user_tacker).balance_after == 0
+
+
+def expire_hold(tack_id: int):
+    BalanceHold.objects.filter(tack_id=tack_id).update(expiration_time=timezone.now() - timedelta(minutes=1))
+
+
+def test_release_expired_holds_keeps_live_tack_hold(user_client_tacker, user_tacker, tack_group):
+    set_balance(user_tacker, 1000)
+    tack_id = create_tack(user_client_tacker, tack_group, 400, auto_accept=True).data["id"]
+    expire_hold(tack_id)
+
+    assert release_expired_holds() == 0
+    assert BalanceHold.objects.get(tack_id=tack_id).status == BalanceHoldStatus.HELD
+    assert get_balance(user_tacker) == 600
+
+
+def test_release_expired_holds_releases_inactive_tack_hold(user_client_tacker, user_tacker, tack_group):
+    set_balance(user_tacker, 1000)
+    canceled_tack_id = create_tack(user_client_tacker, tack_group, 400, auto_accept=True).data["id"]
+    inactive_tack_id = create_tack(user_client_tacker, tack_group, 300, auto_accept=True).data["id"]
+    Tack.objects.filter(pk=canceled_tack_id).update(is_active=False, is_canceled=True)
+    Tack.objects.filter(pk=inactive_tack_id).update(is_active=False)
+    assert release_expired_holds() == 1
+    expire_hold(inactive_tack_id)
+
+    assert release_expired_holds() == 1
+    assert not BalanceHold.objects.filter(status=BalanceHoldStatus.HELD).exists()
+    assert get_balance(user_tacker) == 1000
+    assert BalanceEntry.objects.filter(reason=BalanceEntryReason.TACK_REFUND).count() == 2
+
+
+@pytest.mark.django_db
+def test_release_expired_holds_keeps_stale_withdraw_hold(user_tacker):
+    set_balance(user_tacker, 1000)
+    hold = create_stale_withdraw_hold(user_tacker, 300)
+
+    assert release_expired_holds() == 0
+    hold.refresh_from_db()
+    assert hold.status == BalanceHoldStatus.HELD
+    assert get_balance(user_tacker) == 700
+
+
+def create_stale_withdraw_hold(user, amount: int) -> BalanceHold:
+    return hold_balance(user.id, amount, BalanceEntryReason.WITHDRAW, expiration_time=timezone.now() - timedelta(minutes=1))
+
+
+def dwolla_error(status: int) -> dwollav2.Error:
+    response = requests.Response()
+    response.status_code = status
+    response._content = b'{"code": "ValidationError", "message": "Validation error"}'
+    return dwollav2.Error(response)
+
+
+@pytest.mark.django_db
+def test_dwolla_withdraw_rejected_releases_hold(user_tacker, mocker):
+    set_balance(user_tacker, 1000)
+    token = mocker.patch("payment.services.get_dwolla_token").return_value
+    token.post.side_effect = dwolla_error(400)
+
+    with pytest.raises(dwollav2.Error):
+        dwolla_transaction(user_tacker, 300, "funding-source-id", PaymentAction.WITHDRAW)
+
+    hold = BalanceHold.objects.get(reason=BalanceEntryReason.WITHDRAW)
+    assert hold.status == BalanceHoldStatus.RELEASED
+    assert get_balance(user_tacker) == 1000
+    transfer_request, headers = token.post.call_args.args[1:]
+    assert transfer_request["correlationId"] == headers["Idempotency-Key"] == f"withdraw_hold_{hold.id}"
+
+
+@pytest.mark.django_db
+def test_dwolla_withdraw_lost_response_keeps_hold(user_tacker, mocker):
+    set_balance(user_tacker, 1000)
+    token = mocker.patch("payment.services.get_dwolla_token").return_value
+    token.post.side_effect = requests.ConnectionError
+
+    with pytest.raises(requests.ConnectionError):
+        dwolla_transaction(user_tacker, 300, "funding-source-id", PaymentAction.WITHDRAW)
+
+    assert BalanceHold.objects.get(reason=BalanceEntryReason.WITHDRAW).status == BalanceHoldStatus.HELD
+    assert get_balance(user_tacker) == 700
+
+
+@pytest.mark.django_db
+def test_reconcile_withdraw_holds(user_tacker, mocker):
+    set_balance(user_tacker, 1000)
+    sent_hold = create_stale_withdraw_hold(user_tacker, 300)
+    missing_hold = create_stale_withdraw_hold(user_tacker, 200)
+    failed_hold = create_stale_withdraw_hold(user_tacker, 100)
+    unknown_hold = create_stale_withdraw_hold(user_tacker, 50)
+    transfers = {
+        f"withdraw_hold_{sent_hold.id}": [
+            {"id": "transfer-1", "status": "pending", "amount": {"value": "3.00"}, "correlationId": f"withdraw_hold_{sent_hold.id}"}
+        ],
+        f"withdraw_hold_{missing_hold.id}": [],
+        f"withdraw_hold_{failed_hold.id}": [
+            {"id": "transfer-2", "status": "failed", "amount": {"value": "1.00"}, "correlationId": f"withdraw_hold_{failed_hold.id}"}
+        ],
+    }
+
+    def get_transfers(url, correlationId):
+        if correlationId not in transfers:
+            raise dwolla_error(500)
+        return mocker.Mock(body={"_embedded": {"transfers": transfers[correlationId]}})
+
+    mocker.patch("payment.services.get_dwolla_token").return_value.get.side_effect = get_transfers
+
+    assert reconcile_withdraw_holds() == 3
+
+    for hold in (sent_hold, missing_hold, failed_hold, unknown_hold):
+        hold.refresh_from_db()
+    assert sent_hold.status == BalanceHoldStatus.CAPTURED
+    assert sent_hold.transaction.transaction_id == "transfer-1"
+    assert sent_hold.transaction.amount_with_fees == 300
+    assert missing_hold.status == BalanceHoldStatus.RELEASED
+    assert failed_hold.status == BalanceHoldStatus.RELEASED
+    assert unknown_hold.status == BalanceHoldStatus.HELD
+    assert get_balance(user_tacker) == 1000 - 300 - 50
+
+
+@pytest.mark.django_db
+def test_hold_migration_skips_deleted_tacks(user_tacker, tack_group):
+    create_holds_of_paid_tacks = import_module(
+        "payment.migrations.0010_alter_balanceentry_reason_balancehold_and_more"
+    ).create_holds_of_paid_tacks
+    set_balance(user_tacker, 1000)
+    tack_info = {
+        "tacker": user_tacker,
+        "title": "Test Title",
+        "price": 300,
+        "group": tack_group,
+        "description": "Test Description",
+        "allow_counter_offer": False,
+        "auto_accept": True,
+    }
+    live_tack = Tack.objects.create(**tack_info)
+    # auto accept Tack refunded and soft deleted by TackViewset.destroy
+    deleted_tack = Tack.objects.create(**tack_info, is_active=False)
+
+    create_holds_of_paid_tacks(apps, None)
+
+    assert BalanceHold.objects.get(tack=live_tack).status == BalanceHoldStatus.HELD
+    assert not BalanceHold.objects.filter(tack=deleted_tack).exists()
+    assert release_expired_holds() == 0
@@ -0,0 +1,36 @@
+import uuid
+
+import pytest
+
+from dwolla_service.models import DwollaEvent, DwollaWebhookMessage
+from payment.dwolla_webhook_service import process_dwolla_webhooks
+
+
+pytestmark = pytest.mark.django_db
+
+
+def webhook_payload(timestamp: str | None = "2022-01-01T00:00:00.000Z") -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "topic": "customer_created",
+        "timestamp": timestamp,
+        "created": "2022-01-01T00:00:00.000Z",
+        "_links": {},
+    }
+
+
+def test_invalid_event_does_not_block_batch():
+    valid = DwollaWebhookMessage.objects.create(payload=webhook_payload())
+    # passes build_dwolla_event but can't be inserted
+    poison = DwollaWebhookMessage.objects.create(payload=webhook_payload(timestamp="not a timestamp"))
+
+    assert process_dwolla_webhooks() == 2
+
+    valid.refresh_from_db()
+    poison.refresh_from_db()
+    assert valid.process_time is not None
+    assert valid.error == ""
+    assert poison.process_time is not None
+    assert poison.error.startswith("Invalid event")
+    assert list(DwollaEvent.objects.values_list("event_id", flat=True)) == [uuid.UUID(valid.payload["id"])]
+    assert process_dwolla_webhooks() == 0
@@ -0,0 +1,88 @@
+import logging
+
+import pytest
+from kombu.exceptions import OperationalError
+
+from core.choices import OutboxEventType
+from tack.models import OutboxEvent, Tack
+from tack.outbox import dispatch_outbox_events, add_tack_event, TACK_HANDLERS, OUTBOX_MAX_ATTEMPTS
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def tack(user_tacker, tack_group):
+    tack = Tack.objects.create(
+        tacker=user_tacker,
+        title="Test Title",
+        price=300,
+        group=tack_group,
+        description="Test Description",
+        allow_counter_offer=False
+    )
+    # events of the Tack creation are not tested here
+    OutboxEvent.objects.all().delete()
+    return tack
+
+
+@pytest.fixture
+def handler(mocker):
+    handler = mocker.Mock()
+    mocker.patch.dict(TACK_HANDLERS, {OutboxEventType.TACK_ACTIVE: (handler,)})
+    return handler
+
+
+def test_dispatch_outbox_events(tack, handler):
+    event = OutboxEvent.objects.create(event_type=OutboxEventType.TACK_ACTIVE, tack=tack)
+
+    assert dispatch_outbox_events() == 1
+
+    handler.assert_called_once_with(tack)
+    event.refresh_from_db()
+    assert event.processed_time is not None
+    assert event.attempts == 0
+    assert dispatch_outbox_events() == 0
+
+
+def test_failed_outbox_event_is_retried(tack, handler):
+    event = OutboxEvent.objects.create(event_type=OutboxEventType.TACK_ACTIVE, tack=tack)
+    handler.side_effect = [ConnectionError, None]
+
+    assert dispatch_outbox_events() == 1
+    event.refresh_from_db()
+    assert event.processed_time is None
+    assert event.attempts == 1
+
+    assert dispatch_outbox_events() == 1
+    event.refresh_from_db()
+    assert event.processed_time is not None
+    assert handler.call_count == 2
+
+
+def test_outbox_event_is_abandoned_after_max_attempts(tack, handler, caplog):
+    event = OutboxEvent.objects.create(event_type=OutboxEventType.TACK_ACTIVE, tack=tack)
+    handler.side_effect = ConnectionError
+
+    with caplog.at_level(logging.ERROR, logger="django"):
+        for _ in range(OUTBOX_MAX_ATTEMPTS):
+            assert dispatch_outbox_events() == 1
+
+    assert dispatch_outbox_events() == 0
+    event.refresh_from_db()
+    assert event.processed_time is None
+    assert event.attempts == OUTBOX_MAX_ATTEMPTS
+    assert handler.call_count == OUTBOX_MAX_ATTEMPTS
+    assert f"Outbox event {event} is abandoned after {OUTBOX_MAX_ATTEMPTS} attempts" in caplog.text
+
+
+def test_outbox_dispatch_survives_broker_error(tack, mocker, django_capture_on_commit_callbacks, caplog):
+    delay = mocker.patch("tack.tasks.dispatch_outbox_events_task.delay", side_effect=OperationalError("down"))
+
+    with caplog.at_level(logging.ERROR, logger="django"):
+        with django_capture_on_commit_callbacks(execute=True):
+            add_tack_event(tack, OutboxEventType.TACK_ACTIVE)
+
+    delay.assert_called_once()
+    assert "Outbox dispatch is not scheduled" in caplog.text
+    assert OutboxEvent.objects.filter(processed_time__isnull=True).count() == 1
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from stats.models import StatsBucket
+from stats.rollup_service import add_to_bucket, correct_stats_buckets, get_bucket_start, ROLLUP_BUCKET
+from tack.models import Tack
+
+
+pytestmark = pytest.mark.django_db
+
+
+def create_tack(user, group, price: int, creation_time=None) -> Tack:
+    tack = Tack.objects.create(
+        tacker=user,
+        title="Test Title",
+        price=price,
+        group=group,
+        description="Test Description",
+        allow_counter_offer=True
+    )
+    if creation_time:
+        # creation_time is auto_now_add
+        Tack.objects.filter(pk=tack.pk).update(creation_time=creation_time)
+    return tack
+
+
+def test_record_tack_created(user_tacker, tack_group, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        tack = create_tack(user_tacker, tack_group, 300)
+
+    bucket_start = get_bucket_start(tack.creation_time)
+    for group_id in (None, tack_group.id):
+        bucket = StatsBucket.objects.get(group=group_id, bucket_start=bucket_start)
+        assert bucket.tacks_created == 1
+        assert bucket.sum_price == 300
+        assert bucket.allowed_counteroffers == 1
+
+
+@pytest.mark.parametrize("group_bucket", (False, True))
+def test_add_to_bucket_created_concurrently(tack_group, mocker, group_bucket):
+    group_id = tack_group.id if group_bucket else None
+    bucket_start = get_bucket_start(timezone.now())
+    # bucket created by a concurrent event after the first UPDATE found no row
+    StatsBucket.objects.create(group_id=group_id, bucket_start=bucket_start, tacks_created=1, sum_price=100)
+    update = QuerySet.update
+    calls = []
+
+    def update_after_concurrent_create(queryset, **kwargs):
+        calls.append(kwargs)
+        return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+    mocker.patch.object(QuerySet, "update", autospec=True, side_effect=update_after_concurrent_create)
+
+    add_to_bucket(group_id, bucket_start, {"tacks_created": 1, "sum_price": 200})
+
+    assert len(calls) == 2
+    bucket = StatsBucket.objects.get(group=group_id, bucket_start=bucket_start)
+    assert bucket.tacks_created == 2
+    assert bucket.sum_price == 300
+
+
+def test_correct_stats_buckets(user_tacker, tack_group):
+    hour_start = get_bucket_start(timezone.now()) - 2 * ROLLUP_BUCKET
+    # increments of these Tacks were lost
+    create_tack(user_tacker, tack_group, 300, creation_time=hour_start + timedelta(minutes=5))
+    create_tack(user_tacker, tack_group, 200, creation_time=hour_start + timedelta(minutes=35))
+    # drifted group bucket and bucket of an event counted twice
+    StatsBucket.objects.create(group=tack_group, bucket_start=hour_start, tacks_created=5, sum_price=900)
+    StatsBucket.objects.create(bucket_start=hour_start - ROLLUP_BUCKET, tacks_created=1, sum_price=100)
+    # bucket of the current hour may still get increments and is not corrected
+    StatsBucket.objects.create(bucket_start=get_bucket_start(timezone.now()), tacks_created=7)
+
+    assert correct_stats_buckets() == 3
+
+    for group_id in (None, tack_group.id):
+        bucket = StatsBucket.objects.get(group=group_id, bucket_start=hour_start)
+        assert bucket.tacks_created == 2
+        assert bucket.sum_price == 500
+        assert bucket.allowed_counteroffers == 2
+    bucket = StatsBucket.objects.get(bucket_start=hour_start - ROLLUP_BUCKET)
+    assert bucket.tacks_created == 0
+    assert bucket.sum_price == 0
+    assert StatsBucket.objects.get(bucket_start=get_bucket_start(timezone.now())).tacks_created == 7
+    assert correct_stats_buckets() == 0
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from djstripe.models import WebhookEventTrigger
+from payment.models import StripeWebhookQueueItem
+from payment.stripe_webhook_service import process_stripe_webhooks
+
+
+pytestmark = pytest.mark.django_db
+
+
+def queue_item(object_id: str, **kwargs) -> StripeWebhookQueueItem:
+    trigger = WebhookEventTrigger.objects.create(remote_ip="127.0.0.1", headers={}, valid=True)
+    return StripeWebhookQueueItem.objects.create(
+        trigger=trigger,
+        object_id=object_id,
+        event_type="payment_intent.succeeded",
+        **kwargs
+    )
+
+
+def test_items_of_object_are_processed_in_order(mocker):
+    process = mocker.patch.object(WebhookEventTrigger, "process", autospec=True)
+    waiting = queue_item("pi_1", attempts=1, next_attempt_time=timezone.now() + timedelta(minutes=1))
+    blocked = queue_item("pi_1")
+    first = queue_item("pi_2")
+    second = queue_item("pi_2")
+
+    assert process_stripe_webhooks()[0] == 2
+
+    assert [call.args[0] for call in process.call_args_list] == [first.trigger, second.trigger]
+    for item in (waiting, blocked, first, second):
+        item.refresh_from_db()
+    assert waiting.processed_time is None
+    assert blocked.processed_time is None
+    assert first.processed_time is not None
+    assert second.processed_time is not None
+
+
+def test_failed_item_blocks_later_items_of_object(mocker):
+    mocker.patch.object(WebhookEventTrigger, "process", autospec=True, side_effect=[ConnectionError, None])
+    failed = queue_item("pi_1")
+    blocked = queue_item("pi_1")
+    other = queue_item("pi_2")
+
+    processed, retry_in = process_stripe_webhooks()
+
+    assert processed == 1
+    assert retry_in is not None
+    for item in (failed, blocked, other):
+        item.refresh_from_db()
+    assert failed.attempts == 1
+    assert blocked.processed_time is None
+    assert other.processed_time is not None
+
+
+def test_ordering_check_query_count(mocker):
+    mocker.patch.object(WebhookEventTrigger, "process", autospec=True)
+    for i in range(20):
+        queue_item(f"pi_{i % 5}")
+
+    with CaptureQueriesContext(connection) as context:
+        assert process_stripe_webhooks()[0] == 20
+
+    queries = [query["sql"] for query in context.captured_queries if "SAVEPOINT" not in query["sql"]]
+    # select, ordering aggregate and bulk update, not a query per item
+    assert len(queries) <= 4
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from core.choices import PaymentAction, PaymentService
+from payment.loss_limit_service import get_bucket_start, get_sum24h_loss, reserve_transaction_loss, \
+    release_transaction_loss, add_transaction_loss, correct_loss_buckets, LOSS_WINDOW
+from payment.models import Transaction, TransactionLossBucket
+
+
+pytestmark = pytest.mark.django_db
+
+
+def create_transaction(user, loss: int, creation_time) -> Transaction:
+    tr = Transaction.objects.create(
+        user=user,
+        amount_requested=1000,
+        amount_with_fees=1000 + 50 + loss,
+        service_fee=50,
+        fee_difference=loss,
+        service_name=PaymentService.DWOLLA,
+        action_type=PaymentAction.DEPOSIT,
+        transaction_id="transfer-id"
+    )
+    # creation_time is auto_now_add
+    Transaction.objects.filter(pk=tr.pk).update(creation_time=creation_time)
+    return tr
+
+
+def test_reserve_transaction_loss(user_tacker):
+    assert reserve_transaction_loss(user_tacker.id, -300, max_loss=500)
+    assert get_sum24h_loss(user_tacker.id) == -300
+
+    assert not reserve_transaction_loss(user_tacker.id, -200, max_loss=500)
+    assert get_sum24h_loss(user_tacker.id) == -300
+    assert TransactionLossBucket.objects.filter(user=user_tacker).count() == 1
+
+
+def test_release_transaction_loss(user_tacker):
+    assert reserve_transaction_loss(user_tacker.id, -300, max_loss=500)
+
+    release_transaction_loss(user_tacker.id, -300)
+
+    assert get_sum24h_loss(user_tacker.id) == 0
+    assert reserve_transaction_loss(user_tacker.id, -400, max_loss=500)
+
+
+def test_old_buckets_are_not_counted(user_tacker):
+    add_transaction_loss(user_tacker.id, -400, time=timezone.now() - LOSS_WINDOW - timedelta(hours=1))
+
+    assert get_sum24h_loss(user_tacker.id) == 0
+    assert reserve_transaction_loss(user_tacker.id, -400, max_loss=500)
+
+
+def test_correct_loss_buckets(user_tacker, user_runner):
+    hour_ago = timezone.now() - timedelta(hours=1)
+    create_transaction(user_tacker, -100, hour_ago)
+    create_transaction(user_tacker, -50, hour_ago)
+    create_transaction(user_runner, -70, hour_ago)
+    # drifted bucket, missing bucket of the runner and bucket older than the window
+    add_transaction_loss(user_tacker.id, -300, time=hour_ago)
+    add_transaction_loss(user_tacker.id, -200, time=timezone.now() - LOSS_WINDOW - timedelta(hours=1))
+    # loss reserved for Transaction that is being created is kept
+    add_transaction_loss(user_runner.id, -30)
+
+    assert correct_loss_buckets() == 2
+
+    assert TransactionLossBucket.objects.get(
+        user=user_tacker,
+        bucket_start=get_bucket_start(hour_ago)
+    ).fee_difference == -150
+    assert TransactionLossBucket.objects.get(
+        user=user_runner,
+        bucket_start=get_bucket_start(hour_ago)
+    ).fee_difference == -70
+    assert TransactionLossBucket.objects.filter(user=user_tacker).count() == 1
+    assert get_sum24h_loss(user_runner.id) == -100
+    assert correct_loss_buckets() == 0
@@ -2,6 +2,7 @@ import pytest
 from django.contrib.auth import authenticate, login
 from rest_framework.test import APIClient
 
+from group.models import Group, GroupMembers
 from user.models import User
 
 
@@ -73,6 +74,13 @@ def user_runner():
     return user_runner
 
 
+@pytest.fixture
+def tack_group(user_tacker, user_runner):
+    group = Group.objects.create(owner=user_tacker, name="Test Tack Group")
+    GroupMembers.objects.get_or_create(group=group, member=user_runner)
+    return group
+
+
 @pytest.fixture
 def group_creds():
     return {"name": "Test Group name", "description": "Test Description", "is_public": True}
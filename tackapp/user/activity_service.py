@@ -0,0 +1,95 @@
+import logging
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Aggregate, Count, QuerySet, Sum
+from django.utils import timezone
+
+from core.choices import TackerType, TackStatus
+from stats.models import UserVisits
+from tack.models import Tack
+from user.models import User, UserActivity
+
+
+logger = logging.getLogger("debug")
+
+ACTIVITY_PERIOD = timedelta(days=7)
+MIN_WEEK_TACKS_AS_TACKER = 1
+MIN_WEEK_TACKS_AS_RUNNER = 3
+USER_ACTIVITY_BATCH_SIZE = 1000
+
+
+def get_tacker_type(
+        last_login: datetime | None,
+        week_tacks_as_tacker: int,
+        week_tacks_as_runner: int,
+        now: datetime
+) -> TackerType:
+    if not last_login or last_login <= now - ACTIVITY_PERIOD:
+        return TackerType.INACTIVE
+    is_tacker = week_tacks_as_tacker >= MIN_WEEK_TACKS_AS_TACKER
+    is_runner = week_tacks_as_runner >= MIN_WEEK_TACKS_AS_RUNNER
+    if is_tacker and is_runner:
+        return TackerType.SUPER_ACTIVE
+    if is_runner:
+        return TackerType.RUNNER
+    if is_tacker:
+        return TackerType.TACKER
+    return TackerType.ACTIVE
+
+
+def count_by_user(queryset: QuerySet, user_field: str, count: Aggregate = Count("id")) -> dict:
+    """{user_id: count} of queryset rows with one GROUP BY query"""
+
+    return dict(
+        queryset.filter(
+            **{f"{user_field}__isnull": False}
+        ).values(
+            user_field
+        ).annotate(
+            count=count
+        ).order_by().values_list(user_field, "count")
+    )
+
+
+def refresh_user_activity() -> int:
+    """
+    Rebuild UserActivity of every User with one GROUP BY query per counter.
+    Rows are replaced in one transaction, admin sees the previous rows until commit.
+    Returns number of rows
+    """
+
+    now = timezone.now()
+    week_ago = now - ACTIVITY_PERIOD
+    week_tacks = Tack.objects.filter(creation_time__gte=week_ago)
+    tacks_as_tacker = count_by_user(week_tacks, "tacker")
+    tacks_as_runner = count_by_user(
+        week_tacks.filter(status__in=(TackStatus.WAITING_REVIEW, TackStatus.FINISHED)),
+        "runner"
+    )
+    visits = count_by_user(UserVisits.objects.all(), "user", Sum("count"))
+    week_visits = count_by_user(UserVisits.objects.filter(timestamp__gte=week_ago), "user", Sum("count"))
+
+    activities = [
+        UserActivity(
+            user_id=user_id,
+            tacker_type=get_tacker_type(
+                last_login,
+                tacks_as_tacker.get(user_id, 0),
+                tacks_as_runner.get(user_id, 0),
+                now
+            ),
+            week_tacks_as_tacker=tacks_as_tacker.get(user_id, 0),
+            week_tacks_as_runner=tacks_as_runner.get(user_id, 0),
+            visits=visits.get(user_id, 0),
+            week_visits=week_visits.get(user_id, 0),
+            refresh_time=now,
+        )
+        for user_id, last_login in User.objects.values_list("id", "last_login").iterator()
+    ]
+    with transaction.atomic():
+        UserActivity.objects.all().delete()
+        UserActivity.objects.bulk_create(activities, batch_size=USER_ACTIVITY_BATCH_SIZE)
+
+    logger.info(f"Refreshed activity of {len(activities)} users")
+    return len(activities)
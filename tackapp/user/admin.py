@@ -1,18 +1,13 @@
-import collections
 import logging
 
-from datetime import timedelta
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from advanced_filters.admin import AdminAdvancedFiltersMixin
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.admin import UserAdmin
-from core.choices import TackerType, TackStatus
-from django.db.models import Q, QuerySet
-from stats.models import UserVisits
-from django.utils import timezone
+from core.choices import TackerType
+from django.db.models import QuerySet
 from django.contrib import admin
 from group.models import Group
-from tack.models import Tack
 from .models import *
 
 
@@ -132,41 +127,9 @@ class TackerTypeFilter(admin.SimpleListFilter):
         provided in the query string and retrievable via
         `self.value()`.
         """
-        inactive_users = queryset.filter(
-            Q(last_login=None) | Q(last_login__lte=timezone.now() - timedelta(days=7))
-        ).values_list("pk", flat=True)
-        last_week_tackers = list(Tack.objects.filter(
-            creation_time__gte=timezone.now() - timedelta(days=7),
-        ).values_list("tacker_id", flat=True))
-
-        last_week_runners = list(Tack.objects.filter(
-            creation_time__gte=timezone.now() - timedelta(days=7),
-            status__in=(
-                TackStatus.WAITING_REVIEW,
-                TackStatus.FINISHED
-            )
-        ).values_list("runner_id", flat=True))
-
-        counter_runners = collections.Counter(last_week_runners)
-        counter_tackers = collections.Counter(last_week_tackers)
-        filtered_runners = [key for key in counter_runners if counter_runners[key] >= 3 and key is not None]
-        filtered_tackers = [key for key in counter_tackers if counter_tackers[key] >= 1 and key is not None]
-        super_active_users = list(set(filtered_tackers).intersection(filtered_runners))
-        match self.value():
-            case TackerType.INACTIVE:
-                return queryset.filter(pk__in=inactive_users)
-            case TackerType.SUPER_ACTIVE:
-                return queryset.filter(pk__in=super_active_users).exclude(pk__in=inactive_users)
-            case TackerType.RUNNER:
-                return queryset.filter(pk__in=filtered_runners).exclude(pk__in=inactive_users)
-            case TackerType.TACKER:
-                return queryset.filter(pk__in=filtered_tackers).exclude(pk__in=inactive_users)
-            case TackerType.ACTIVE:
-                return queryset.exclude(
-                    Q(pk__in=list(set(filtered_tackers) | set(filtered_runners)) + list(inactive_users))
-                )
-            case _:
-                return queryset
+        if not self.value():
+            return queryset
+        return queryset.filter(activity__tacker_type=self.value())
 
 
 @admin.register(User)
@@ -198,47 +161,32 @@ class UserAdmin(AdminAdvancedFiltersMixin, CustomUserAdmin):
     search_help_text = "Search by User first_name, last_name, email, phone_number"
     ordering = ('-id',)
 
-    @admin.display(description="Tacker type")
-    def tacker_type(self, obj: User) -> TackerType:
-        week_related_tacks = Tack.objects.filter(
-            Q(tacker=obj) | Q(runner=obj),
-            creation_time__gte=timezone.now() - timedelta(days=7),
-        )
-        week_num_runner_tacks = week_related_tacks.filter(
-            runner=obj,
-            status__in=(
-                TackStatus.WAITING_REVIEW,
-                TackStatus.FINISHED
-            )).count()
-        week_num_tacker_tacks = week_related_tacks.filter(
-            tacker=obj,
-        ).count()
-        if not obj.last_login or obj.last_login <= timezone.now() - timedelta(days=7):
-            return TackerType.INACTIVE
-        if week_num_runner_tacks >= 3 and week_num_tacker_tacks >= 1:
-            return TackerType.SUPER_ACTIVE
-        if week_num_runner_tacks >= 3:
-            return TackerType.RUNNER
-        if week_num_tacker_tacks >= 1:
-            return TackerType.TACKER
-        return TackerType.ACTIVE
-
-    @admin.display(description='Visits')
-    def user_visits(self, obj: User) -> int:
-        count_user_visits: int = UserVisits.objects.filter(user=obj).count()
-        return count_user_visits
-
-    @admin.display(description='Visits per week')
-    def user_visits_per_week(self, obj: User) -> int:
-        count_user_visits: int = UserVisits.objects.filter(
-            Q(
-                user=obj
-            ) &
-            Q(
-                timestamp__gte=datetime.today() - timedelta(days=7)
-            )
-        ).count()
-        return count_user_visits
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("activity")
+
+    @staticmethod
+    def get_activity(obj: User) -> UserActivity | None:
+        """Activity of the last refresh_user_activity_task, missing for Users created after it"""
+
+        try:
+            return obj.activity
+        except UserActivity.DoesNotExist:
+            return None
+
+    @admin.display(description="Tacker type", ordering="activity__tacker_type")
+    def tacker_type(self, obj: User) -> TackerType | None:
+        activity = self.get_activity(obj)
+        return activity.tacker_type if activity else None
+
+    @admin.display(description='Visits', ordering="activity__visits")
+    def user_visits(self, obj: User) -> int | None:
+        activity = self.get_activity(obj)
+        return activity.visits if activity else None
+
+    @admin.display(description='Visits per week', ordering="activity__week_visits")
+    def user_visits_per_week(self, obj: User) -> int | None:
+        activity = self.get_activity(obj)
+        return activity.week_visits if activity else None
 
     @admin.display(description="Withdraw", boolean=True)
     def is_allowed_to_withdraw_money(self, obj: User) -> bool:
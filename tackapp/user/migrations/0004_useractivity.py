@@ -0,0 +1,32 @@
+# Generated by Django 4.0.8 on 2026-10-18 15:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_user_allowed_to_withdraw'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('tacker_type', models.CharField(choices=[('Active - Tacker', 'Active - Tacker'), ('Active - Runner', 'Active - Runner'), ('Active - Both', 'Active - Both'), ('Active - Neither', 'Active - Neither'), ('Inactive', 'Inactive')], db_index=True, max_length=16)),
+                ('week_tacks_as_tacker', models.PositiveIntegerField(default=0)),
+                ('week_tacks_as_runner', models.PositiveIntegerField(default=0)),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('week_visits', models.PositiveIntegerField(default=0)),
+                ('refresh_time', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'User activity',
+                'verbose_name_plural': 'User activity',
+                'db_table': 'user_activity',
+            },
+        ),
+    ]
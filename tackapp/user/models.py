@@ -6,6 +6,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from phonenumber_field.modelfields import PhoneNumberField
 
+from core.choices import TackerType
 from core.validators import username_validator
 from review.models import Review
 
@@ -93,3 +94,23 @@ class User(AbstractUser):
         db_table = "users"
         verbose_name = "User"
         verbose_name_plural = "Users"
+
+
+class UserActivity(models.Model):
+    """Weekly activity of User for admin list and filters, rebuilt by user.tasks.refresh_user_activity_task"""
+
+    user = models.OneToOneField("user.User", primary_key=True, on_delete=models.CASCADE, related_name="activity")
+    tacker_type = models.CharField(max_length=16, choices=TackerType.choices, db_index=True)
+    week_tacks_as_tacker = models.PositiveIntegerField(default=0)
+    week_tacks_as_runner = models.PositiveIntegerField(default=0)
+    visits = models.PositiveIntegerField(default=0)
+    week_visits = models.PositiveIntegerField(default=0)
+    refresh_time = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id}: {self.tacker_type}"
+
+    class Meta:
+        db_table = "user_activity"
+        verbose_name = "User activity"
+        verbose_name_plural = "User activity"
@@ -6,7 +6,7 @@ import stripe
 from djstripe.models import Customer as dsCustomer
 from django.db.models import Q
 
-from payment.dwolla_service import dwolla_client
+from payment.dwolla_service import get_dwolla_token
 from dwolla_service.models import DwollaRemovedAccount
 from payment.services import get_dwolla_id, detach_dwolla_funding_sources, \
     _deactivate_dwolla_account, is_user_have_dwolla_pending_transfers
@@ -66,7 +66,7 @@ def create_stripe_account(user: User):
 
 
 def create_dwolla_account(user: User):
-    token = dwolla_client.Auth.client()
+    token = get_dwolla_token()
     response = token.get(f"customers?email={user.email}")
 
     # if user already exists in Dwolla system we update information about him
@@ -96,7 +96,7 @@ def create_dwolla_account(user: User):
 
 
 def dwolla_change_info(user: User):
-    token = dwolla_client.Auth.client()
+    token = get_dwolla_token()
 
     dwolla_id = get_dwolla_id(user)
     request = {
@@ -4,6 +4,7 @@ from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 
 from payment.models import BankAccount
+from tackapp.channels_middleware import invalidate_user_snapshot
 from tackapp.websocket_messages import WSSender
 from user.models import User
 from user.serializers import UserDetailSerializer
@@ -35,3 +36,9 @@ def create_stripe_dwolla_account(instance: User, created: bool, *args, **kwargs)
 def delete_stripe_dwolla_account(instance: User, *args, **kwargs):
     deactivate_dwolla_customer(instance)
     delete_stripe_customer(instance)
+
+
+@receiver(signal=post_save, sender=User)
+@receiver(signal=pre_delete, sender=User)
+def invalidate_user_ws_snapshot(instance: User, *args, **kwargs):
+    invalidate_user_snapshot(instance.id)
@@ -3,6 +3,7 @@ from django.db import transaction
 
 from dwolla_service.models import DwollaRemovedAccount
 from payment.services import is_user_have_dwolla_pending_transfers
+from user.activity_service import refresh_user_activity
 from user.services import deactivate_dwolla_account
 
 
@@ -14,6 +15,13 @@ def check_dwolla_removed_customers():
             deactivate_and_delete_removed_customer(customer)
 
 
+@shared_task
+def refresh_user_activity_task():
+    """Rebuild UserActivity shown in Users admin"""
+
+    refresh_user_activity()
+
+
 @transaction.atomic
 def deactivate_and_delete_removed_customer(customer):
     deactivate_dwolla_account(customer.dwolla_id)
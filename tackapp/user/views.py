@@ -13,7 +13,7 @@ from core.choices import TackStatus
 from payment.models import BankAccount
 from payment.serializers import BankAccountSerializer
 from review.serializers import ReviewSerializer
-from stats.models import UserVisits
+from stats import visits_service
 from tack.models import Tack
 from .serializers import *
 from .services import get_reviews_by_user, get_reviews_as_reviewer_by_user, user_change_bio
@@ -147,9 +147,5 @@ class UsersViewset(
 
     @action(methods=("POST",), detail=False, url_path="me/visit", serializer_class=None)
     def add_visit(self, request, *args, **kwargs):
-        logger.info(f"{request.data = }")
-        logger.info(f"{request.META = }")
-        UserVisits.objects.create(
-            user=request.user
-        )
+        visits_service.add_visit(request.user.id)
         return Response()